@@ -203,8 +203,13 @@ class AdminTask(models.Model):
             send_email_new_assigned_admin(self)
 
     def mark_completed(self):
+        from admin.sequences.models import TriggerCounter
         from admin.sequences.tasks import process_condition
 
+        # Only the first completion counts for the conditions
+        newly_completed = AdminTask.objects.filter(pk=self.pk, completed=False).update(
+            completed=True
+        )
         self.completed = True
         self.save()
 
@@ -216,31 +221,19 @@ class AdminTask(models.Model):
         if self.hardware is not None:
             self.hardware.remove_or_add_to_user(self.new_hire)
 
-        # Get conditions with this to do item as (part of the) condition
-        conditions = self.new_hire.conditions.filter(
-            condition_admin_tasks=self.based_on
-        )
-
-        for condition in conditions:
-            condition_admin_tasks_id = condition.condition_admin_tasks.values_list(
-                "id", flat=True
-            )
+        if not newly_completed or self.based_on is None:
+            return
 
-            # Check if all admin to do items have been added to new hire and are
-            # completed. If not, then we know it should not be triggered yet
-            completed_tasks = AdminTask.objects.filter(
-                based_on_id__in=condition_admin_tasks_id,
-                new_hire=self.new_hire,
-                completed=True,
+        # Process the conditions with this admin task as (part of the) condition,
+        # once all of their admin tasks have been completed
+        for condition_id in TriggerCounter.objects.complete(
+            self.new_hire, condition__condition_admin_tasks=self.based_on
+        ):
+            # Send notification only if user has a slack account
+            process_condition(
+                condition_id, self.new_hire.id, self.new_hire.has_slack_account
             )
 
-            # If the amount matches, then we should process it
-            if completed_tasks.count() == len(condition_admin_tasks_id):
-                # Send notification only if user has a slack account
-                process_condition(
-                    condition.id, self.new_hire.id, self.new_hire.has_slack_account
-                )
-
     class Meta:
         ordering = ["completed", "date"]
 
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("badges", "0010_auto_20220221_1338"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="badge",
+            name="requires_buddy",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="badge",
+            name="requires_manager",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
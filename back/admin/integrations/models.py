@@ -6,13 +6,12 @@ import uuid
 from datetime import timedelta
 from json.decoder import JSONDecodeError as NativeJSONDecodeError
 
-import requests
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.template import Context, Template
+from django.template import Context
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
@@ -41,9 +40,10 @@ from admin.integrations.serializers import (
     SyncUsersManifestSerializer,
     WebhookManifestSerializer,
 )
-from admin.integrations.utils import get_value_from_notation
+from admin.integrations.utils import get_session, get_value_from_notation
 from misc.fernet_fields import EncryptedTextField
 from misc.fields import EncryptedJSONField
+from misc.template_cache import template_cache
 from organization.models import Notification
 from organization.utils import has_manager_or_buddy_tags, send_email_with_notification
 
@@ -196,6 +196,9 @@ class Integration(models.Model):
     )
 
     manifest = models.JSONField(default=dict, null=True, blank=True)
+    # Cached result of `requires_assigned_manager_or_buddy`, updated on save
+    requires_manager = models.BooleanField(default=False, editable=False)
+    requires_buddy = models.BooleanField(default=False, editable=False)
     extra_args = EncryptedJSONField(default=dict)
     enabled_oauth = models.BooleanField(default=False)
 
@@ -267,6 +270,9 @@ class Integration(models.Model):
             raise ValidationError({"manifest": json.dumps(manifest_serializer.errors)})
 
     def save(self, *args, **kwargs):
+        self.requires_manager, self.requires_buddy = (
+            self.requires_assigned_manager_or_buddy
+        )
         super().save(*args, **kwargs)
 
         # skip if it's not a sync user integration (no background jobs for the others)
@@ -360,13 +366,15 @@ class Integration(models.Model):
                 headers.update(
                     pritunl_headers(data.get("method", "POST"), url, self.extra_args)
                 )
-            response = requests.request(
+            response = get_session(url).request(
                 data.get("method", "POST"),
                 url,
                 headers=headers,
                 data=post_data,
                 files=files_to_send,
-                timeout=120,
+                timeout=self.manifest.get(
+                    "timeout", settings.INTEGRATION_REQUEST_TIMEOUT
+                ),
             )
         except PritunlMissingCredentialsError as e:
             error = str(e)
@@ -461,7 +469,7 @@ class Integration(models.Model):
         if hasattr(self, "new_hire") and self.new_hire is not None:
             text = self.new_hire.personalize(text, self.extra_args | params)
             return text
-        t = Template(text)
+        t = template_cache.get(text)
         context = Context(self.extra_args | params)
         text = t.render(context)
         return text
@@ -846,6 +854,17 @@ class Integration(models.Model):
     inactive = IntegrationInactiveManager()
 
 
+@receiver(post_save, sender=Integration)
+def set_requires_manager_or_buddy(sender, instance, raw, **kwargs):
+    # `loaddata` skips `save()`, so the flags of fixture integrations are set here
+    if not raw:
+        return
+    requires_manager, requires_buddy = instance.requires_assigned_manager_or_buddy
+    Integration._base_manager.filter(pk=instance.pk).update(
+        requires_manager=requires_manager, requires_buddy=requires_buddy
+    )
+
+
 @receiver(post_delete, sender=Integration)
 def delete_schedule(sender, instance, **kwargs):
     Schedule.objects.filter(name=instance.schedule_name).delete()
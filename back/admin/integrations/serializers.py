@@ -178,6 +178,7 @@ class WebhookManifestSerializer(ValidateMixin, serializers.Serializer):
     extra_user_info = ManifestExtraUserInfoFormSerializer(many=True, required=False)
     headers = serializers.DictField(child=serializers.CharField(), default=dict)
     oauth = ManifestOauthSerializer(required=False)
+    timeout = serializers.IntegerField(min_value=1, max_value=600, required=False)
 
 
 class SyncUsersManifestSerializer(ValidateMixin, serializers.Serializer):
@@ -193,3 +194,4 @@ class SyncUsersManifestSerializer(ValidateMixin, serializers.Serializer):
     initial_data_form = ManifestInitialDataFormSerializer(many=True, required=False)
     headers = serializers.DictField(child=serializers.CharField(), default=dict)
     oauth = ManifestOauthSerializer(required=False)
+    timeout = serializers.IntegerField(min_value=1, max_value=600, required=False)
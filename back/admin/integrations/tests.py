@@ -17,7 +17,7 @@ from admin.integrations.models import (
     IntegrationTrackerStep,
 )
 from admin.integrations.sync_userinfo import SyncUsers
-from admin.integrations.utils import get_value_from_notation
+from admin.integrations.utils import get_session, get_value_from_notation
 from organization.models import Notification
 from users.factories import IntegrationUserFactory
 from users.models import IntegrationUser
@@ -360,10 +360,50 @@ def test_integration_pritunl_missing_credentials(custom_integration_factory):
     assert result == "Missing API_TOKEN/API_SECRET (or legacy PRITUNL_API_* keys)"
 
 
+@pytest.mark.no_run_around_tests
+def test_get_session(settings):
+    settings.INTEGRATION_SESSION_POOL_SIZE = 3
+    settings.INTEGRATION_REQUEST_RETRIES = 4
+    session = get_session("https://session.example.com/api/users")
+
+    # Reused for the same host
+    assert get_session("https://SESSION.example.com/api/groups?page=2") is session
+    assert get_session("https://session.example.org/api/users") is not session
+    assert get_session("http://session.example.com/api/users") is not session
+
+    adapter = session.get_adapter("https://session.example.com/")
+    assert adapter._pool_maxsize == 3
+    assert adapter.max_retries.total == 4
+    # Only idempotent methods are retried on bad responses
+    assert not adapter.max_retries.is_retry("POST", 503)
+    assert adapter.max_retries.is_retry("GET", 503)
+
+    # Cookies are never stored
+    assert session.cookies.get_policy().allowed_domains() == ()
+
+    # Sessions that were not used for a while are closed
+    settings.INTEGRATION_SESSION_KEEP_ALIVE = -1
+    assert get_session("https://session.example.com/api/users") is not session
+
+
+@pytest.mark.django_db
+@patch("requests.Session.request")
+def test_integration_request_timeout(request_mock, custom_integration_factory):
+    request_mock.return_value = Mock(status_code=200, json=lambda: {})
+    integration = custom_integration_factory(manifest={"headers": {}})
+
+    integration.run_request({"method": "GET", "url": "https://example.com/"})
+    assert request_mock.call_args.kwargs["timeout"] == 120
+
+    integration.manifest["timeout"] = 10
+    integration.run_request({"method": "GET", "url": "https://example.com/"})
+    assert request_mock.call_args.kwargs["timeout"] == 10
+
+
 @pytest.mark.django_db
 @freeze_time("2021-01-12")
 @patch(
-    "admin.integrations.models.requests.request",
+    "requests.Session.request",
     Mock(return_value=Mock(status_code=200, json=lambda: dict({}))),
 )
 @patch(
@@ -454,7 +494,7 @@ def test_integration_user_exists(
 
     # Didn't find user
     with patch(
-        "admin.integrations.models.requests.request",
+        "requests.Session.request",
         Mock(return_value=Mock(status_code=200, json=lambda: [{"error": "not_found"}])),
     ):
         exists = integration.user_exists(new_hire)
@@ -465,7 +505,7 @@ def test_integration_user_exists(
 
     # Found user
     with patch(
-        "admin.integrations.models.requests.request",
+        "requests.Session.request",
         Mock(
             return_value=Mock(status_code=200, json=lambda: [{"user": new_hire.email}])
         ),
@@ -478,7 +518,7 @@ def test_integration_user_exists(
 
     # Error went wrong
     with patch(
-        "admin.integrations.models.requests.request",
+        "requests.Session.request",
         side_effect=requests.exceptions.Timeout,
     ):
         exists = integration.user_exists(new_hire)
@@ -582,7 +622,7 @@ def test_integration_revoke_user(
 
     # Revoke user successfully
     with patch(
-        "admin.integrations.models.requests.request",
+        "requests.Session.request",
         Mock(return_value=Mock(status_code=200, json=lambda: [])),
     ):
         success, error = integration.revoke_user(new_hire)
@@ -591,7 +631,7 @@ def test_integration_revoke_user(
 
     # Revoke user unsuccessfully
     with patch(
-        "admin.integrations.models.requests.request",
+        "requests.Session.request",
         side_effect=requests.exceptions.Timeout,
     ):
         success, error = integration.revoke_user(new_hire)
@@ -999,11 +1039,11 @@ def test_polling_not_getting_correct_state(
 
 @pytest.mark.django_db
 @patch(
-    "requests.request",
+    "requests.Session.request",
     Mock(return_value=Mock(status_code=200, content=b"0123456", json=lambda: dict({}))),
 )
 @patch(
-    "requests.request",
+    "requests.Session.request",
     Mock(return_value=Mock(status_code=201, json=lambda: dict({}))),
 )
 def test_receiving_and_sending_file(new_hire_factory, custom_integration_factory):
@@ -1033,11 +1073,11 @@ def test_receiving_and_sending_file(new_hire_factory, custom_integration_factory
 
 @pytest.mark.django_db
 @patch(
-    "requests.request",
+    "requests.Session.request",
     Mock(return_value=Mock(status_code=200, content=b"0123456", json=lambda: dict({}))),
 )
 @patch(
-    "requests.request",
+    "requests.Session.request",
     Mock(return_value=Mock(status_code=201, json=lambda: dict({}))),
 )
 def test_receiving_and_sending_file_invalid_lookup(
@@ -1325,7 +1365,7 @@ def test_integration_tracker(
 
     # Didn't find user
     with patch(
-        "requests.request",
+        "requests.Session.request",
         Mock(
             return_value=Mock(
                 status_code=200,
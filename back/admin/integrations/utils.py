@@ -1,3 +1,17 @@
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
 def get_value_from_notation(notation, value):
     # if we don't need to go into props, then just return the value
     if notation == "":
@@ -42,3 +56,43 @@ def prepare_initial_data(obj):
         return obj
 
     return obj
+
+
+def get_session(url):
+    """
+    Sessions are shared per host within a process, so connections to the same host
+    are kept alive and reused by all integrations (steps, pages and tasks).
+    Connection errors are retried for every method, other failures (like 502/503)
+    only for idempotent methods.
+    """
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}".lower()
+    now = time.monotonic()
+    with _sessions_lock:
+        # Close the connections of hosts that haven't been used for a while
+        for idle_host, (idle_session, last_used) in list(_sessions.items()):
+            if now - last_used > settings.INTEGRATION_SESSION_KEEP_ALIVE:
+                idle_session.close()
+                del _sessions[idle_host]
+
+        if host in _sessions:
+            session = _sessions[host][0]
+        else:
+            session = requests.Session()
+            # Integrations could use the same host with different credentials, so
+            # never send cookies of one request along with another one
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.INTEGRATION_SESSION_POOL_SIZE,
+                max_retries=Retry(
+                    total=settings.INTEGRATION_REQUEST_RETRIES,
+                    backoff_factor=0.5,
+                    status_forcelist=[502, 503, 504],
+                    raise_on_status=False,
+                ),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        _sessions[host] = (session, now)
+    return session
@@ -18,7 +18,7 @@ from twilio.rest import Client
 from admin.admin_tasks.models import AdminTask
 from admin.integrations.forms import IntegrationExtraUserInfoForm
 from admin.notes.models import Note
-from admin.sequences.models import Condition, Sequence
+from admin.sequences.models import Condition, Sequence, TriggerCounter
 from admin.templates.utils import get_templates_model, get_user_field
 from organization.models import Notification, Organization, WelcomeMessage
 from slack_bot.slack_resource import SlackResource
@@ -61,6 +61,8 @@ class NewHireListView(AdminOrManagerPermMixin, ListView):
         context["title"] = _("New hires")
         context["subtitle"] = _("people")
         context["add_action"] = reverse_lazy("people:new_hire_add")
+        # Fetch the missing info of the whole page at once for the badges
+        get_user_model().objects.missing_extra_info(context["object_list"])
         return context
 
 
@@ -549,6 +551,11 @@ class NewHireReopenTaskView(IsAdminOrNewHireManagerMixin, FormView):
         template_user_model = apps.get_model("users", template_type)
 
         template_user_obj = template_user_model.objects.get(pk=template_pk)
+        was_completed = (
+            template_user_obj.completed
+            if template_type == "todouser"
+            else template_user_obj.completed_course
+        )
         if template_type == "todouser":
             template_user_obj.completed = False
             template_user_obj.form = []
@@ -558,6 +565,12 @@ class NewHireReopenTaskView(IsAdminOrNewHireManagerMixin, FormView):
             template_user_obj.answers.clear()
 
         template_user_obj.save()
+        if template_type == "todouser" and was_completed:
+            # The to do item has to be completed again before conditions trigger
+            TriggerCounter.objects.reopen(
+                template_user_obj.user,
+                condition__condition_to_do=template_user_obj.to_do_id,
+            )
 
         translation.activate(template_user_obj.user.language)
         if template_user_obj.user.has_slack_account:
@@ -585,7 +598,8 @@ class NewHireReopenTaskView(IsAdminOrNewHireManagerMixin, FormView):
         messages.success(self.request, _("Item has been reopened"))
 
         # Update user amount completed
-        template_user_obj.user.update_progress()
+        if was_completed:
+            get_user_model().objects.add_completed_tasks(template_user_obj.user_id, -1)
 
         return redirect("people:new_hire_progress", pk=template_user_obj.user.id)
 
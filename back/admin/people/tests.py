@@ -16,7 +16,7 @@ from admin.introductions.factories import IntroductionFactory
 from admin.notes.models import Note
 from admin.preboarding.factories import PreboardingFactory
 from admin.resources.factories import ResourceFactory
-from admin.sequences.models import Condition
+from admin.sequences.models import Condition, TriggerCounter
 from admin.templates.utils import get_user_field
 from admin.to_do.factories import ToDoFactory
 from misc.models import File
@@ -516,6 +516,55 @@ def test_new_hire_list_view(client, new_hire_factory, django_user_model):
     assert "last" in response.content.decode()
 
 
+@pytest.mark.django_db
+def test_new_hire_list_view_missing_info(
+    client,
+    django_assert_max_num_queries,
+    new_hire_factory,
+    django_user_model,
+    condition_to_do_factory,
+    integration_config_factory,
+    integration_factory,
+):
+    client.force_login(
+        django_user_model.objects.create(role=get_user_model().Role.ADMIN)
+    )
+    integration = integration_factory(
+        manifest={
+            "extra_user_info": [
+                {"id": "PERSONAL_EMAIL", "name": "Email", "description": "test"}
+            ]
+        }
+    )
+    condition = condition_to_do_factory()
+    condition.integration_configs.add(
+        integration_config_factory(integration=integration)
+    )
+    new_hire1, new_hire2 = new_hire_factory.create_batch(2)
+    new_hire1.conditions.add(condition)
+
+    url = reverse("people:new_hires")
+    response = client.get(url)
+
+    assert "Missing info" in response.content.decode()
+    assert (
+        reverse("people:new_hire_extra_info", args=[new_hire1.id])
+        in response.content.decode()
+    )
+    assert (
+        reverse("people:new_hire_extra_info", args=[new_hire2.id])
+        not in response.content.decode()
+    )
+
+    # Amount of queries doesn't grow with the amount of new hires
+    with django_assert_max_num_queries(20) as queries:
+        client.get(url)
+    for new_hire in new_hire_factory.create_batch(3):
+        new_hire.conditions.add(condition)
+    with django_assert_max_num_queries(len(queries)):
+        client.get(url)
+
+
 @pytest.mark.django_db
 def test_new_hire_to_do_sequence_item(
     client,
@@ -1353,6 +1402,43 @@ def test_new_hire_reopen_todo(
     ]
 
 
+@pytest.mark.django_db
+def test_new_hire_reopen_todo_trigger_counter(
+    client, admin_factory, to_do_user_factory, condition_to_do_factory
+):
+    client.force_login(admin_factory())
+    to_do_user1 = to_do_user_factory()
+    condition = condition_to_do_factory()
+    condition.condition_to_do.set([to_do_user1.to_do])
+    to_do_user1.user.conditions.add(condition)
+    to_do_user1.mark_completed()
+    counter = TriggerCounter.objects.get(user=to_do_user1.user, condition=condition)
+    assert counter.remaining == 0
+
+    # Reminding doesn't change anything
+    client.post(
+        reverse(
+            "people:new_hire_remind",
+            args=[to_do_user1.user.id, "todouser", to_do_user1.id],
+        )
+    )
+    counter.refresh_from_db()
+    assert counter.remaining == 0
+
+    # Reopened to do item has to be completed again
+    url = reverse(
+        "people:new_hire_reopen", args=[to_do_user1.user.id, "todouser", to_do_user1.id]
+    )
+    client.post(url, data={"message": "You forgot this one!"})
+    counter.refresh_from_db()
+    assert counter.remaining == 1
+
+    # Reopening it again doesn't count, it wasn't completed
+    client.post(url, data={"message": "You forgot this one!"})
+    counter.refresh_from_db()
+    assert counter.remaining == 1
+
+
 @pytest.mark.django_db
 def test_new_hire_reopen_course(
     client, settings, django_user_model, resource_user_factory, mailoutbox
@@ -0,0 +1,115 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admin.sequences.models import Condition, Sequence
+from admin.sequences.simulator import compile_sequences, simulate, simulate_users
+from misc.business_calendar import business_calendar
+from organization.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates which conditions will trigger in the coming days, without "
+        "changing anything. Either for (hypothetical) new hires that get the given "
+        "sequences, or for the current new hires. Useful for capacity planning."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sequences",
+            nargs="+",
+            type=int,
+            help="Sequence ids to simulate (default: sequences that are auto added)",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1000,
+            help="Amount of hypothetical new hires",
+        )
+        parser.add_argument(
+            "--spread",
+            type=int,
+            default=20,
+            help="Amount of workdays the start days of new hires are spread over",
+        )
+        parser.add_argument(
+            "--days", type=int, default=60, help="Amount of days to simulate"
+        )
+        parser.add_argument(
+            "--timezone", help="Timezone of the new hires (default: organization)"
+        )
+        parser.add_argument(
+            "--new-hires",
+            action="store_true",
+            help="Simulate the current new hires instead of hypothetical ones",
+        )
+
+    def handle(self, *args, **options):
+        org = Organization.object.get()
+        if org is None:
+            raise CommandError("Organization has not been created yet")
+
+        now = timezone.now()
+        if options["new_hires"]:
+            timelines = simulate_users(
+                get_user_model().new_hires.all(), days=options["days"], now=now
+            ).values()
+        else:
+            if options["sequences"]:
+                sequences = Sequence.objects.filter(id__in=options["sequences"])
+            else:
+                sequences = Sequence.onboarding.filter(auto_add=True)
+            conditions = compile_sequences(sequences)
+
+            # Spread the start days evenly over the coming workdays
+            first_day = org.current_datetime.date()
+            timelines = [
+                simulate(
+                    conditions,
+                    start_day=business_calendar.add(
+                        first_day, i % max(options["spread"], 1) + 1
+                    ),
+                    timezone_name=options["timezone"] or org.timezone,
+                    days=options["days"],
+                    now=now,
+                )
+                for i in range(options["users"])
+            ]
+
+        conditions_per_day = Counter()
+        items_per_day = Counter()
+        # Timed triggers run every 5 minutes
+        conditions_per_run = Counter()
+        for timeline in timelines:
+            for event in timeline:
+                day = event.fire_at.date()
+                conditions_per_day[day] += 1
+                items_per_day[day] += event.condition.item_count
+                if event.condition.condition_type == Condition.Type.WITHOUT:
+                    # Processed when the sequence is added, not by the timed triggers
+                    continue
+                conditions_per_run[
+                    event.fire_at.replace(
+                        minute=event.fire_at.minute // 5 * 5, second=0, microsecond=0
+                    )
+                ] += 1
+
+        for day in sorted(conditions_per_day):
+            self.stdout.write(
+                f"{day.isoformat()}: {conditions_per_day[day]} conditions, "
+                f"{items_per_day[day]} items"
+            )
+
+        self.stdout.write(
+            f"Total: {sum(conditions_per_day.values())} conditions, "
+            f"{sum(items_per_day.values())} items"
+        )
+        if conditions_per_run:
+            busiest_run, amount = conditions_per_run.most_common(1)[0]
+            self.stdout.write(
+                f"Busiest run: {busiest_run.isoformat()} (UTC) with {amount} conditions"
+            )
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def schedule_timed_conditions(apps, schema_editor):
+    from admin.sequences.schedule import (
+        get_timed_condition_date,
+        get_timed_condition_fire_at,
+    )
+
+    Organization = apps.get_model("organization", "Organization")
+    User = apps.get_model("users", "User")
+    ScheduledCondition = apps.get_model("sequences", "ScheduledCondition")
+
+    org = Organization._default_manager.first()
+    if org is None:
+        return
+
+    users = {
+        user["id"]: user
+        for user in User._default_manager.values(
+            "id", "role", "start_day", "termination_date", "timezone"
+        )
+    }
+    # BEFORE = 2, AFTER = 0
+    user_conditions = User.conditions.through.objects.filter(
+        condition__condition_type__in=[0, 2]
+    ).values_list(
+        "user_id",
+        "condition_id",
+        "condition__condition_type",
+        "condition__days",
+        "condition__time",
+    )
+
+    scheduled_conditions = []
+    for user_id, condition_id, condition_type, days, time in user_conditions:
+        user = users[user_id]
+        date = get_timed_condition_date(
+            condition_type,
+            days,
+            user["start_day"],
+            user["termination_date"],
+            user["role"] == 0,
+        )
+        if date is None:
+            continue
+
+        scheduled_conditions.append(
+            ScheduledCondition(
+                condition_id=condition_id,
+                user_id=user_id,
+                fire_at=get_timed_condition_fire_at(
+                    date, time, user["timezone"] or org.timezone
+                ),
+            )
+        )
+
+    ScheduledCondition.objects.bulk_create(scheduled_conditions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sequences", "0045_alter_condition_condition_type"),
+        ("organization", "0044_remove_organization_credentials_login_and_more"),
+        ("users", "0042_remove_user_requires_otp_remove_user_totp_secret_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduledCondition",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fire_at", models.DateTimeField(db_index=True)),
+                (
+                    "condition",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_triggers",
+                        to="sequences.condition",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_conditions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("condition", "user")},
+            },
+        ),
+        migrations.RunPython(
+            schedule_timed_conditions, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,68 @@
+import hashlib
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def get_trigger_signature(to_do_ids, admin_task_ids):
+    # Copy of Condition.get_trigger_signature at the time of this migration
+    to_do_ids = sorted(to_do_ids)
+    admin_task_ids = sorted(admin_task_ids)
+    if not to_do_ids and not admin_task_ids:
+        return ""
+
+    signature = "to_do:{};admin_tasks:{}".format(
+        ",".join(str(id) for id in to_do_ids),
+        ",".join(str(id) for id in admin_task_ids),
+    )
+    return hashlib.sha256(signature.encode()).hexdigest()
+
+
+def set_trigger_signatures(apps, schema_editor):
+    Condition = apps.get_model("sequences", "Condition")
+
+    to_do_ids = defaultdict(list)
+    for condition_id, to_do_id in Condition.condition_to_do.through.objects.values_list(
+        "condition_id", "todo_id"
+    ):
+        to_do_ids[condition_id].append(to_do_id)
+
+    admin_task_ids = defaultdict(list)
+    for (
+        condition_id,
+        admin_task_id,
+    ) in Condition.condition_admin_tasks.through.objects.values_list(
+        "condition_id", "pendingadmintask_id"
+    ):
+        admin_task_ids[condition_id].append(admin_task_id)
+
+    conditions = []
+    for condition_id in set(to_do_ids) | set(admin_task_ids):
+        conditions.append(
+            Condition(
+                id=condition_id,
+                trigger_signature=get_trigger_signature(
+                    to_do_ids[condition_id], admin_task_ids[condition_id]
+                ),
+            )
+        )
+    Condition._default_manager.bulk_update(
+        conditions, ["trigger_signature"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sequences", "0046_scheduledcondition"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="condition",
+            name="trigger_signature",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=64
+            ),
+        ),
+        migrations.RunPython(set_trigger_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:50
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_triggers(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    ToDoUser = apps.get_model("users", "ToDoUser")
+    AdminTask = apps.get_model("admin_tasks", "AdminTask")
+    TriggerCounter = apps.get_model("sequences", "TriggerCounter")
+
+    completed_to_dos = set(
+        ToDoUser._default_manager.filter(completed=True).values_list(
+            "user_id", "to_do_id"
+        )
+    )
+    completed_admin_tasks = set(
+        AdminTask._default_manager.filter(completed=True).values_list(
+            "new_hire_id", "based_on_id"
+        )
+    )
+
+    remaining = defaultdict(int)
+    # TODO = 1, ADMIN_TASK = 4
+    for condition_type, trigger_field, completed in [
+        (1, "condition_to_do", completed_to_dos),
+        (4, "condition_admin_tasks", completed_admin_tasks),
+    ]:
+        for user_id, condition_id, trigger_id in User.conditions.through.objects.filter(
+            condition__condition_type=condition_type,
+            **{f"condition__{trigger_field}__isnull": False},
+        ).values_list("user_id", "condition_id", f"condition__{trigger_field}__id"):
+            remaining[(user_id, condition_id)] += (user_id, trigger_id) not in completed
+
+    TriggerCounter._default_manager.bulk_create(
+        [
+            TriggerCounter(user_id=user_id, condition_id=condition_id, remaining=amount)
+            for (user_id, condition_id), amount in remaining.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sequences", "0047_condition_trigger_signature"),
+        ("admin_tasks", "0013_admintask_hardware"),
+        ("users", "0042_remove_user_requires_otp_remove_user_totp_secret_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TriggerCounter",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("remaining", models.IntegerField()),
+                (
+                    "condition",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trigger_counters",
+                        to="sequences.condition",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trigger_counters",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("condition", "user")},
+            },
+        ),
+        migrations.RunPython(count_triggers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,14 @@
+import hashlib
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.db import connection, models, transaction
 from django.db.models import Prefetch
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
@@ -16,13 +24,19 @@ from admin.preboarding.models import Preboarding
 from admin.resources.models import Resource
 from admin.sequences.emails import send_sequence_message
 from admin.sequences.querysets import ConditionQuerySet
+from admin.sequences.schedule import (
+    get_timed_condition_date,
+    get_timed_condition_fire_at,
+)
 from admin.to_do.models import ToDo
 from misc.fields import ContentJSONField, EncryptedJSONField
-from misc.mixins import ContentMixin
+from misc.mixins import ContentMixin, TrackChangesMixin
 from organization.models import Notification
 from slack_bot.models import SlackChannel
 from slack_bot.utils import Slack
 
+logger = logging.getLogger(__name__)
+
 
 class OnboardingSequenceManager(models.Manager):
     def get_queryset(self):
@@ -82,6 +96,12 @@ class Sequence(models.Model):
         return self
 
     def assign_to_user(self, user):
+        user_conditions_through = get_user_model().conditions.through
+        # The items/triggers are copied and the new conditions are scheduled/counted
+        # at the end, all at once
+        copies = []
+        new_condition_ids = []
+
         # adding conditions
         for sequence_condition in self.conditions.all():
             user_condition = None
@@ -98,60 +118,16 @@ class Sequence(models.Model):
                     time=sequence_condition.time,
                 ).first()
 
-            elif sequence_condition.condition_type == Condition.Type.TODO:
-                # For to_do items, filter all condition items to find if one matches
-                # Both the amount and the todos itself need to match exactly
-                conditions = user.conditions.filter(condition_type=Condition.Type.TODO)
-                original_condition_to_do_ids = (
-                    sequence_condition.condition_to_do.all().values_list(
-                        "id", flat=True
-                    )
-                )
-
-                for condition in conditions:
-                    # Quickly check if the amount of items match - if not match, drop
-                    if condition.condition_to_do.all().count() != len(
-                        original_condition_to_do_ids
-                    ):
-                        continue
-
-                    found_to_do_items = condition.condition_to_do.filter(
-                        id__in=original_condition_to_do_ids
-                    ).count()
-
-                    if found_to_do_items == len(original_condition_to_do_ids):
-                        # We found our match. Amount matches AND the todos match
-                        user_condition = condition
-                        break
-
-            elif sequence_condition.condition_type == Condition.Type.ADMIN_TASK:
-                # For admin to do items, filter all condition items to find if one
-                # matches. Both the amount and the admin to do itself need to match
-                # exactly
-                conditions = user.conditions.filter(
-                    condition_type=Condition.Type.ADMIN_TASK
-                )
-                original_condition_admin_tasks_ids = (
-                    sequence_condition.condition_admin_tasks.all().values_list(
-                        "id", flat=True
-                    )
-                )
-
-                for condition in conditions:
-                    # Quickly check if the amount of items match - if not match, drop
-                    if condition.condition_admin_tasks.all().count() != len(  # noqa
-                        original_condition_admin_tasks_ids
-                    ):
-                        continue
-
-                    found_admin_tasks = condition.condition_admin_tasks.filter(
-                        id__in=original_condition_admin_tasks_ids
-                    ).count()
-
-                    if found_admin_tasks == len(original_condition_admin_tasks_ids):
-                        # We found our match. Amount matches AND the admin_tasks match
-                        user_condition = condition
-                        break
+            elif sequence_condition.condition_type in [
+                Condition.Type.TODO,
+                Condition.Type.ADMIN_TASK,
+            ]:
+                # Both the amount and the to do/admin task items itself need to match
+                # exactly. Conditions with the same triggers have the same signature
+                user_condition = user.conditions.filter(
+                    condition_type=sequence_condition.condition_type,
+                    trigger_signature=sequence_condition.trigger_signature,
+                ).first()
 
             elif (
                 sequence_condition.condition_type == Condition.Type.INTEGRATIONS_REVOKED
@@ -169,98 +145,167 @@ class Sequence(models.Model):
             # Let's add the condition to the new hire. Either through adding it to the
             # exising one or creating a new one
             if user_condition is not None:
-                # adding items to existing condition
-                user_condition.include_other_condition(sequence_condition)
+                # adding items to existing condition (not the triggers)
+                copies.append((user_condition.id, sequence_condition.id, False))
             else:
-                # duplicating condition and adding to user
-                # Force getting it, as we are about to duplicate it and set the pk to
-                # None
-                old_condition = Condition.objects.get(id=sequence_condition.id)
+                # duplicating condition and adding to user. The signature is copied
+                # over with the other fields
+                old_condition_id = sequence_condition.id
 
                 sequence_condition.pk = None
                 sequence_condition.sequence = None
                 sequence_condition.save()
 
-                # Add condition to_dos
-                sequence_condition.condition_to_do.set(
-                    old_condition.condition_to_do.all()
+                # Add condition to_dos/admin tasks and all the things that get
+                # triggered
+                copies.append((sequence_condition.id, old_condition_id, True))
+
+                # Add newly created condition back to user. This skips the signal
+                # that schedules/counts the condition
+                user_conditions_through.objects.create(
+                    user=user, condition=sequence_condition
                 )
+                new_condition_ids.append(sequence_condition.id)
+
+        Condition.objects.copy_items(copies)
+        if new_condition_ids:
+            ScheduledCondition.objects.schedule_for_users([user.id], new_condition_ids)
+            TriggerCounter.objects.count_for_users([user.id], new_condition_ids)
+
+    def assign_to_users(self, users):
+        # Same as `assign_to_user`, but for a group of users at once. Merging
+        # conditions is done in memory, so the amount of queries doesn't grow with
+        # the amount of users (except for conditions without a trigger).
+        user_conditions_through = get_user_model().conditions.through
+        users = list(users)
+        sequence_conditions = list(self.conditions.order_by("id"))
+
+        # The conditions the users already have, by the key they get merged on
+        user_conditions = {user.id: {} for user in users}
+        for user_condition in (
+            user_conditions_through.objects.filter(user__in=users)
+            .select_related("condition")
+            .order_by("condition_id")
+        ):
+            condition = user_condition.condition
+            user_conditions[user_condition.user_id].setdefault(
+                condition.merge_key, condition
+            )
 
-                for condition_admin_task in old_condition.condition_admin_tasks.all():
-                    sequence_condition.condition_admin_tasks.add(condition_admin_task)
-                # Add all the things that get triggered
-                sequence_condition.include_other_condition(old_condition)
+        new_conditions = []
+        copies = []
+        for sequence_condition in sequence_conditions:
+            merge_key = sequence_condition.merge_key
+            if merge_key is None:
+                continue
 
-                # Add newly created condition back to user
-                user.conditions.add(sequence_condition)
+            for user in users:
+                user_condition = user_conditions[user.id].get(merge_key)
+                is_new = user_condition is None
+                if is_new:
+                    # duplicating condition and adding to user
+                    user_condition = Condition(
+                        **{
+                            field.attname: getattr(sequence_condition, field.attname)
+                            for field in Condition._meta.concrete_fields
+                            if not field.primary_key
+                        }
+                    )
+                    user_condition.sequence = None
+                    new_conditions.append((user, user_condition))
+                    user_conditions[user.id][merge_key] = user_condition
+
+                # Only new conditions get the triggers
+                copies.append((user_condition, sequence_condition, is_new))
+
+        Condition.objects.bulk_create([condition for _, condition in new_conditions])
+        Condition.objects.copy_items(
+            [
+                (user_condition.id, sequence_condition.id, triggers)
+                for user_condition, sequence_condition, triggers in copies
+            ]
+        )
+        user_conditions_through.objects.bulk_create(
+            [
+                user_conditions_through(user=user, condition=condition)
+                for user, condition in new_conditions
+            ]
+        )
+        # Bulk inserts skip the signal that schedules/counts the conditions
+        if new_conditions:
+            ScheduledCondition.objects.schedule_for_users(
+                [user.id for user in users],
+                [condition.id for _, condition in new_conditions],
+            )
+            TriggerCounter.objects.count_for_users(
+                [user.id for user in users],
+                [condition.id for _, condition in new_conditions],
+            )
+
+        # Conditions without a trigger are processed directly (type == 3)
+        for sequence_condition in sequence_conditions:
+            if sequence_condition.merge_key is None:
+                for user in users:
+                    sequence_condition.process_condition(user)
 
     def remove_from_user(self, new_hire):
-        from admin.admin_tasks.models import AdminTask
+        # Removes the items of this sequence from the new hire and their conditions.
+        # The items are used as subqueries, so the amount of queries doesn't depend
+        # on the amount of conditions.
+        user_model = get_user_model()
+        user_conditions = new_hire.conditions.all()
 
-        # get all items from all conditions
-        to_dos = ToDo.objects.none()
-        badges = Badge.objects.none()
-        resources = Resource.objects.none()
-        admin_tasks = AdminTask.objects.none()
-        external_messages = ExternalMessage.objects.none()
-        introductions = Introduction.objects.none()
-        preboarding = Preboarding.objects.none()
-        appointments = Appointment.objects.none()
-        integration_configs = IntegrationConfig.objects.none()
-        hardware = Hardware.objects.none()
-
-        # TODO: this is going to make a lot of queries, should be optimized
-        for condition in self.conditions.all():
-            to_dos |= condition.to_do.all()
-            badges |= condition.badges.all()
-            resources |= condition.resources.all()
-            admin_tasks |= condition.admin_tasks.all()
-            external_messages |= condition.external_messages.all()
-            introductions |= condition.introductions.all()
-            preboarding |= condition.preboarding.all()
-            appointments |= condition.appointments.all()
-            integration_configs |= condition.integration_configs.all()
-            hardware |= condition.hardware.all()
-
-        # Cycle through new hire's item and remove the ones that aren't supposed to
-        # be there
-        new_hire.to_do.remove(*to_dos)
-        new_hire.badges.remove(*badges)
-        new_hire.appointments.remove(*appointments)
-        new_hire.preboarding.remove(*preboarding)
-        new_hire.introductions.remove(*introductions)
-        new_hire.hardware.remove(*hardware)
-
-        # Do the same with the conditions
-        conditions_to_be_deleted = []
-        items = {
-            "to_do": to_dos,
-            "resources": resources,
-            "badges": badges,
-            "admin_tasks": admin_tasks,
-            "external_messages": external_messages,
-            "introductions": introductions,
-            "preboarding": preboarding,
-            "appointments": appointments,
-            "integration_configs": integration_configs,
-            "hardware": hardware,
-        }
-        for condition in new_hire.conditions.all():
-            for field in condition._meta.many_to_many:
-                # We only want to remove assigned items, not triggers
-                if field.name in ("condition_to_do", "condition_admin_tasks"):
-                    continue
-                getattr(condition, field.name).remove(*items[field.name])
+        for field in Condition._meta.many_to_many:
+            # We only want to remove assigned items, not triggers
+            if field.name in ("condition_to_do", "condition_admin_tasks"):
+                continue
+
+            through = field.remote_field.through
+            item_column = f"{field.m2m_reverse_field_name()}_id"
+            item_ids = through.objects.filter(condition__sequence=self).values(
+                item_column
+            )
 
-            if condition.is_empty:
-                conditions_to_be_deleted.append(condition.id)
+            # Remove the items from the new hire's conditions
+            through.objects.filter(
+                condition__in=user_conditions, **{f"{item_column}__in": item_ids}
+            ).delete()
+
+            # And from the new hire itself (resources are kept)
+            if field.name in (
+                "to_do",
+                "badges",
+                "appointments",
+                "preboarding",
+                "introductions",
+                "hardware",
+            ):
+                user_field = user_model._meta.get_field(field.name)
+                user_through = user_field.remote_field.through
+                user_through.objects.filter(
+                    **{
+                        f"{user_field.m2m_field_name()}": new_hire,
+                        f"{user_field.m2m_reverse_field_name()}_id__in": item_ids,
+                    }
+                ).delete()
 
         # Remove all empty conditions
-        Condition.objects.filter(id__in=conditions_to_be_deleted).delete()
-        # Delete sequence
-        Notification.objects.order_by("-created").filter(
-            notification_type=Notification.Type.ADDED_SEQUENCE
-        ).first().delete()
+        Condition.objects.filter(id__in=user_conditions.empty().values("id")).delete()
+        # Completed to do items might have been removed
+        TriggerCounter.objects.count_for_users([new_hire.id])
+
+        # Delete the notification of adding this sequence to the new hire
+        notification = (
+            Notification.objects.filter(
+                notification_type=Notification.Type.ADDED_SEQUENCE,
+                created_for=new_hire,
+                item_id=self.id,
+            )
+            .order_by("-created")
+            .first()
+        )
+        if notification is not None:
+            notification.delete()
 
 
 class ExternalMessageManager(models.Manager):
@@ -570,6 +615,64 @@ class PendingAdminTask(models.Model):
         return self
 
 
+class IntegrationConfigManager(models.Manager):
+    def execute(self, integration_configs, user):
+        """
+        Executes the integration configs for the user. Automated integrations that
+        don't depend on each other are executed at the same time, with at most
+        `INTEGRATION_PROVISIONING_WORKERS` at once. A failing integration doesn't
+        stop the others, the first error is raised once all of them are done.
+        """
+        # Configs of the same integration run after each other in the same worker, as
+        # they share the integration's tokens (which might get renewed)
+        concurrent = defaultdict(list)
+        for integration_config in integration_configs:
+            if integration_config.runs_concurrently:
+                concurrent[integration_config.integration_id].append(integration_config)
+            else:
+                integration_config.execute(user)
+
+        workers = min(settings.INTEGRATION_PROVISIONING_WORKERS, len(concurrent))
+        if workers <= 1:
+            for configs in concurrent.values():
+                for integration_config in configs:
+                    integration_config.execute(user)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_execute_in_thread, configs, user)
+                for configs in concurrent.values()
+            ]
+        errors = []
+        for future in futures:
+            for integration_config, error in future.result():
+                logger.error(
+                    "Integration %s failed for user %s",
+                    integration_config.integration_id,
+                    user.id,
+                    exc_info=error,
+                )
+                errors.append(error)
+        if errors:
+            raise errors[0]
+
+
+def _execute_in_thread(integration_configs, user):
+    # Returns the configs that failed, with their error
+    errors = []
+    try:
+        for integration_config in integration_configs:
+            try:
+                integration_config.execute(user)
+            except Exception as error:
+                errors.append((integration_config, error))
+    finally:
+        # Every thread gets its own database connection
+        connection.close()
+    return errors
+
+
 class IntegrationConfig(models.Model):
     class PersonType(models.IntegerChoices):
         MANAGER = 1, _("Manager")
@@ -604,10 +707,23 @@ class IntegrationConfig(models.Model):
             self.person_type == IntegrationConfig.PersonType.BUDDY,
         )
 
+    objects = IntegrationConfigManager()
+
     @property
     def name(self):
         return self.integration.name
 
+    @property
+    def runs_concurrently(self):
+        # Integrations that store data on the user could be used by other
+        # integrations, so those always run first and one by one
+        if self.integration is None or self.integration.skip_user_provisioning:
+            return False
+        return not any(
+            "store_data" in item
+            for item in (self.integration.manifest or {}).get("execute", [])
+        )
+
     def get_icon_template(self):
         return render_to_string("_integration_config.html")
 
@@ -714,8 +830,44 @@ class ConditionPrefetchManager(models.Manager):
             .order_by("days_order", "time")
         )
 
+    def copy_items(self, copies):
+        """
+        Copies the many to many rows of conditions in bulk (two queries per field,
+        regardless of the amount of copies). This skips the m2m_changed signal, so
+        the trigger signature is not recalculated.
+
+        :param copies list: (to condition id, from condition id, include triggers)
+        """
+        if not copies:
+            return
+
+        from_condition_ids = {from_id for _, from_id, _ in copies}
+        for field in self.model._meta.many_to_many:
+            through = field.remote_field.through
+            condition_column = f"{field.m2m_field_name()}_id"
+            item_column = f"{field.m2m_reverse_field_name()}_id"
+            is_trigger = field.name in ("condition_to_do", "condition_admin_tasks")
+            if is_trigger and not any(triggers for _, _, triggers in copies):
+                continue
+
+            item_ids = defaultdict(list)
+            for condition_id, item_id in through.objects.filter(
+                **{f"{condition_column}__in": from_condition_ids}
+            ).values_list(condition_column, item_column):
+                item_ids[condition_id].append(item_id)
+
+            through.objects.bulk_create(
+                [
+                    through(**{condition_column: to_id, item_column: item_id})
+                    for to_id, from_id, triggers in copies
+                    if triggers or not is_trigger
+                    for item_id in item_ids[from_id]
+                ],
+                ignore_conflicts=True,
+            )
+
 
-class Condition(models.Model):
+class Condition(TrackChangesMixin, models.Model):
     class Type(models.IntegerChoices):
         AFTER = 0, _("After new hire has started")
         TODO = 1, _("Based on one or more to do item(s)")
@@ -752,9 +904,27 @@ class Condition(models.Model):
     appointments = models.ManyToManyField(Appointment)
     integration_configs = models.ManyToManyField(IntegrationConfig)
     hardware = models.ManyToManyField(Hardware)
+    # Hash of the condition_to_do and condition_admin_tasks ids, kept up to date
+    # through the m2m_changed signal
+    trigger_signature = models.CharField(
+        max_length=64, default="", editable=False, db_index=True
+    )
 
     objects = ConditionPrefetchManager.from_queryset(ConditionQuerySet)()
 
+    def save(self, *args, **kwargs):
+        reschedule = self.pk is not None and self.has_changed(
+            "condition_type", "days", "time"
+        )
+        super().save(*args, **kwargs)
+        self.reset_loaded_values()
+
+        # Update the moments this condition triggers for the users that have it
+        if reschedule:
+            ScheduledCondition.objects.schedule_for_users(
+                self.user_set.values_list("id", flat=True), [self.id]
+            )
+
     @property
     def is_empty(self):
         return not (
@@ -815,14 +985,44 @@ class Condition(models.Model):
 
     def include_other_condition(self, condition):
         # this will put another condition into this one
-        for field in self._meta.many_to_many:
-            # We only want to add assigned items, not triggers
-            if field.name in ("condition_to_do", "condition_admin_tasks"):
-                continue
+        # We only want to add assigned items, not triggers
+        Condition.objects.copy_items([(self.id, condition.id, False)])
+
+    @property
+    def merge_key(self):
+        # Conditions of a user with the same key are merged into one. Conditions
+        # without a trigger never get merged (they are processed directly).
+        if self.condition_type in [Condition.Type.BEFORE, Condition.Type.AFTER]:
+            return (self.condition_type, self.days, self.time)
+        if self.condition_type in [Condition.Type.TODO, Condition.Type.ADMIN_TASK]:
+            return (self.condition_type, self.trigger_signature)
+        if self.condition_type == Condition.Type.INTEGRATIONS_REVOKED:
+            return (self.condition_type,)
+        return None
+
+    @staticmethod
+    def get_trigger_signature(to_do_ids, admin_task_ids):
+        # Canonical representation of the triggers, so conditions with the exact
+        # same triggers can be found with a single lookup. No triggers is empty.
+        to_do_ids = sorted(to_do_ids)
+        admin_task_ids = sorted(admin_task_ids)
+        if not to_do_ids and not admin_task_ids:
+            return ""
+
+        signature = "to_do:{};admin_tasks:{}".format(
+            ",".join(str(id) for id in to_do_ids),
+            ",".join(str(id) for id in admin_task_ids),
+        )
+        return hashlib.sha256(signature.encode()).hexdigest()
 
-            condition_field = getattr(condition, field.name)
-            for item in condition_field.all():
-                getattr(self, field.name).add(item)
+    def update_trigger_signature(self):
+        self.trigger_signature = Condition.get_trigger_signature(
+            self.condition_to_do.values_list("id", flat=True),
+            self.condition_admin_tasks.values_list("id", flat=True),
+        )
+        Condition.objects.filter(id=self.id).update(
+            trigger_signature=self.trigger_signature
+        )
 
     def duplicate(self, admin_tasks):
         old_condition = Condition.objects.get(id=self.id)
@@ -879,7 +1079,9 @@ class Condition(models.Model):
         return self, admin_tasks
 
     def process_condition(self, user, skip_notification=False):
-        # Loop over all m2m fields and add the ones that can be easily added
+        # Loop over all m2m fields and add the ones that can be easily added. All
+        # items of a field are added at once, notifications are created in bulk.
+        notifications = []
         for field in [
             "to_do",
             "resources",
@@ -888,10 +1090,13 @@ class Condition(models.Model):
             "introductions",
             "preboarding",
         ]:
-            for item in getattr(self, field).all():
-                getattr(user, field).add(item)
+            items = list(getattr(self, field).all())
+            if not items:
+                continue
 
-                Notification.objects.create(
+            getattr(user, field).add(*items)
+            notifications += [
+                Notification(
                     notification_type=item.notification_add_type,
                     extra_text=item.name,
                     created_for=user,
@@ -899,14 +1104,309 @@ class Condition(models.Model):
                     notified_user=skip_notification,
                     public_to_new_hire=True,
                 )
+                for item in items
+            ]
+        Notification.objects.bulk_create(notifications)
 
         # For the ones that aren't a quick copy/paste, follow back to their model and
         # execute them. It will also add an item to the notification model there.
-        for field in [
-            "admin_tasks",
-            "external_messages",
-            "integration_configs",
-            "hardware",
-        ]:
+        for field in ["admin_tasks", "external_messages"]:
             for item in getattr(self, field).all():
                 item.execute(user)
+        IntegrationConfig.objects.execute(self.integration_configs.all(), user)
+        for item in self.hardware.all():
+            item.execute(user)
+
+
+class ScheduledConditionManager(models.Manager):
+    def due(self, start, end):
+        # Only return the ones that are still assigned to the user
+        return self.get_queryset().filter(
+            fire_at__gt=start, fire_at__lte=end, condition__user=models.F("user")
+        )
+
+    def schedule_for_users(self, user_ids, condition_ids=None):
+        """
+        (Re)calculates when the timed conditions of these users trigger. Should be
+        called whenever conditions get assigned or when the start day, termination
+        date or timezone of the users change.
+
+        :param user_ids list: ids of the users
+        :param condition_ids list: only (re)schedule these conditions, all
+            conditions of the users if `None`
+        """
+        from organization.models import Organization
+
+        user_ids = list(user_ids)
+        scheduled = self.get_queryset().filter(user_id__in=user_ids)
+        user_conditions = get_user_model().conditions.through.objects.filter(
+            user_id__in=user_ids
+        )
+        if condition_ids is not None:
+            condition_ids = list(condition_ids)
+            scheduled = scheduled.filter(condition_id__in=condition_ids)
+            user_conditions = user_conditions.filter(condition_id__in=condition_ids)
+        scheduled.delete()
+
+        org = Organization.object.get()
+        if not len(user_ids) or org is None:
+            return
+
+        users = {
+            user["id"]: user
+            for user in get_user_model()
+            .objects.filter(id__in=user_ids)
+            .values("id", "role", "start_day", "termination_date", "timezone")
+        }
+        user_conditions = user_conditions.filter(
+            condition__condition_type__in=[
+                Condition.Type.BEFORE,
+                Condition.Type.AFTER,
+            ],
+        ).values_list(
+            "user_id",
+            "condition_id",
+            "condition__condition_type",
+            "condition__days",
+            "condition__time",
+        )
+
+        scheduled_conditions = []
+        for user_id, condition_id, condition_type, days, time in user_conditions:
+            user = users[user_id]
+            date = get_timed_condition_date(
+                condition_type,
+                days,
+                user["start_day"],
+                user["termination_date"],
+                user["role"] == get_user_model().Role.NEWHIRE,
+            )
+            if date is None:
+                continue
+
+            scheduled_conditions.append(
+                ScheduledCondition(
+                    condition_id=condition_id,
+                    user_id=user_id,
+                    fire_at=get_timed_condition_fire_at(
+                        date, time, user["timezone"] or org.timezone
+                    ),
+                )
+            )
+
+        self.bulk_create(scheduled_conditions)
+
+
+class ScheduledCondition(models.Model):
+    """
+    The moment (UTC) on which a timed (before/after) condition triggers for a user.
+    This is kept up to date, so the timed triggers only need to query this table.
+    """
+
+    condition = models.ForeignKey(
+        Condition, on_delete=models.CASCADE, related_name="scheduled_triggers"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="scheduled_conditions",
+    )
+    fire_at = models.DateTimeField(db_index=True)
+
+    objects = ScheduledConditionManager()
+
+    class Meta:
+        unique_together = ["condition", "user"]
+
+
+class TriggerCounterManager(models.Manager):
+    def count_for_users(self, user_ids, condition_ids=None):
+        """
+        (Re)counts the triggers that users still have to complete for their to do
+        and admin task based conditions. Should be called whenever conditions get
+        assigned, triggers change or completed triggers get removed.
+
+        :param user_ids list: ids of the users
+        :param condition_ids list: only (re)count these conditions, all conditions
+            of the users if `None`
+        """
+        from users.models import ToDoUser
+
+        user_ids = list(user_ids)
+        counters = self.get_queryset().filter(user_id__in=user_ids)
+        user_conditions = get_user_model().conditions.through.objects.filter(
+            user_id__in=user_ids
+        )
+        if condition_ids is not None:
+            condition_ids = list(condition_ids)
+            counters = counters.filter(condition_id__in=condition_ids)
+            user_conditions = user_conditions.filter(condition_id__in=condition_ids)
+        counters.delete()
+        if not len(user_ids):
+            return
+
+        completed_to_dos = set(
+            ToDoUser.objects.filter(user_id__in=user_ids, completed=True).values_list(
+                "user_id", "to_do_id"
+            )
+        )
+        completed_admin_tasks = set(
+            AdminTask.objects.filter(
+                new_hire_id__in=user_ids, completed=True
+            ).values_list("new_hire_id", "based_on_id")
+        )
+
+        remaining = defaultdict(int)
+        for condition_type, trigger_field, completed in [
+            (Condition.Type.TODO, "condition_to_do", completed_to_dos),
+            (Condition.Type.ADMIN_TASK, "condition_admin_tasks", completed_admin_tasks),
+        ]:
+            for (
+                user_id,
+                condition_id,
+                trigger_id,
+            ) in user_conditions.filter(
+                condition__condition_type=condition_type,
+                **{f"condition__{trigger_field}__isnull": False},
+            ).values_list("user_id", "condition_id", f"condition__{trigger_field}__id"):
+                remaining[(user_id, condition_id)] += (
+                    user_id,
+                    trigger_id,
+                ) not in completed
+
+        self.bulk_create(
+            [
+                TriggerCounter(
+                    user_id=user_id, condition_id=condition_id, remaining=amount
+                )
+                for (user_id, condition_id), amount in remaining.items()
+            ]
+        )
+
+    def complete(self, user, **trigger):
+        """
+        Lowers the remaining triggers of the conditions of the user that have this
+        trigger. The counters are locked while doing that, so two completions at the
+        same time can never both fire a condition.
+
+        :param user User: the user that completed the trigger
+        :param trigger: filter for the trigger, i.e. `condition__condition_to_do=x`
+        :return list: ids of the conditions that should be triggered now
+        """
+        with transaction.atomic():
+            counters = list(
+                self.get_queryset()
+                .select_for_update(of=("self",))
+                .filter(user=user, remaining__gt=0, **trigger)
+            )
+            for counter in counters:
+                counter.remaining -= 1
+            self.bulk_update(counters, ["remaining"])
+
+        return [counter.condition_id for counter in counters if counter.remaining == 0]
+
+    def reopen(self, user, **trigger):
+        """
+        Raises the remaining triggers of the conditions of the user that have this
+        trigger, as it has to be completed again.
+
+        :param user User: the user that has to complete the trigger again
+        :param trigger: filter for the trigger, i.e. `condition__condition_to_do=x`
+        """
+        self.get_queryset().filter(user=user, **trigger).update(
+            remaining=models.F("remaining") + 1
+        )
+
+
+class TriggerCounter(models.Model):
+    """
+    Amount of triggers (to do items or admin tasks) of a condition that a user still
+    has to complete. The condition triggers when this hits zero.
+    """
+
+    condition = models.ForeignKey(
+        Condition, on_delete=models.CASCADE, related_name="trigger_counters"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="trigger_counters",
+    )
+    remaining = models.IntegerField()
+
+    objects = TriggerCounterManager()
+
+    class Meta:
+        unique_together = ["condition", "user"]
+
+
+def update_trigger_signatures(conditions):
+    # Updates the signatures of these conditions and recounts the triggers that the
+    # users that have them still need to complete
+    condition_ids = []
+    for condition in conditions:
+        condition.update_trigger_signature()
+        condition_ids.append(condition.id)
+    if not condition_ids:
+        return
+
+    TriggerCounter.objects.count_for_users(
+        get_user_model()
+        .objects.filter(conditions__in=condition_ids)
+        .values_list("id", flat=True)
+        .distinct(),
+        condition_ids,
+    )
+
+
+def get_trigger_condition_ids(trigger):
+    # Ids of the conditions that have this to do item/admin task as trigger
+    field = "condition_to_do" if isinstance(trigger, ToDo) else "condition_admin_tasks"
+    return list(
+        Condition.objects.filter(**{field: trigger}).values_list("id", flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Condition.condition_to_do.through)
+@receiver(m2m_changed, sender=Condition.condition_admin_tasks.through)
+def update_condition_trigger_signature(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if reverse and action == "pre_clear":
+        # Triggers get cleared from the to do/admin task side. `pk_set` will be
+        # `None`, so remember which conditions had it
+        instance._trigger_condition_ids = get_trigger_condition_ids(instance)
+        return
+
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+
+    if not reverse:
+        update_trigger_signatures([instance])
+    elif action == "post_clear":
+        update_trigger_signatures(
+            Condition.objects.filter(
+                id__in=instance.__dict__.pop("_trigger_condition_ids", [])
+            )
+        )
+    elif pk_set:
+        # Triggers have been added/removed from the to do/admin task side
+        update_trigger_signatures(Condition.objects.filter(id__in=pk_set))
+
+
+@receiver(pre_delete, sender=ToDo)
+@receiver(pre_delete, sender=PendingAdminTask)
+def remember_trigger_conditions(sender, instance, **kwargs):
+    # Deleting a trigger removes it from the conditions without the m2m_changed
+    # signal, so remember which conditions had it
+    instance._trigger_condition_ids = get_trigger_condition_ids(instance)
+
+
+@receiver(post_delete, sender=ToDo)
+@receiver(post_delete, sender=PendingAdminTask)
+def update_deleted_trigger_signatures(sender, instance, **kwargs):
+    update_trigger_signatures(
+        Condition.objects.filter(
+            id__in=instance.__dict__.pop("_trigger_condition_ids", [])
+        )
+    )
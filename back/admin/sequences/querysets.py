@@ -1,5 +1,8 @@
+import operator
+from functools import reduce
+
 from django.db import models
-from django.db.models import Case, F, When
+from django.db.models import Case, Exists, F, OuterRef, When
 
 
 class ConditionQuerySet(models.QuerySet):
@@ -14,3 +17,18 @@ class ConditionQuerySet(models.QuerySet):
                 default=F("days"),
             )
         )
+
+    def empty(self):
+        # Conditions that don't have any items (triggers don't count)
+        from admin.sequences.models import Condition
+
+        items = [
+            Exists(
+                field.remote_field.through.objects.filter(
+                    **{field.m2m_field_name(): OuterRef("pk")}
+                )
+            )
+            for field in Condition._meta.many_to_many
+            if field.name not in ("condition_to_do", "condition_admin_tasks")
+        ]
+        return self.exclude(reduce(operator.or_, items))
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from misc.business_calendar import business_calendar
+
+
+def get_timed_condition_date(
+    condition_type, days, start_day, termination_date, is_new_hire
+):
+    """
+    Local date on which a timed (before/after) condition triggers for a user. This
+    follows the same rules as the workday helpers on the user model. Returns `None`
+    if the condition will never trigger for this user.
+
+    :param condition_type int: `Condition.Type` of the condition
+    :param days int: amount of days before/after of the condition
+    :param start_day date: first working day of the user
+    :param termination_date date: last working day of the user (offboarding)
+    :param is_new_hire bool: if the user has the new hire role
+    """
+    from admin.sequences.models import Condition
+
+    if termination_date is not None:
+        # Offboarding only has conditions before/on the last day. It triggers on the
+        # workday that has `days` workdays left until the termination date.
+        if condition_type != Condition.Type.BEFORE or days < 0:
+            return None
+        return business_calendar.add(termination_date + timedelta(days=1), -days - 1)
+
+    if not is_new_hire or start_day is None:
+        return None
+
+    if condition_type == Condition.Type.BEFORE:
+        # Not counting workdays here
+        if days < 1:
+            return None
+        return start_day - timedelta(days=days)
+
+    if condition_type == Condition.Type.AFTER:
+        if days < 1:
+            return None
+        if days == 1:
+            # The first workday never triggers in a weekend
+            return start_day if business_calendar.is_workday(start_day) else None
+        return business_calendar.add(start_day, days - 1)
+
+    return None
+
+
+def get_timed_condition_fire_at(date, time, timezone):
+    """
+    Converts the local date/time on which a condition triggers to UTC.
+
+    :param date date: local date on which the condition triggers
+    :param time time: local time on which the condition triggers
+    :param timezone str: name of the timezone of the user
+    """
+    local_tz = pytz.timezone(timezone)
+    return local_tz.localize(datetime.combine(date, time)).astimezone(pytz.utc)
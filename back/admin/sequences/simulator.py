@@ -0,0 +1,230 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from admin.sequences.schedule import (
+    get_timed_condition_date,
+    get_timed_condition_fire_at,
+)
+
+# Items that are given to the user when a condition triggers
+ITEM_FIELDS = [
+    "to_do",
+    "resources",
+    "badges",
+    "appointments",
+    "introductions",
+    "preboarding",
+    "admin_tasks",
+    "external_messages",
+    "integration_configs",
+    "hardware",
+]
+
+
+class CompiledCondition:
+    """
+    In memory copy of a condition and the names of its items. Simulating a timeline
+    only uses these, so it never hits the database.
+    """
+
+    def __init__(self, condition_type, days, time, items, condition_ids, merge_key):
+        self.condition_type = condition_type
+        self.days = days
+        self.time = time
+        # {field name: [item names]}
+        self.items = items
+        self.condition_ids = condition_ids
+        # Conditions without a trigger all fire directly, so merge those too
+        self.merge_key = merge_key or (condition_type,)
+
+    @property
+    def item_count(self):
+        return sum(len(items) for items in self.items.values())
+
+    def merge(self, other):
+        # Same as `Condition.include_other_condition`
+        for field, items in other.items.items():
+            self.items[field] = self.items.get(field, []) + items
+        self.condition_ids = self.condition_ids + other.condition_ids
+
+
+class TimelineEvent:
+    """
+    A condition that fires for a user. `fire_at` is in UTC.
+    """
+
+    def __init__(self, fire_at, condition):
+        self.fire_at = fire_at
+        self.condition = condition
+
+    def __repr__(self):
+        return (
+            f"<TimelineEvent {self.fire_at.isoformat()}: "
+            f"{self.condition.item_count} items>"
+        )
+
+
+def compile_conditions(conditions):
+    """
+    Loads the conditions and their items with a fixed amount of queries.
+
+    :param conditions QuerySet: conditions to compile
+    :return dict: {condition id: CompiledCondition}
+    """
+    from admin.sequences.models import Condition
+
+    prefetches = []
+    for field in ITEM_FIELDS:
+        items = Condition._meta.get_field(field).related_model.objects.all()
+        if field == "integration_configs":
+            # Name comes from the integration
+            items = items.select_related("integration")
+        else:
+            items = items.only("id", "name")
+        prefetches.append(Prefetch(field, queryset=items))
+    conditions = conditions.prefetch_related(*prefetches)
+
+    return {
+        condition.id: CompiledCondition(
+            condition_type=condition.condition_type,
+            days=condition.days,
+            time=condition.time,
+            items={
+                field: [item.name for item in getattr(condition, field).all()]
+                for field in ITEM_FIELDS
+            },
+            condition_ids=[condition.id],
+            merge_key=condition.merge_key,
+        )
+        for condition in conditions
+    }
+
+
+def compile_sequences(sequences):
+    """
+    Compiles the conditions of the sequences and merges them the same way
+    `Sequence.assign_to_user` does when they are assigned to one user.
+
+    :param sequences QuerySet: sequences to compile
+    :return list: CompiledCondition
+    """
+    from admin.sequences.models import Condition
+
+    compiled_conditions = compile_conditions(
+        Condition.objects.filter(sequence__in=sequences).order_by("id")
+    )
+
+    merged = {}
+    for condition in compiled_conditions.values():
+        if condition.merge_key in merged:
+            merged[condition.merge_key].merge(condition)
+        else:
+            merged[condition.merge_key] = condition
+    return list(merged.values())
+
+
+def simulate(
+    conditions,
+    start_day,
+    timezone_name,
+    days=30,
+    now=None,
+    termination_date=None,
+    is_new_hire=True,
+):
+    """
+    Returns the ordered timeline of the conditions that fire in the next `days`
+    days. Conditions without a trigger fire right away. Conditions that depend on
+    completed to do items, admin tasks or revoked integrations are left out, as
+    there is no way to know when they will trigger.
+
+    :param conditions list: CompiledCondition
+    :param start_day date: start day of the (hypothetical) new hire
+    :param timezone_name str: name of the timezone of the user
+    :param days int: amount of days to simulate
+    :param now datetime: moment the simulation starts (default: now)
+    :param termination_date date: last day of the user, if offboarding
+    :param is_new_hire bool: if the user has the new hire role
+    :return list: TimelineEvent
+    """
+    from admin.sequences.models import Condition
+
+    if now is None:
+        now = timezone.now()
+    end = now + timedelta(days=days)
+
+    timeline = []
+    for condition in conditions:
+        if condition.condition_type == Condition.Type.WITHOUT:
+            timeline.append(TimelineEvent(now, condition))
+            continue
+
+        if condition.condition_type not in [
+            Condition.Type.BEFORE,
+            Condition.Type.AFTER,
+        ]:
+            continue
+
+        date = get_timed_condition_date(
+            condition.condition_type,
+            condition.days,
+            start_day,
+            termination_date,
+            is_new_hire,
+        )
+        if date is None:
+            continue
+
+        # Conditions that should have fired already never fire anymore
+        fire_at = get_timed_condition_fire_at(date, condition.time, timezone_name)
+        if now < fire_at <= end:
+            timeline.append(TimelineEvent(fire_at, condition))
+
+    return sorted(timeline, key=lambda event: event.fire_at)
+
+
+def simulate_users(users, days=30, now=None):
+    """
+    Simulates the timeline of the conditions that are assigned to the users. The
+    amount of queries doesn't depend on the amount of users.
+
+    :param users list: users to simulate
+    :param days int: amount of days to simulate
+    :param now datetime: moment the simulation starts (default: now)
+    :return dict: {user id: [TimelineEvent]}
+    """
+    from admin.sequences.models import Condition
+    from organization.models import Organization
+
+    org = Organization.object.get()
+    users = list(users)
+
+    user_conditions = {user.id: [] for user in users}
+    for user_id, condition_id in (
+        get_user_model()
+        .conditions.through.objects.filter(user__in=users)
+        .values_list("user_id", "condition_id")
+    ):
+        user_conditions[user_id].append(condition_id)
+
+    compiled_conditions = compile_conditions(
+        Condition.objects.filter(
+            id__in={id for ids in user_conditions.values() for id in ids}
+        )
+    )
+
+    return {
+        user.id: simulate(
+            [compiled_conditions[id] for id in user_conditions[user.id]],
+            start_day=user.start_day,
+            timezone_name=user.timezone or org.timezone,
+            days=days,
+            now=now,
+            termination_date=user.termination_date,
+            is_new_hire=user.role == get_user_model().Role.NEWHIRE,
+        )
+        for user in users
+    }
@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django_q.tasks import async_task
@@ -8,7 +9,7 @@ from django_q.tasks import async_task
 from admin.badges.models import Badge
 from admin.introductions.models import Introduction
 from admin.sequences.emails import send_sequence_update_message
-from admin.sequences.models import Condition
+from admin.sequences.models import Condition, ScheduledCondition
 from organization.models import Notification, Organization
 from slack_bot.slack_intro import SlackIntro
 from slack_bot.slack_resource import SlackResource
@@ -16,6 +17,9 @@ from slack_bot.slack_to_do import SlackToDo
 from slack_bot.utils import Slack, paragraph
 from users.models import ResourceUser, ToDoUser
 
+# Max amount of conditions that get scheduled per transaction when catching up
+TIMED_TRIGGERS_CHUNK_SIZE = 500
+
 
 def process_condition(condition_id, user_id, send_email=True):
     """
@@ -126,101 +130,81 @@ def process_condition(condition_id, user_id, send_email=True):
     # Update notifications to not notify user again
     notifications.update(notified_user=True)
 
-    # Update user amount completed
-    user.update_progress()
-
 
 def timed_triggers():
     """
     This gets triggered every 5 minutes to trigger conditions within sequences.
-    These conditions are already assigned to new hires.
+    These conditions are already assigned to new hires and have been scheduled
+    through `ScheduledCondition`.
     """
-    org = Organization.object.get()
+    # Not the cached organization, the last check changes without saving the org
+    org = Organization.objects.first()
     if org is None:
         return
 
-    current_datetime = timezone.now()
-    last_updated = org.timed_triggers_last_check
+    current_datetime = _round_to_five_minutes(timezone.now())
+    # This should always be rounded on 5 or 0 already
+    last_updated = _round_to_five_minutes(org.timed_triggers_last_check)
 
-    # Round downwards (based on 5 minutes) - check if we might not be on 5/0 anymore.
-    # A time of 16 minutes becomes 15
-    off_by_minutes = current_datetime.minute % 5
-    current_datetime = current_datetime.replace(
-        minute=current_datetime.minute - off_by_minutes, second=0, microsecond=0
-    )
-
-    # Same for last_updated (though, this should always be rounded on 5 or 0 already)
-    off_by_minutes = last_updated.minute % 5
-    last_updated = last_updated.replace(
-        minute=last_updated.minute - off_by_minutes, second=0, microsecond=0
-    )
-
-    # Generally this loop will only go through once. In the case of an outage, it will
-    # walk through all the 5 minutes that it needs to catch up on based on the last
-    # updated variable
-    while current_datetime > last_updated:
-        last_updated += timedelta(minutes=5)
-        org.timed_triggers_last_check = last_updated
-        org.save()
-
-        for user in get_user_model().new_hires.all():
-            amount_days = user.workday
-            amount_days_before = user.days_before_starting
-            current_time = user.get_local_time(last_updated).time()
-
-            # Get conditions before/after they started
-            # Generally, this should be only one, but just in case, we can handle more
-            conditions = Condition.objects.none()
-            if amount_days == 0:
-                # Before starting
-                conditions = user.conditions.filter(
-                    condition_type=Condition.Type.BEFORE,
-                    days=amount_days_before,
-                    time=current_time,
-                )
-            elif user.get_local_time(last_updated).weekday() < 5:
-                # On workday x
-                conditions = user.conditions.filter(
-                    condition_type=Condition.Type.AFTER,
-                    days=amount_days,
-                    time=current_time,
-                )
+    if current_datetime <= last_updated:
+        return
 
-            # Schedule conditions to be executed with new scheduled task, we do this to
-            # avoid long standing tasks. I.e. sending lots of emails might take more
-            # time.
-            for i in conditions:
+    # In the case of an outage, we need to catch up on all conditions that should
+    # have triggered since the last check. Those are scheduled in chunks and the
+    # last check moves along with every chunk. If this task times out, the next
+    # run continues where this one stopped.
+    last_check = org.timed_triggers_last_check
+    while last_updated < current_datetime:
+        with transaction.atomic():
+            # Lock, so overlapping runs never schedule the same conditions twice
+            checkpoint = (
+                Organization.objects.select_for_update()
+                .values_list("timed_triggers_last_check", flat=True)
+                .get(id=org.id)
+            )
+            if checkpoint != last_check:
+                return
+
+            chunk_end = current_datetime
+            fire_at = list(
+                ScheduledCondition.objects.due(last_updated, current_datetime)
+                .order_by("fire_at")
+                .values_list("fire_at", flat=True)[TIMED_TRIGGERS_CHUNK_SIZE - 1 :][:1]
+            )
+            if len(fire_at):
+                # Include the rest of the 5 minute window of the last condition
+                # of this chunk, the last check is always rounded on 5 or 0
+                chunk_end = _round_to_five_minutes(fire_at[0])
+                if chunk_end < fire_at[0]:
+                    chunk_end += timedelta(minutes=5)
+                chunk_end = min(chunk_end, current_datetime)
+
+            Organization.objects.filter(id=org.id).update(
+                timed_triggers_last_check=chunk_end
+            )
+            Organization.object.clear_cache()
+
+            # Schedule conditions to be executed with new scheduled task, we do
+            # this to avoid long standing tasks. I.e. sending lots of emails might
+            # take more time.
+            for scheduled_condition in ScheduledCondition.objects.due(
+                last_updated, chunk_end
+            ).select_related("user"):
                 async_task(
                     process_condition,
-                    i.id,
-                    user.id,
-                    task_name=f"Process condition: {i.id} for {user.full_name}",
+                    scheduled_condition.condition_id,
+                    scheduled_condition.user_id,
+                    task_name=(
+                        f"Process condition: {scheduled_condition.condition_id} "
+                        f"for {scheduled_condition.user.full_name}"
+                    ),
                 )
 
-        for user in get_user_model().offboarding.all():
-            amount_days_before = user.days_before_termination_date
-
-            if (
-                amount_days_before == -1
-                or user.get_local_time(last_updated).weekday() > 4  # 5 or 6 is weekend
-            ):
-                # we are past the termination date or in a weekend, move to the next
-                continue
-
-            current_time = user.get_local_time(last_updated).time()
-            conditions = user.conditions.filter(
-                condition_type=Condition.Type.BEFORE,
-                days=amount_days_before,
-                time=current_time,
-            )
+        last_updated = last_check = chunk_end
 
-            # Schedule conditions to be executed with new scheduled task, we do this to
-            # avoid long standing tasks. I.e. sending lots of emails might take more
-            # time.
-            for i in conditions:
-                async_task(
-                    process_condition,
-                    i.id,
-                    user.id,
-                    task_name=f"Process condition: {i.id} for {user.full_name}",
-                )
+
+def _round_to_five_minutes(value):
+    # Round downwards. A time of 16 minutes becomes 15
+    return value.replace(
+        minute=value.minute - value.minute % 5, second=0, microsecond=0
+    )
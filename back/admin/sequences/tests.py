@@ -1,9 +1,14 @@
 import datetime
+import threading
 from datetime import timedelta
+from io import StringIO
 from unittest.mock import Mock, patch
 
 import pytest
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from freezegun import freeze_time
@@ -15,7 +20,7 @@ from admin.badges.factories import BadgeFactory
 from admin.badges.forms import BadgeForm
 from admin.hardware.factories import HardwareFactory
 from admin.hardware.forms import HardwareForm
-from admin.integrations.models import Integration
+from admin.integrations.models import Integration, IntegrationTracker
 from admin.introductions.factories import IntroductionFactory
 from admin.introductions.forms import IntroductionForm
 from admin.preboarding.factories import PreboardingFactory
@@ -44,8 +49,11 @@ from admin.sequences.models import (
     PendingEmailMessage,
     PendingSlackMessage,
     PendingTextMessage,
+    ScheduledCondition,
     Sequence,
+    TriggerCounter,
 )
+from admin.sequences.simulator import compile_sequences, simulate, simulate_users
 from admin.sequences.tasks import process_condition, timed_triggers
 from admin.to_do.factories import ToDoFactory
 from admin.to_do.forms import ToDoForm
@@ -1289,6 +1297,323 @@ def test_sequence_trigger_two_people_same_time(
     assert new_hire2.to_do.all().count() == 1
 
 
+@pytest.mark.django_db
+@freeze_time("2022-05-13")
+def test_schedule_timed_conditions(
+    sequence_factory, new_hire_factory, condition_timed_factory
+):
+    # Friday
+    new_hire = new_hire_factory(start_day=datetime.date(2022, 5, 16))
+    seq = sequence_factory()
+    after_condition = condition_timed_factory(days=3, time="09:00", sequence=seq)
+    before_condition = condition_timed_factory(
+        days=2, time="10:00", condition_type=Condition.Type.BEFORE, sequence=seq
+    )
+
+    new_hire.add_sequences([seq])
+
+    scheduled = ScheduledCondition.objects.filter(user=new_hire)
+    assert scheduled.count() == 2
+    user_after_condition = new_hire.conditions.get(condition_type=Condition.Type.AFTER)
+    user_before_condition = new_hire.conditions.get(
+        condition_type=Condition.Type.BEFORE
+    )
+    # third workday is Wednesday, two days before is Saturday
+    assert scheduled.get(condition=user_after_condition).fire_at == datetime.datetime(
+        2022, 5, 18, 9, 0, tzinfo=datetime.UTC
+    )
+    assert scheduled.get(condition=user_before_condition).fire_at == datetime.datetime(
+        2022, 5, 14, 10, 0, tzinfo=datetime.UTC
+    )
+    # sequence conditions are not scheduled themselves
+    assert not ScheduledCondition.objects.filter(
+        condition__in=[after_condition, before_condition]
+    ).exists()
+
+    # Start day on Friday, third workday is Tuesday now
+    new_hire.start_day = datetime.date(2022, 5, 20)
+    new_hire.timezone = "Europe/Amsterdam"
+    new_hire.save()
+    assert scheduled.get(condition=user_after_condition).fire_at == datetime.datetime(
+        2022, 5, 24, 7, 0, tzinfo=datetime.UTC
+    )
+
+    # Changing the condition itself also updates the schedule
+    user_after_condition.days = 1
+    user_after_condition.save()
+    assert scheduled.get(condition=user_after_condition).fire_at == datetime.datetime(
+        2022, 5, 20, 7, 0, tzinfo=datetime.UTC
+    )
+
+    # Removing the condition removes it from the schedule
+    new_hire.conditions.remove(user_after_condition)
+    assert not scheduled.filter(condition=user_after_condition).exists()
+
+    # Falls back to the org timezone
+    new_hire.timezone = ""
+    new_hire.save()
+    org = Organization.object.get()
+    org.timezone = "America/New_York"
+    org.save()
+    assert scheduled.get(condition=user_before_condition).fire_at == datetime.datetime(
+        2022, 5, 18, 14, 0, tzinfo=datetime.UTC
+    )
+
+
+@pytest.mark.django_db
+@freeze_time("2022-05-13")
+def test_schedule_only_changed_conditions(new_hire_factory, condition_timed_factory):
+    new_hire = new_hire_factory(start_day=datetime.date(2022, 5, 16))
+    condition1, condition2, condition3 = condition_timed_factory.create_batch(3)
+    new_hire.conditions.add(condition1)
+    scheduled1 = ScheduledCondition.objects.get(user=new_hire, condition=condition1)
+
+    # Existing rows are left alone when conditions are added/removed
+    new_hire.conditions.add(condition2, condition3)
+    new_hire.conditions.remove(condition2)
+    condition3.user_set.remove(new_hire)
+    assert list(ScheduledCondition.objects.filter(user=new_hire)) == [scheduled1]
+
+    new_hire.conditions.clear()
+    assert not ScheduledCondition.objects.filter(user=new_hire).exists()
+
+
+@pytest.mark.django_db
+@freeze_time("2022-05-13")
+def test_schedule_timed_conditions_offboarding(employee_factory):
+    # Last day is on a Sunday, so the last workday before that is Friday
+    employee = employee_factory(termination_date=datetime.date(2022, 5, 22))
+    last_day_condition = Condition.objects.create(
+        condition_type=Condition.Type.BEFORE, days=0, time="10:00"
+    )
+    day_before_condition = Condition.objects.create(
+        condition_type=Condition.Type.BEFORE, days=1, time="10:00"
+    )
+    employee.conditions.add(last_day_condition, day_before_condition)
+
+    scheduled = ScheduledCondition.objects.filter(user=employee)
+    assert scheduled.get(condition=last_day_condition).fire_at.date() == (
+        datetime.date(2022, 5, 20)
+    )
+    assert scheduled.get(condition=day_before_condition).fire_at.date() == (
+        datetime.date(2022, 5, 19)
+    )
+
+    # Not offboarding anymore, so nothing to schedule
+    employee.termination_date = None
+    employee.save()
+    assert not scheduled.exists()
+
+
+@pytest.mark.django_db
+@freeze_time("2022-05-10 12:00:00")
+def test_simulate_sequences(
+    sequence_factory, condition_timed_factory, to_do_factory, badge_factory
+):
+    seq1 = sequence_factory()
+    seq1.conditions.get(condition_type=Condition.Type.WITHOUT).to_do.add(
+        to_do_factory()
+    )
+    condition_timed_factory(days=3, time="09:00", sequence=seq1).to_do.add(
+        to_do_factory(name="Intro")
+    )
+    condition_timed_factory(
+        days=2, time="10:00", condition_type=Condition.Type.BEFORE, sequence=seq1
+    ).badges.add(badge_factory())
+    # Way past the simulated days
+    condition_timed_factory(days=60, sequence=seq1).to_do.add(to_do_factory())
+    seq2 = sequence_factory()
+    # Merged with the one from the first sequence
+    condition_timed_factory(days=3, time="09:00", sequence=seq2).to_do.add(
+        to_do_factory(name="Welcome")
+    )
+
+    conditions = compile_sequences(Sequence.objects.all())
+    assert len(conditions) == 4
+
+    # Start day on Monday
+    timeline = simulate(
+        conditions,
+        start_day=datetime.date(2022, 5, 16),
+        timezone_name="Europe/Amsterdam",
+        days=30,
+    )
+
+    assert [event.fire_at for event in timeline] == [
+        # Conditions without trigger fire directly
+        datetime.datetime(2022, 5, 10, 12, 0, tzinfo=datetime.UTC),
+        datetime.datetime(2022, 5, 14, 8, 0, tzinfo=datetime.UTC),
+        datetime.datetime(2022, 5, 18, 7, 0, tzinfo=datetime.UTC),
+    ]
+    assert timeline[0].condition.item_count == 1
+    assert sorted(timeline[2].condition.items["to_do"]) == ["Intro", "Welcome"]
+
+    # Conditions in the past don't fire anymore
+    timeline = simulate(
+        conditions,
+        start_day=datetime.date(2022, 5, 12),
+        timezone_name="UTC",
+        days=30,
+    )
+    assert [event.condition.condition_type for event in timeline] == [
+        Condition.Type.WITHOUT,
+        Condition.Type.AFTER,
+    ]
+
+
+@pytest.mark.django_db
+@freeze_time("2022-05-10 12:00:00")
+def test_simulate_users(
+    sequence_factory,
+    new_hire_factory,
+    condition_timed_factory,
+    condition_to_do_factory,
+    django_assert_max_num_queries,
+):
+    seq = sequence_factory()
+    condition_timed_factory(days=3, time="09:00", sequence=seq)
+    condition_timed_factory(
+        days=2, time="10:00", condition_type=Condition.Type.BEFORE, sequence=seq
+    )
+    condition_timed_factory(days=20, time="10:00", sequence=seq)
+    # Never part of the timeline
+    condition_to_do_factory(sequence=seq)
+
+    new_hires = [
+        new_hire_factory(start_day=datetime.date(2022, 5, 16)),
+        new_hire_factory(
+            start_day=datetime.date(2022, 5, 20), timezone="America/New_York"
+        ),
+        new_hire_factory(start_day=datetime.date(2022, 6, 1)),
+    ]
+    for new_hire in new_hires:
+        new_hire.add_sequences([seq])
+
+    with django_assert_max_num_queries(15):
+        timelines = simulate_users(new_hires, days=365)
+
+    # Same as what will actually be triggered
+    for new_hire in new_hires:
+        assert len(timelines[new_hire.id]) == 3
+        assert [event.fire_at for event in timelines[new_hire.id]] == list(
+            ScheduledCondition.objects.filter(user=new_hire)
+            .order_by("fire_at")
+            .values_list("fire_at", flat=True)
+        )
+
+    assert len(simulate_users(new_hires, days=10)[new_hires[0].id]) == 2
+
+
+@pytest.mark.django_db
+@freeze_time("2022-05-10 12:00:00")
+def test_simulate_timelines_command(
+    sequence_factory, new_hire_factory, condition_timed_factory, to_do_factory
+):
+    seq = sequence_factory(auto_add=True)
+    condition_timed_factory(days=1, time="09:00", sequence=seq).to_do.add(
+        to_do_factory(), to_do_factory()
+    )
+
+    out = StringIO()
+    call_command("simulate_timelines", users=10, spread=5, days=30, stdout=out)
+    output = out.getvalue()
+
+    # 10 new hires, each start day (Wednesday to Tuesday) has 2 of them. The
+    # (empty) condition without trigger fires directly.
+    assert "2022-05-10: 10 conditions, 0 items" in output
+    assert "2022-05-11: 2 conditions, 4 items" in output
+    assert "2022-05-17: 2 conditions, 4 items" in output
+    assert "Total: 20 conditions, 20 items" in output
+    assert "Busiest run: 2022-05-11T09:00:00+00:00 (UTC) with 2 conditions" in output
+
+    # Nothing was created
+    assert not ScheduledCondition.objects.exists()
+
+    new_hire = new_hire_factory(start_day=datetime.date(2022, 5, 16))
+    new_hire.add_sequences([seq])
+    out = StringIO()
+    call_command("simulate_timelines", new_hires=True, stdout=out)
+    assert "2022-05-16: 1 conditions, 2 items" in out.getvalue()
+
+
+@pytest.mark.django_db
+@freeze_time("2022-05-13 10:00")
+def test_timed_triggers_catch_up_only_due_conditions(new_hire_factory, to_do_factory):
+    org = Organization.object.get()
+    # Outage of an hour
+    org.timed_triggers_last_check = timezone.now() - timedelta(hours=1)
+    org.save()
+
+    new_hire1 = new_hire_factory()
+    new_hire2 = new_hire_factory()
+    to_do1 = to_do_factory()
+    to_do2 = to_do_factory()
+
+    missed_condition = Condition.objects.create(days=1, time="09:30")
+    missed_condition.add_item(to_do1)
+    future_condition = Condition.objects.create(days=1, time="10:05")
+    future_condition.add_item(to_do2)
+
+    new_hire1.conditions.add(missed_condition)
+    new_hire2.conditions.add(future_condition)
+
+    timed_triggers()
+
+    org.refresh_from_db()
+    assert org.timed_triggers_last_check == timezone.now()
+    assert list(new_hire1.to_do.all()) == [to_do1]
+    assert new_hire2.to_do.count() == 0
+
+
+@pytest.mark.django_db
+@freeze_time("2022-05-13 10:00")
+@patch("admin.sequences.tasks.TIMED_TRIGGERS_CHUNK_SIZE", 1)
+def test_timed_triggers_catch_up_in_chunks(new_hire_factory, to_do_factory):
+    org = Organization.object.get()
+    # Outage of an hour
+    org.timed_triggers_last_check = timezone.now() - timedelta(hours=1)
+    org.save()
+
+    new_hire1 = new_hire_factory()
+    new_hire2 = new_hire_factory()
+    to_do1 = to_do_factory()
+    to_do2 = to_do_factory()
+
+    condition1 = Condition.objects.create(days=1, time="09:12")
+    condition1.add_item(to_do1)
+    condition2 = Condition.objects.create(days=1, time="09:40")
+    condition2.add_item(to_do2)
+    new_hire1.conditions.add(condition1)
+    new_hire2.conditions.add(condition1)
+    new_hire1.conditions.add(condition2)
+
+    # Task gets killed after scheduling the first chunk
+    with patch(
+        "admin.sequences.tasks.async_task", Mock(side_effect=[None, None, Exception])
+    ) as async_task_mock:
+        with pytest.raises(Exception):
+            timed_triggers()
+
+    # Both conditions in the same 5 minute window got scheduled in the first chunk
+    assert async_task_mock.call_count == 3
+    assert {call.args[1:] for call in async_task_mock.call_args_list[:2]} == {
+        (condition1.id, new_hire1.id),
+        (condition1.id, new_hire2.id),
+    }
+    org.refresh_from_db()
+    assert org.timed_triggers_last_check == timezone.now().replace(minute=15) - (
+        timedelta(hours=1)
+    )
+
+    # Next run continues where the last one stopped
+    timed_triggers()
+
+    org.refresh_from_db()
+    assert org.timed_triggers_last_check == timezone.now()
+    assert list(new_hire1.to_do.all()) == [to_do2]
+    assert new_hire2.to_do.count() == 0
+
+
 # MODEL TESTS
 
 
@@ -1472,6 +1797,282 @@ def test_sequence_assign_to_user_merge_to_do_condition(
     assert new_hire.conditions.all().count() == 2
 
 
+@pytest.mark.django_db
+def test_trigger_counter(
+    sequence_factory, new_hire_factory, condition_to_do_factory, to_do_factory
+):
+    from users.models import ToDoUser
+
+    new_hire = new_hire_factory()
+    sequence = sequence_factory()
+    condition = condition_to_do_factory(sequence=sequence)
+    trigger1 = condition.condition_to_do.first()
+    trigger2 = to_do_factory()
+    condition.condition_to_do.add(trigger2)
+    to_do = to_do_factory()
+    condition.to_do.add(to_do)
+
+    new_hire.add_sequences([sequence])
+    user_condition = new_hire.conditions.get()
+    counter = TriggerCounter.objects.get(user=new_hire, condition=user_condition)
+    assert counter.remaining == 2
+
+    new_hire.to_do.add(trigger1, trigger2)
+    to_do_user1 = ToDoUser.objects.get(user=new_hire, to_do=trigger1)
+    to_do_user2 = ToDoUser.objects.get(user=new_hire, to_do=trigger2)
+
+    to_do_user1.mark_completed()
+    counter.refresh_from_db()
+    assert counter.remaining == 1
+    # Completing it again doesn't count
+    to_do_user1.mark_completed()
+    counter.refresh_from_db()
+    assert counter.remaining == 1
+
+    # Adding a trigger to the condition means it needs to be completed too
+    trigger3 = to_do_factory()
+    user_condition.condition_to_do.add(trigger3)
+    counter = TriggerCounter.objects.get(user=new_hire, condition=user_condition)
+    assert counter.remaining == 2
+    user_condition.condition_to_do.remove(trigger3)
+    counter = TriggerCounter.objects.get(user=new_hire, condition=user_condition)
+    assert counter.remaining == 1
+
+    to_do_user2.mark_completed()
+    counter.refresh_from_db()
+    assert counter.remaining == 0
+    # Condition got triggered, exactly once
+    assert new_hire.to_do.filter(id=to_do.id).exists()
+    assert (
+        Notification.objects.filter(
+            created_for=new_hire,
+            item_id=to_do.id,
+            notification_type=Notification.Type.ADDED_TODO,
+        ).count()
+        == 1
+    )
+
+    to_do_user2.mark_completed()
+    assert (
+        Notification.objects.filter(
+            created_for=new_hire,
+            item_id=to_do.id,
+            notification_type=Notification.Type.ADDED_TODO,
+        ).count()
+        == 1
+    )
+
+
+@pytest.mark.django_db
+def test_condition_trigger_signature(
+    condition_admin_task_factory, to_do_factory, pending_admin_task_factory
+):
+    condition1 = condition_admin_task_factory()
+    condition2 = condition_admin_task_factory()
+    to_do1 = to_do_factory()
+    to_do2 = to_do_factory()
+
+    # No triggers, no signature
+    assert condition1.trigger_signature == ""
+
+    condition1.condition_to_do.set([to_do1, to_do2])
+    # Reverse side (and different order) updates the signature as well
+    to_do2.condition_to_do.add(condition2)
+
+    condition1.refresh_from_db()
+    condition2.refresh_from_db()
+    assert condition1.trigger_signature != ""
+    assert condition1.trigger_signature != condition2.trigger_signature
+
+    to_do1.condition_to_do.add(condition2)
+    condition2.refresh_from_db()
+    assert condition1.trigger_signature == condition2.trigger_signature
+
+    # Admin tasks are part of the signature
+    condition2.condition_admin_tasks.add(pending_admin_task_factory())
+    condition2.refresh_from_db()
+    assert condition1.trigger_signature != condition2.trigger_signature
+
+    condition1.condition_to_do.clear()
+    condition1.refresh_from_db()
+    assert condition1.trigger_signature == ""
+
+
+@pytest.mark.django_db
+def test_condition_trigger_signature_reverse_clear_and_delete(
+    new_hire_factory,
+    condition_to_do_factory,
+    condition_admin_task_factory,
+    to_do_factory,
+    pending_admin_task_factory,
+):
+    from users.models import ToDoUser
+
+    new_hire = new_hire_factory()
+    condition1 = condition_to_do_factory()
+    condition2 = condition_admin_task_factory()
+    pending_admin_task = pending_admin_task_factory()
+    condition2.condition_admin_tasks.add(pending_admin_task)
+    to_do1 = to_do_factory()
+    to_do2 = to_do_factory()
+    condition1.condition_to_do.set([to_do1, to_do2])
+    new_hire.conditions.add(condition1, condition2)
+    ToDoUser.objects.create(user=new_hire, to_do=to_do2, completed=True)
+    to_do_signature = Condition.get_trigger_signature([to_do2.id], [])
+
+    # Clearing from the to do item side
+    to_do1.condition_to_do.clear()
+    condition1.refresh_from_db()
+    assert condition1.trigger_signature == to_do_signature
+    counter = TriggerCounter.objects.get(user=new_hire, condition=condition1)
+    assert counter.remaining == 0
+
+    # Deleting the triggers
+    to_do2.delete()
+    condition1.refresh_from_db()
+    assert condition1.trigger_signature == ""
+    pending_admin_task.delete()
+    condition2.refresh_from_db()
+    assert condition2.trigger_signature == ""
+    assert not TriggerCounter.objects.filter(user=new_hire).exists()
+
+
+@pytest.mark.django_db
+def test_sequence_assign_to_user_query_count(
+    sequence_factory, new_hire_factory, condition_to_do_factory, to_do_factory
+):
+    def assign_to_user(existing):
+        new_hire = new_hire_factory()
+        for i in range(existing):
+            sequence = sequence_factory()
+            condition = condition_to_do_factory(sequence=sequence)
+            condition.to_do.add(to_do_factory(), to_do_factory())
+            sequence.assign_to_user(new_hire)
+
+        sequence = sequence_factory()
+        for i in range(5):
+            condition = condition_to_do_factory(sequence=sequence)
+            condition.to_do.add(to_do_factory())
+
+        with CaptureQueriesContext(connection) as queries:
+            sequence.assign_to_user(new_hire)
+
+        assert new_hire.conditions.count() == existing + 5
+        # Triggers and items have been copied over
+        for user_condition in new_hire.conditions.all():
+            assert user_condition.condition_to_do.count() == 1
+            assert user_condition.to_do.count() in [1, 2]
+        return len(queries)
+
+    # Matching doesn't depend on the amount of conditions the user already has
+    few_conditions = assign_to_user(2)
+    many_conditions = assign_to_user(10)
+    assert few_conditions == many_conditions
+    assert many_conditions <= 50
+
+
+@pytest.mark.django_db
+def test_sequence_assign_to_users(
+    sequence_factory,
+    new_hire_factory,
+    condition_timed_factory,
+    condition_to_do_factory,
+    to_do_factory,
+):
+    new_hire1 = new_hire_factory()
+    new_hire2 = new_hire_factory()
+
+    # new_hire1 already has a matching timed condition
+    sequence1 = sequence_factory()
+    condition_timed_factory(sequence=sequence1, days=3).to_do.add(to_do_factory())
+    sequence1.assign_to_user(new_hire1)
+
+    sequence2 = sequence_factory()
+    condition_timed_factory(sequence=sequence2, days=3).to_do.add(to_do_factory())
+    to_do_condition = condition_to_do_factory(sequence=sequence2)
+    to_do_condition.to_do.add(to_do_factory())
+    # Same triggers, so gets merged with the other to do condition
+    same_to_do_condition = condition_to_do_factory(sequence=sequence2)
+    same_to_do_condition.condition_to_do.set(to_do_condition.condition_to_do.all())
+    same_to_do_condition.to_do.add(to_do_factory())
+
+    sequence2.assign_to_users([new_hire1, new_hire2])
+
+    for new_hire in [new_hire1, new_hire2]:
+        assert new_hire.conditions.count() == 2
+        user_to_do_condition = new_hire.conditions.get(
+            condition_type=Condition.Type.TODO
+        )
+        assert user_to_do_condition.to_do.count() == 2
+        assert (
+            user_to_do_condition.trigger_signature == to_do_condition.trigger_signature
+        )
+
+    # Merged with the existing condition
+    assert (
+        new_hire1.conditions.get(condition_type=Condition.Type.AFTER).to_do.count() == 2
+    )
+    assert (
+        new_hire2.conditions.get(condition_type=Condition.Type.AFTER).to_do.count() == 1
+    )
+    assert ScheduledCondition.objects.filter(user=new_hire2).count() == 1
+
+
+@pytest.mark.django_db
+def test_sequence_remove_from_user(
+    sequence_factory,
+    new_hire_factory,
+    condition_timed_factory,
+    to_do_factory,
+    django_assert_max_num_queries,
+):
+    new_hire1 = new_hire_factory()
+    new_hire2 = new_hire_factory()
+
+    # Lots of other sequences, these items should stay
+    other_sequences = sequence_factory.create_batch(20)
+    for i, other_sequence in enumerate(other_sequences):
+        condition_timed_factory(sequence=other_sequence, days=i + 1).to_do.add(
+            to_do_factory()
+        )
+
+    sequence = sequence_factory()
+    to_do1 = to_do_factory()
+    to_do2 = to_do_factory()
+    # Added directly to the new hire
+    sequence.conditions.get(condition_type=Condition.Type.WITHOUT).to_do.add(to_do1)
+    # Merged with a condition of another sequence
+    condition_timed_factory(sequence=sequence, days=1).to_do.add(to_do2)
+
+    new_hire1.add_sequences([*other_sequences, sequence])
+    new_hire2.add_sequences([sequence])
+
+    assert new_hire1.conditions.count() == 20
+    assert new_hire1.to_do.filter(id=to_do1.id).exists()
+
+    with django_assert_max_num_queries(25):
+        sequence.remove_from_user(new_hire1)
+
+    assert new_hire1.conditions.count() == 20
+    assert not new_hire1.to_do.filter(id=to_do1.id).exists()
+    assert not new_hire1.conditions.filter(to_do=to_do2).exists()
+    assert new_hire1.conditions.filter(to_do__isnull=False).count() == 20
+
+    # Only the notification of this new hire and sequence is removed
+    added_sequence_notifications = Notification.objects.filter(
+        notification_type=Notification.Type.ADDED_SEQUENCE
+    )
+    assert not added_sequence_notifications.filter(
+        created_for=new_hire1, item_id=sequence.id
+    ).exists()
+    assert added_sequence_notifications.filter(created_for=new_hire1).count() == 20
+    assert added_sequence_notifications.filter(created_for=new_hire2).count() == 1
+
+    # The other new hire still has everything
+    assert new_hire2.to_do.filter(id=to_do1.id).exists()
+    assert new_hire2.conditions.filter(to_do=to_do2).exists()
+
+
 @pytest.mark.django_db
 def test_sequence_assign_to_user_merge_time_condition(
     sequence_factory,
@@ -2059,6 +2660,43 @@ def test_condition_is_empty(condition_to_do_factory, to_do_factory):
     assert not condition.is_empty
 
 
+@pytest.mark.django_db
+def test_condition_process_condition_bulk(
+    condition_timed_factory,
+    new_hire_factory,
+    to_do_factory,
+    resource_factory,
+    preboarding_factory,
+    django_assert_num_queries,
+):
+    new_hire = new_hire_factory()
+    small_condition = condition_timed_factory()
+    small_condition.to_do.add(to_do_factory())
+    small_condition.preboarding.add(preboarding_factory())
+    large_condition = condition_timed_factory()
+    large_condition.to_do.add(*to_do_factory.create_batch(25))
+    large_condition.resources.add(*resource_factory.create_batch(25))
+    large_condition.preboarding.add(*preboarding_factory.create_batch(25))
+
+    with CaptureQueriesContext(connection) as small_condition_queries:
+        small_condition.process_condition(new_hire)
+
+    # Items from the same fields are added at once. Only the resources cost an extra
+    # lookup and insert.
+    with django_assert_num_queries(len(small_condition_queries) + 2):
+        large_condition.process_condition(new_hire)
+
+    assert new_hire.to_do.count() == 26
+    assert new_hire.resources.count() == 25
+    assert new_hire.preboarding.count() == 26
+    assert (
+        Notification.objects.filter(
+            created_for=new_hire, public_to_new_hire=True
+        ).count()
+        == 77
+    )
+
+
 # TASKS
 
 
@@ -2146,3 +2784,132 @@ def test_send_slack_message_after_process_condition(
             },
         },
     ]
+
+
+@pytest.mark.django_db
+def test_integration_configs_run_concurrently(
+    settings,
+    new_hire_factory,
+    condition_to_do_factory,
+    custom_integration_factory,
+    integration_config_factory,
+):
+    settings.INTEGRATION_PROVISIONING_WORKERS = 3
+    new_hire = new_hire_factory()
+    condition = condition_to_do_factory()
+    stores_data = custom_integration_factory(
+        name="Stores data",
+        manifest={"execute": [{"url": "https://example.com", "store_data": {}}]},
+    )
+    integrations = [stores_data] + [
+        custom_integration_factory(name=name, manifest={"execute": []})
+        for name in ["First", "Failing", "Last"]
+    ]
+    for integration in integrations:
+        condition.integration_configs.add(
+            integration_config_factory(integration=integration)
+        )
+    # Second config of the same integration
+    condition.integration_configs.add(
+        integration_config_factory(integration=integrations[-1])
+    )
+
+    # The independent integrations are all running at the same time
+    barrier = threading.Barrier(3, timeout=5)
+    executed = []
+
+    def execute(integration, new_hire, params=None, retry_on_failure=False):
+        if integration.name != "Stores data" and integration.name not in {
+            name for name, _thread in executed
+        }:
+            barrier.wait()
+        executed.append((integration.name, threading.current_thread()))
+        if integration.name == "Failing":
+            raise ValueError("Something went wrong")
+
+    with (
+        patch.object(Integration, "execute", autospec=True, side_effect=execute),
+        pytest.raises(ValueError, match="Something went wrong"),
+    ):
+        condition.process_condition(new_hire)
+
+    # Integrations that store data ran first, in this thread. The failing one didn't
+    # stop the others.
+    assert executed[0] == ("Stores data", threading.current_thread())
+    assert sorted(name for name, _thread in executed[1:]) == [
+        "Failing",
+        "First",
+        "Last",
+        "Last",
+    ]
+    assert len({thread for _name, thread in executed[1:]}) == 3
+    # Configs of the same integration ran after each other, in the same thread
+    assert len({thread for name, thread in executed if name == "Last"}) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_integration_configs_run_in_threads(
+    settings,
+    new_hire_factory,
+    condition_to_do_factory,
+    custom_integration_factory,
+    integration_config_factory,
+):
+    # Threads use their own database connection, so they can only see committed data
+    settings.INTEGRATION_PROVISIONING_WORKERS = 2
+    new_hire = new_hire_factory()
+    condition = condition_to_do_factory()
+    for name in ["Succeeds", "Fails"]:
+        integration = custom_integration_factory(
+            name=name,
+            manifest={
+                "execute": [
+                    {
+                        "url": f"https://example.com/{name.lower()}",
+                        "method": "POST",
+                        "status_code": ["200"],
+                    }
+                ]
+            },
+        )
+        condition.integration_configs.add(
+            integration_config_factory(integration=integration)
+        )
+
+    # Both requests are sent at the same time, from different threads
+    barrier = threading.Barrier(2, timeout=5)
+    threads = {}
+
+    def request(method, url, **kwargs):
+        barrier.wait()
+        threads[url] = threading.current_thread()
+        if url.endswith("fails"):
+            return Mock(status_code=500, json=lambda: {"error": "Server error"})
+        return Mock(status_code=200, json=lambda: {"id": 1})
+
+    with patch("requests.Session.request", side_effect=request):
+        condition.process_condition(new_hire)
+
+    assert len(set(threads.values())) == 2
+    assert threading.current_thread() not in threads.values()
+
+    # Every thread logged its own request for the new hire
+    for name, status_code in [("Succeeds", 200), ("Fails", 500)]:
+        tracker = IntegrationTracker.objects.get(
+            integration__name=name, for_user=new_hire
+        )
+        step = tracker.steps.get()
+        assert step.url == f"https://example.com/{name.lower()}"
+        assert step.status_code == status_code
+
+    assert Notification.objects.filter(
+        notification_type=Notification.Type.RAN_INTEGRATION,
+        extra_text="Succeeds",
+        created_for=new_hire,
+    ).exists()
+    failed = Notification.objects.get(
+        notification_type=Notification.Type.FAILED_INTEGRATION,
+        created_for=new_hire,
+    )
+    assert failed.extra_text == "Fails"
+    assert "https://example.com/fails" in failed.description
@@ -80,3 +80,37 @@ def test_create_to_do(client, django_user_model, integration_factory):
     assert "To do items" in response.content.decode()
     # Check if it created one
     assert ToDo.objects.all().count() == 2
+
+
+@pytest.mark.django_db
+def test_update_to_do_with_file(
+    client, settings, monkeypatch, admin_factory, to_do_factory, file_factory
+):
+    settings.AWS_STORAGE_BUCKET_NAME = "xxx"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    client.force_login(admin_factory())
+    file = file_factory()
+    to_do = to_do_factory(
+        content={
+            "time": 0,
+            "blocks": [
+                {
+                    "type": "image",
+                    "data": {"file": {"id": file.id, "url": ""}, "caption": ""},
+                },
+                {
+                    "type": "attaches",
+                    "data": {"file": {"id": file.id, "url": ""}, "title": "file"},
+                },
+            ],
+        }
+    )
+
+    response = client.get(reverse("todo:update", args=[to_do.id]))
+
+    # The content (with signed file urls) is passed to the editor
+    assert '<script id="content" type="application/json">' in (
+        response.content.decode()
+    )
+    assert response.content.decode().count(file.key) == 2
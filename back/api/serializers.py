@@ -35,6 +35,21 @@ class UserSerializer(serializers.ModelSerializer):
         ]
 
 
+class NewHireListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        emails = [user["email"].lower() for user in attrs]
+        if len(set(emails)) != len(emails):
+            raise serializers.ValidationError("Email addresses must be unique.")
+        return attrs
+
+
+class NewHireSerializer(UserSerializer):
+    class Meta:
+        model = User
+        fields = [field for field in UserSerializer.Meta.fields if field != "role"]
+        list_serializer_class = NewHireListSerializer
+
+
 class UserOffboardingSerializer(serializers.Serializer):
     termination_date = serializers.DateField()
     sequences = serializers.ListField(child=serializers.IntegerField(), required=False)
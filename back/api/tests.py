@@ -1,11 +1,14 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from freezegun.api import freeze_time
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
+from organization.models import Notification
 from users.models import User
 
 
@@ -130,6 +133,150 @@ def test_create_new_hire_endpoint(setup_rest, sequence_factory):
     assert User.objects.filter(role=get_user_model().Role.NEWHIRE).count() == 1
 
 
+@pytest.mark.django_db
+def test_create_new_hires_bulk_endpoint(
+    setup_rest,
+    sequence_factory,
+    condition_timed_factory,
+    condition_to_do_factory,
+    to_do_factory,
+    resource_factory,
+):
+    client = setup_rest
+
+    seq1 = sequence_factory()
+    timed_condition = condition_timed_factory(sequence=seq1, days=2)
+    to_do1 = to_do_factory()
+    timed_condition.to_do.add(to_do1)
+    to_do_condition = condition_to_do_factory(sequence=seq1)
+    to_do_condition.resources.add(resource_factory(course=True))
+    seq2 = sequence_factory()
+    # Merged into the timed condition of the first sequence
+    condition_timed_factory(sequence=seq2, days=2).to_do.add(to_do_factory())
+
+    response = client.post(
+        reverse("api:users_bulk"),
+        data=[
+            {
+                "first_name": "john",
+                "last_name": "Do",
+                "email": "John@chiefonboarding.com",
+                "sequences": [seq1.id, seq2.id],
+            },
+            {
+                "first_name": "jane",
+                "last_name": "Do",
+                "email": "jane@chiefonboarding.com",
+                "sequences": [seq1.id],
+            },
+        ],
+        format="json",
+    )
+    assert response.status_code == 201
+    assert [user["email"] for user in response.json()] == [
+        "john@chiefonboarding.com",
+        "jane@chiefonboarding.com",
+    ]
+
+    john = User.objects.get(email="john@chiefonboarding.com")
+    jane = User.objects.get(email="jane@chiefonboarding.com")
+    assert john.role == User.Role.NEWHIRE
+    assert john.unique_url != jane.unique_url
+
+    assert john.conditions.count() == 2
+    assert jane.conditions.count() == 2
+    user_timed_condition = john.conditions.get(
+        condition_type=timed_condition.condition_type
+    )
+    assert user_timed_condition.to_do.count() == 2
+    assert user_timed_condition.scheduled_triggers.filter(user=john).exists()
+    # Triggers are copied over
+    assert list(
+        jane.conditions.get(
+            condition_type=to_do_condition.condition_type
+        ).condition_to_do.all()
+    ) == list(to_do_condition.condition_to_do.all())
+    # Users don't share conditions
+    assert not john.conditions.filter(id__in=jane.conditions.all()).exists()
+
+    assert john.total_tasks == 3
+    assert jane.total_tasks == 2
+
+    assert (
+        john.notification_receivers.filter(
+            notification_type=Notification.Type.ADDED_SEQUENCE
+        ).count()
+        == 2
+    )
+    assert jane.notification_receivers.filter(
+        notification_type=Notification.Type.ADDED_NEWHIRE
+    ).exists()
+
+
+@pytest.mark.django_db
+def test_create_new_hires_bulk_endpoint_query_count(
+    setup_rest,
+    sequence_factory,
+    condition_timed_factory,
+    condition_to_do_factory,
+):
+    client = setup_rest
+
+    sequence = sequence_factory()
+    condition_timed_factory(sequence=sequence)
+    condition_to_do_factory(sequence=sequence)
+
+    def create_new_hires(amount, offset):
+        return client.post(
+            reverse("api:users_bulk"),
+            data=[
+                {
+                    "first_name": "john",
+                    "last_name": "Do",
+                    "email": f"john{offset + i}@chiefonboarding.com",
+                    "sequences": [sequence.id],
+                }
+                for i in range(amount)
+            ],
+            format="json",
+        )
+
+    # Validation and processing the sequences' conditions without a trigger still
+    # run per user, but everything is written in a fixed amount of statements
+    def get_writes(queries):
+        return [
+            query["sql"]
+            for query in queries.captured_queries
+            if not query["sql"].startswith("SELECT")
+        ]
+
+    with CaptureQueriesContext(connection) as small_cohort:
+        assert create_new_hires(2, 0).status_code == 201
+    with CaptureQueriesContext(connection) as large_cohort:
+        assert create_new_hires(20, 100).status_code == 201
+
+    assert len(get_writes(large_cohort)) == len(get_writes(small_cohort))
+    for new_hire in User.objects.filter(role=User.Role.NEWHIRE):
+        assert new_hire.conditions.count() == 2
+
+
+@pytest.mark.django_db
+def test_create_new_hires_bulk_endpoint_duplicate_email(setup_rest):
+    client = setup_rest
+
+    response = client.post(
+        reverse("api:users_bulk"),
+        data=[
+            {"first_name": "john", "last_name": "Do", "email": "john@example.com"},
+            {"first_name": "john", "last_name": "Do", "email": "John@example.com"},
+        ],
+        format="json",
+    )
+    assert response.status_code == 400
+    assert response.json() == {"non_field_errors": ["Email addresses must be unique."]}
+    assert User.objects.count() == 1
+
+
 @pytest.mark.django_db
 def test_offboard_user_endpoint(
     setup_rest, new_hire_factory, offboarding_sequence_factory
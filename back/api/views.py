@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
 from django_q.tasks import async_task
 from rest_framework import generics, status
@@ -13,6 +15,7 @@ from users.models import User
 
 from .serializers import (
     EmployeeSerializer,
+    NewHireSerializer,
     SequenceSerializer,
     UserOffboardingSerializer,
     UserSerializer,
@@ -91,6 +94,77 @@ class UserView(generics.CreateAPIView):
             )
 
 
+class UserBulkView(UserView):
+    """
+    API endpoint that allows a group of new hires to be created at once
+    """
+
+    serializer_class = NewHireSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs["many"] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def perform_create(self, serializer):
+        org = Organization.object.get()
+        users_data = serializer.validated_data
+        users = []
+        for user_data, unique_url in zip(
+            users_data, User.objects.make_unique_urls(len(users_data))
+        ):
+            user_data = {**user_data}
+            user_data.pop("sequences", None)
+            user_data.setdefault("timezone", org.timezone)
+            user_data.setdefault("language", org.language)
+            user_data.setdefault("start_day", org.current_datetime.date())
+            user_data["email"] = user_data["email"].lower()
+            users.append(
+                User(role=User.Role.NEWHIRE, unique_url=unique_url, **user_data)
+            )
+        users = User.objects.bulk_create(users)
+        serializer.instance = users
+
+        # Add sequences to new hires, grouped per sequence
+        sequence_users = defaultdict(list)
+        for user, user_data in zip(users, users_data):
+            for sequence_id in user_data.get("sequences", []):
+                sequence_users[sequence_id].append(user)
+        for sequence in Sequence.objects.filter(id__in=sequence_users.keys()):
+            User.objects.add_sequences(sequence_users[sequence.id], [sequence])
+
+        # Send credentials email if the user was created after their start day
+        for user in users:
+            new_hire_datetime = user.get_local_time()
+            if (
+                new_hire_datetime.date() >= user.start_day
+                and new_hire_datetime.hour >= 7
+                and new_hire_datetime.weekday() < 5
+                and org.new_hire_email
+            ):
+                async_task(
+                    "users.tasks.send_new_hire_credentials",
+                    user.id,
+                    task_name=f"Send login credentials: {user.full_name}",
+                )
+
+        # Linking users in Slack and sending welcome message (if exists)
+        link_slack_users(users)
+        # Update users total todo items
+        User.objects.refresh_progress([user.id for user in users])
+
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    notification_type=Notification.Type.ADDED_NEWHIRE,
+                    extra_text=user.full_name,
+                    created_by=self.request.user,
+                    created_for=user,
+                )
+                for user in users
+            ]
+        )
+
+
 class UserOffboardingView(APIView):
     """
     API endpoint that allows users to be offboarded
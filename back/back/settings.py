@@ -29,6 +29,12 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = env("SECRET_KEY")
 
+# Keys for encrypted fields, newest first. Defaults to the SECRET_KEY. Run
+# `manage.py rotate_encrypted_fields` after adding a key, to be able to remove the
+# old one.
+if env("FERNET_KEYS", default="") != "":
+    FERNET_KEYS = env.list("FERNET_KEYS")
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env.bool("DEBUG", default=False)
 
@@ -348,13 +354,35 @@ DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default="example@example.com")
 OLD_PASSWORD_FIELD_ENABLED = True
 
 # Caching
+# Values are kept in the process for a couple of seconds, in front of the database
+# cache (and Redis, if configured), so not every lookup is a round trip. Other
+# processes keep using their local copy of a changed/deleted value for up to
+# LOCAL_CACHE_TIMEOUT seconds.
 CACHES = {
     "default": {
+        "BACKEND": "misc.cache.TieredCache",
+        "LOCATION": "default",
+        "OPTIONS": {
+            "SHARED_CACHES": ["database"],
+            "LOCAL_TIMEOUT": env.int("LOCAL_CACHE_TIMEOUT", 5),
+            "LOCAL_MAX_ENTRIES": env.int("LOCAL_CACHE_MAX_ENTRIES", 1000),
+        },
+    },
+    "database": {
         "BACKEND": "django.core.cache.backends.db.DatabaseCache",
         "LOCATION": "cached_items",
-    }
+    },
 }
 
+# Optionally, write through to a Redis (compatible) server as well. Requires the
+# `redis` package.
+if env("REDIS_CACHE_URL", default="") != "":
+    CACHES["redis"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("REDIS_CACHE_URL"),
+    }
+    CACHES["default"]["OPTIONS"]["SHARED_CACHES"] = ["redis", "database"]
+
 Q_CLUSTER = {
     "name": "DjangORM",
     "workers": 1,
@@ -370,6 +398,30 @@ Q_CLUSTER = {
 if DEBUG and RUNNING_TESTS:
     Q_CLUSTER["sync"] = True
 
+# Seconds before a process checks if the organization changed in another process
+ORGANIZATION_CACHE_CHECK_INTERVAL = env.int("ORGANIZATION_CACHE_CHECK_INTERVAL", 5)
+
+# Max amount of compiled templates that are kept in memory for personalizing texts
+PERSONALIZE_TEMPLATE_CACHE_SIZE = env.int("PERSONALIZE_TEMPLATE_CACHE_SIZE", 1000)
+
+# Minutes before the integration access of a user (`access_overview`) is refreshed
+ACCESS_SNAPSHOT_TTL = env.int("ACCESS_SNAPSHOT_TTL", 60)
+# Max amount of integrations that are checked at the same time for a user
+INTEGRATION_ACCESS_CHECK_WORKERS = env.int("INTEGRATION_ACCESS_CHECK_WORKERS", 5)
+
+# Max amount of integrations that are executed at the same time for a user
+INTEGRATION_PROVISIONING_WORKERS = env.int("INTEGRATION_PROVISIONING_WORKERS", 5)
+
+# Requests of integrations
+# Default seconds before a request times out, can be set per integration
+INTEGRATION_REQUEST_TIMEOUT = env.int("INTEGRATION_REQUEST_TIMEOUT", 120)
+# Amount of times a failed request gets retried
+INTEGRATION_REQUEST_RETRIES = env.int("INTEGRATION_REQUEST_RETRIES", 2)
+# Max amount of connections that are kept open per host
+INTEGRATION_SESSION_POOL_SIZE = env.int("INTEGRATION_SESSION_POOL_SIZE", 10)
+# Seconds connections to a host are kept open after they were last used
+INTEGRATION_SESSION_KEEP_ALIVE = env.int("INTEGRATION_SESSION_KEEP_ALIVE", 300)
+
 # AWS
 AWS_S3_ENDPOINT_URL = env(
     "AWS_S3_ENDPOINT_URL", default="https://s3.eu-west-1.amazonaws.com"
@@ -1,6 +1,7 @@
 import os
 
 import pytest
+from django.core.cache import cache
 from pytest_factoryboy import register
 
 from admin.admin_tasks.factories import AdminTaskFactory
@@ -42,6 +43,7 @@ from organization.factories import (
     OrganizationFactory,
     WelcomeMessageFactory,
 )
+from organization.models import Organization
 from users.factories import (
     AdminFactory,
     DepartmentFactory,
@@ -58,6 +60,9 @@ from users.factories import (
 
 @pytest.fixture(autouse=True)
 def run_around_tests(request, settings):
+    # The database is rolled back after every test, cached values would be stale
+    Organization.object.clear_cache(shared=False)
+    cache.clear_local()
     if request.node.get_closest_marker("no_run_around_tests"):
         yield
         return
@@ -0,0 +1,95 @@
+from bisect import bisect_left
+from datetime import date, timedelta
+
+# Ordinal 1 (0001-01-01) is a Monday. All calculations are relative to that, so we
+# never have to walk through the days one by one.
+_ONE_DAY = timedelta(days=1)
+
+
+def _weekdays_before(day):
+    # Amount of weekdays between 0001-01-01 and `day` (excluding `day` itself)
+    weeks, days = divmod(day.toordinal() - 1, 7)
+    return weeks * 5 + min(days, 5)
+
+
+def _weekday_at(index):
+    # Reverse of `_weekdays_before`, gives the weekday with that index
+    weeks, days = divmod(index, 5)
+    return date.fromordinal(1 + weeks * 7 + days)
+
+
+class BusinessCalendar:
+    """
+    Workday arithmetic that skips weekends and (optionally) holidays. Everything is
+    calculated directly, so the costs don't grow with the amount of days.
+
+    :param holidays list: dates that are never counted as a workday
+    """
+
+    def __init__(self, holidays=None):
+        # Holidays in weekends are already skipped
+        self.holidays = sorted(
+            {holiday for holiday in holidays or [] if holiday.weekday() < 5}
+        )
+
+    def _holidays_between(self, start, end):
+        # Amount of holidays in [start, end)
+        if not self.holidays:
+            return 0
+        return bisect_left(self.holidays, end) - bisect_left(self.holidays, start)
+
+    def is_workday(self, day):
+        return day.weekday() < 5 and self._holidays_between(day, day + _ONE_DAY) == 0
+
+    def count(self, start, end):
+        """
+        Amount of workdays in [start, end). Negative if end is before start.
+        """
+        if end < start:
+            return -self.count(end, start)
+        return (
+            _weekdays_before(end)
+            - _weekdays_before(start)
+            - self._holidays_between(start, end)
+        )
+
+    def add(self, day, workdays):
+        """
+        Moves `workdays` workdays away from `day`. A positive amount gives the nth
+        workday after `day`, a negative amount the nth workday before `day`.
+        """
+        if workdays > 0:
+            result = _weekday_at(_weekdays_before(day + _ONE_DAY) + workdays - 1)
+            # Holidays in between push the result further
+            skipped = self._holidays_between(day + _ONE_DAY, result + _ONE_DAY)
+            while skipped:
+                previous = result
+                result = _weekday_at(
+                    _weekdays_before(previous + _ONE_DAY) + skipped - 1
+                )
+                skipped = self._holidays_between(previous + _ONE_DAY, result + _ONE_DAY)
+            return result
+
+        if workdays < 0:
+            result = _weekday_at(_weekdays_before(day) + workdays)
+            skipped = self._holidays_between(result, day)
+            while skipped:
+                previous = result
+                result = _weekday_at(_weekdays_before(previous) - skipped)
+                skipped = self._holidays_between(result, previous)
+            return result
+
+        return day
+
+    def workday_number(self, start_day, day):
+        """
+        The workday that `day` is for someone that started on `start_day`. The start
+        day is workday 1 and before that it's always 0.
+        """
+        if start_day > day:
+            return 0
+        return 1 + self.count(start_day + _ONE_DAY, day + _ONE_DAY)
+
+
+# Default calendar: only skips weekends
+business_calendar = BusinessCalendar()
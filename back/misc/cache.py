@@ -0,0 +1,156 @@
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+# Marks a miss, as `None` is a perfectly fine value to cache
+MISSING = object()
+
+
+def _local_key(key, key_prefix, version):
+    # Keys are already made (prefix and version included) by the tiered cache
+    return key
+
+
+class TieredCache(BaseCache):
+    """
+    Keeps a small, bounded (LRU) copy of the cached values in the process, in front
+    of the shared caches (the database cache and optionally Redis). Values are only
+    kept locally for a couple of seconds (`LOCAL_TIMEOUT`). Changes are not pushed
+    to other processes (gunicorn workers and the qcluster): after a `set` or
+    `delete`, they keep returning the old value until their local copy expires.
+    Don't use it for values that have to be the same everywhere right away (use
+    `add` for locks, that always goes to the shared caches).
+
+    Writes go to all shared caches, reads use the first shared cache that has the
+    value. The last shared cache is leading for `add`, so that one should be the
+    persistent one. Keys are versioned per key, just like any other Django cache
+    (`version=` and `cache.incr_version(key)`), and those versions are passed on to
+    the shared caches.
+
+    Options:
+        SHARED_CACHES: aliases of the shared caches, in the order they are read
+        LOCAL_TIMEOUT: max seconds a value is kept in the process
+        LOCAL_MAX_ENTRIES: max amount of values that are kept in the process
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_aliases = options.get("SHARED_CACHES", [])
+        if not self.shared_aliases:
+            raise ImproperlyConfigured("TieredCache needs at least one SHARED_CACHES")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self._local = LocMemCache(
+            f"tiered-{location}",
+            {
+                "TIMEOUT": self.local_timeout,
+                "KEY_FUNCTION": _local_key,
+                "OPTIONS": {"MAX_ENTRIES": options.get("LOCAL_MAX_ENTRIES", 1000)},
+            },
+        )
+
+    @property
+    def shared(self):
+        return [caches[alias] for alias in self.shared_aliases]
+
+    def _get_local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self._local.get(local_key, MISSING)
+        if value is not MISSING:
+            return value
+
+        for shared_cache in self.shared:
+            value = shared_cache.get(key, MISSING, version=self._version(version))
+            if value is not MISSING:
+                self._local.set(local_key, value)
+                return value
+        return default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        local_keys = {
+            self.make_and_validate_key(key, version=version): key for key in keys
+        }
+        values = {
+            local_keys[local_key]: value
+            for local_key, value in self._local.get_many(local_keys).items()
+        }
+        for shared_cache in self.shared:
+            missing = [key for key in keys if key not in values]
+            if not missing:
+                break
+            found = shared_cache.get_many(missing, version=self._version(version))
+            for key, value in found.items():
+                self._local.set(self.make_and_validate_key(key, version=version), value)
+            values.update(found)
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        for shared_cache in self.shared:
+            shared_cache.set(
+                key,
+                value,
+                timeout=self._timeout(timeout),
+                version=self._version(version),
+            )
+        self._local.set(local_key, value, self._get_local_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        *others, leading = self.shared
+        if not leading.add(
+            key, value, timeout=self._timeout(timeout), version=self._version(version)
+        ):
+            return False
+
+        for shared_cache in others:
+            shared_cache.set(
+                key,
+                value,
+                timeout=self._timeout(timeout),
+                version=self._version(version),
+            )
+        self._local.set(local_key, value, self._get_local_timeout(timeout))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        touched = False
+        for shared_cache in self.shared:
+            touched |= shared_cache.touch(
+                key, timeout=self._timeout(timeout), version=self._version(version)
+            )
+        self._local.touch(local_key, self._get_local_timeout(timeout))
+        return touched
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        deleted = False
+        for shared_cache in self.shared:
+            deleted |= shared_cache.delete(key, version=self._version(version))
+        self._local.delete(local_key)
+        return deleted
+
+    def clear(self):
+        for shared_cache in self.shared:
+            shared_cache.clear()
+        self._local.clear()
+
+    def clear_local(self):
+        # Only drops the values in this process, the shared caches are left alone
+        self._local.clear()
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _version(self, version):
+        return self.version if version is None else version
@@ -30,16 +30,18 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from cryptography.fernet import Fernet, MultiFernet
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from django.conf import settings
 from django.core.exceptions import FieldError, ImproperlyConfigured
 from django.db import models
+from django.db.models.query_utils import DeferredAttribute
 from django.utils.encoding import force_bytes, force_str
 from django.utils.functional import cached_property
 
 from . import hkdf
 
 __all__ = [
+    "Ciphertext",
     "EncryptedField",
     "EncryptedTextField",
     "EncryptedCharField",
@@ -50,10 +52,55 @@ __all__ = [
 ]
 
 
+class Ciphertext:
+    """
+    Encrypted value as it was loaded from the database. The plaintext is kept
+    once it has been decrypted, together with the key it was encrypted with
+    (`None` if that's not the first key).
+    """
+
+    __slots__ = ["key", "plaintext", "value"]
+
+    def __init__(self, value):
+        self.value = value
+        self.plaintext = None
+        self.key = None
+
+
+class EncryptedAttribute(DeferredAttribute):
+    """
+    Values are only decrypted when they are used, so loading items doesn't pay for
+    decrypting all of their fields. The decrypted value is kept on the instance.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, Ciphertext):
+            decrypted = self.field.decrypt(value)
+            instance.__dict__.setdefault("_ciphertexts", {})[self.field.attname] = value
+            instance.__dict__[self.field.attname] = decrypted
+            return decrypted
+        return value
+
+    def __set__(self, instance, value):
+        # Needs to be a data descriptor, otherwise `__get__` wouldn't be called for
+        # values that are already on the instance
+        instance.__dict__[self.field.attname] = value
+
+
 class EncryptedField(models.Field):
-    """A field that encrypts values using Fernet symmetric encryption."""
+    """
+    A field that encrypts values using Fernet symmetric encryption.
+
+    Values are decrypted on first access. Unchanged values are written back as
+    they were loaded, without encrypting them again. `values()` and `values_list()`
+    return a `Ciphertext`, use `field.decrypt()` to get the value.
+    """
 
     _internal_type = "BinaryField"
+    descriptor_class = EncryptedAttribute
 
     def __init__(self, *args, **kwargs):
         if kwargs.get("primary_key"):
@@ -93,6 +140,11 @@ class EncryptedField(models.Field):
         return self._internal_type
 
     def get_db_prep_save(self, value, connection):
+        if isinstance(value, Ciphertext):
+            return connection.Database.Binary(value.value)
+        if hasattr(value, "as_sql"):
+            # Expressions, like the ones of `bulk_update`, take care of themselves
+            return value
         value = super(EncryptedField, self).get_db_prep_save(value, connection)
         if value is not None:
             retval = self.fernet.encrypt(force_bytes(value))
@@ -100,8 +152,48 @@ class EncryptedField(models.Field):
 
     def from_db_value(self, value, expression, connection, *args):
         if value is not None:
-            value = bytes(value)
-            return self.to_python(force_str(self.fernet.decrypt(value)))
+            return Ciphertext(bytes(value))
+
+    def from_plaintext(self, plaintext):
+        return self.to_python(force_str(plaintext))
+
+    @cached_property
+    def current_fernet(self):
+        return Fernet(self.fernet_keys[0])
+
+    def decrypt(self, ciphertext):
+        if ciphertext.plaintext is None:
+            try:
+                ciphertext.plaintext = self.current_fernet.decrypt(ciphertext.value)
+                ciphertext.key = self.fernet_keys[0]
+            except InvalidToken:
+                # Encrypted with an older key
+                ciphertext.plaintext = self.fernet.decrypt(ciphertext.value)
+        return self.from_plaintext(ciphertext.plaintext)
+
+    def is_current(self, ciphertext):
+        # Keys could have changed since it was decrypted
+        return ciphertext.key is not None and ciphertext.key == self.fernet_keys[0]
+
+    def pre_save(self, model_instance, add):
+        # Unchanged values are written back as they were loaded, as long as they
+        # are encrypted with the current key. Otherwise an old copy of an item
+        # could undo a key rotation.
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, Ciphertext):
+            # Never used, so it can't have changed either
+            plaintext = self.decrypt(value)
+            return value if self.is_current(value) else plaintext
+
+        value = super().pre_save(model_instance, add)
+        ciphertext = model_instance.__dict__.get("_ciphertexts", {}).get(self.attname)
+        if (
+            ciphertext is not None
+            and self.is_current(ciphertext)
+            and self.from_plaintext(ciphertext.plaintext) == value
+        ):
+            return ciphertext
+        return value
 
     @cached_property
     def validators(self):
@@ -1,21 +1,35 @@
 import json
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.db.models import JSONField
 from django.utils.encoding import force_bytes
 
-from misc.fernet_fields import EncryptedField
+from misc.fernet_fields import Ciphertext, EncryptedField
 
-from .models import File
+from .models import file_urls
 
 
 class ContentJSONField(JSONField):
     """
     Custom JSONField renderer. It will update the signed url of the files before
     pushing it to the frontend. Signed urls expire. We will always want to fetch a new
-    one, so users don't bump into files that can't be fetched in the editor
+    one, so users don't bump into files that can't be fetched in the editor.
+    The urls are lazy, files of all loaded items are fetched at once when the first
+    url gets used. The lazy urls are turned into strings by the encoder, both when
+    saving and in forms.
     """
 
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("encoder", DjangoJSONEncoder)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get("encoder") is DjangoJSONEncoder:
+            del kwargs["encoder"]
+        return name, path, args, kwargs
+
     def from_db_value(self, value, expression, connection):
         value = super().from_db_value(value, expression, connection)
         if "blocks" not in value:
@@ -24,9 +38,9 @@ class ContentJSONField(JSONField):
         for block in value["blocks"]:
             if block["type"] in ["attaches", "image"]:
                 if "id" in block["data"]["file"]:
-                    block["data"]["file"]["url"] = File.objects.get(
-                        id=block["data"]["file"]["id"]
-                    ).get_url()
+                    block["data"]["file"]["url"] = file_urls.lazy_url(
+                        block["data"]["file"]["id"]
+                    )
                 else:
                     block["data"]["title"] = (
                         "File is invalid. Please remove and try again:"
@@ -38,6 +52,11 @@ class ContentJSONField(JSONField):
 class EncryptedJSONField(EncryptedField, models.JSONField):
     # would normally return jsonb, which doesn't work with fernet
     def get_db_prep_save(self, value, connection, prepared=False):
+        if isinstance(value, Ciphertext):
+            return connection.Database.Binary(value.value)
+        if hasattr(value, "as_sql"):
+            # Expressions, like the ones of `bulk_update`, take care of themselves
+            return value
         if not prepared:
             value = self.get_prep_value(value)
 
@@ -50,7 +69,5 @@ class EncryptedJSONField(EncryptedField, models.JSONField):
             retval = self.fernet.encrypt(force_bytes(value))
             return connection.Database.Binary(retval)
 
-    def from_db_value(self, value, expression, connection, *args):
-        if value is not None:
-            value = force_bytes(value)
-            return self.to_python(json.loads(self.fernet.decrypt(value)))
+    def from_plaintext(self, plaintext):
+        return self.to_python(json.loads(plaintext))
@@ -0,0 +1,82 @@
+import timeit
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from misc.simple_template import SimpleTemplate
+
+TEXTS = [
+    "Welcome {{ first_name }}!",
+    (
+        "Hi {{ first_name }} {{ last_name }}, your manager is {{ manager }} "
+        "({{ manager_email }}) and your buddy is {{ buddy }} ({{ buddy_email }}). "
+        "You will start as {{ position }} in {{ department }} on {{ start }}."
+    ),
+]
+
+CONTEXT = {
+    "first_name": "John",
+    "last_name": "Smith",
+    "manager": "Jane Doe",
+    "manager_email": "jane@example.com",
+    "buddy": "Bob & Alice",
+    "buddy_email": "bob@example.com",
+    "position": "Developer",
+    "department": "IT",
+    "start": date(2021, 1, 14),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the speed of personalizing texts with the Django template engine "
+        "and the simple template engine"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--number",
+            type=int,
+            default=10000,
+            help="Amount of times each text gets rendered",
+        )
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        for text in TEXTS:
+            django_template = Template(text)
+            simple_template = SimpleTemplate(text)
+            if django_template.render(Context(CONTEXT)) != simple_template.render(
+                Context(CONTEXT)
+            ):
+                self.stderr.write(f"Output differs for: {text}")
+
+            self.stdout.write(text)
+            for name, template_class, template in [
+                ("django", Template, django_template),
+                ("simple", SimpleTemplate, simple_template),
+            ]:
+                compile_time = timeit.timeit(
+                    "template_class(text).render(Context(context))",
+                    number=number,
+                    globals={
+                        "template_class": template_class,
+                        "text": text,
+                        "Context": Context,
+                        "context": CONTEXT,
+                    },
+                )
+                render_time = timeit.timeit(
+                    "template.render(Context(context))",
+                    number=number,
+                    globals={
+                        "template": template,
+                        "Context": Context,
+                        "context": CONTEXT,
+                    },
+                )
+                self.stdout.write(
+                    f"  {name}: {compile_time / number * 1e6:.1f}us compile and "
+                    f"render, {render_time / number * 1e6:.1f}us render"
+                )
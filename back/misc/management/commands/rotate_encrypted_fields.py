@@ -0,0 +1,122 @@
+import hashlib
+import time
+
+from cryptography.fernet import MultiFernet
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import BinaryField, F, Value
+from django.utils.encoding import force_bytes
+
+from misc.fernet_fields import EncryptedField
+
+# Progress of an aborted run is kept for a week
+CHECKPOINT_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def get_encrypted_fields():
+    # All models with encrypted columns and those columns
+    for model in apps.get_models():
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if isinstance(field, EncryptedField)
+        ]
+        if fields:
+            yield model, fields
+
+
+def get_checkpoint_key(model, fields):
+    # Progress only counts for the key it's rotating to. A new key starts over
+    fingerprint = hashlib.sha256(force_bytes(fields[0].fernet_keys[0])).hexdigest()
+    return f"rotate_encrypted_fields_{model._meta.label_lower}_{fingerprint[:16]}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Encrypts all encrypted fields again with the first key of FERNET_KEYS, so "
+        "older keys can be removed. Rows are done in chunks and only the rows of the "
+        "current chunk are locked. Progress is saved, so it continues where it "
+        "stopped when it's started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Amount of rows that get updated at once",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore saved progress and start from the first row",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = 0
+        for model, fields in get_encrypted_fields():
+            fernet = fields[0].fernet
+            if not isinstance(fernet, MultiFernet):
+                self.stdout.write("There is only one key, nothing to rotate")
+                return
+
+            checkpoint_key = get_checkpoint_key(model, fields)
+            if options["restart"]:
+                cache.delete(checkpoint_key)
+            total += self.rotate_model(
+                model, fields, fernet, checkpoint_key, options["chunk_size"]
+            )
+            # Done, so the next rotation starts at the beginning again
+            cache.delete(checkpoint_key)
+
+        duration = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rotated {total} rows in {duration:.1f}s "
+                f"({total / max(duration, 0.001):.0f} rows/s)"
+            )
+        )
+
+    def rotate_model(self, model, fields, fernet, checkpoint_key, chunk_size):
+        attnames = [field.attname for field in fields]
+        last_pk = cache.get(checkpoint_key)
+        started = time.monotonic()
+        done = 0
+        while True:
+            with transaction.atomic():
+                rows = model._base_manager.select_for_update().order_by("pk")
+                if last_pk is not None:
+                    rows = rows.filter(pk__gt=last_pk)
+                rows = list(rows.values_list("pk", *attnames)[:chunk_size])
+                if not rows:
+                    break
+
+                items = []
+                for pk, *values in rows:
+                    item = model(pk=pk)
+                    for field, value in zip(fields, values):
+                        # Empty columns are left alone
+                        setattr(
+                            item,
+                            field.attname,
+                            F(field.attname)
+                            if value is None
+                            else Value(
+                                fernet.rotate(value.value), output_field=BinaryField()
+                            ),
+                        )
+                    items.append(item)
+                model._base_manager.bulk_update(items, attnames)
+
+            last_pk = rows[-1][0]
+            cache.set(checkpoint_key, last_pk, CHECKPOINT_TIMEOUT)
+            done += len(rows)
+            duration = time.monotonic() - started
+            self.stdout.write(
+                f"{model._meta.label}: {done} rows "
+                f"({done / max(duration, 0.001):.0f} rows/s)"
+            )
+        return done
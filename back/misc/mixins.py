@@ -1,4 +1,4 @@
-from misc.models import File
+from misc.models import file_urls
 from misc.urlparser import URLParser
 
 
@@ -137,7 +137,7 @@ class ContentMixin:
             elif item["type"] == "attaches":
                 files_text = (
                     "<"
-                    + File.objects.get(id=item["data"]["file"]["id"]).get_url()
+                    + file_urls.get_url(item["data"]["file"]["id"])
                     + "|"
                     + item["data"]["file"]["title"]
                     + ">"
@@ -146,16 +146,14 @@ class ContentMixin:
             elif item["type"] == "video":
                 files_text = (
                     "<"
-                    + File.objects.get(id=item["data"]["file"]["id"]).get_url()
+                    + file_urls.get_url(item["data"]["file"]["id"])
                     + "|Watch video>"
                 )
                 slack_block["text"]["text"] = files_text
             elif item["type"] == "image":
                 slack_block = {
                     "type": "image",
-                    "image_url": File.objects.get(
-                        id=item["data"]["file"]["id"]
-                    ).get_url(),
+                    "image_url": file_urls.get_url(item["data"]["file"]["id"]),
                     "alt_text": "image",
                 }
             elif item["type"] == "question":
@@ -222,3 +220,34 @@ class ContentMixin:
                     }
             slack_blocks.append(slack_block)
         return slack_blocks
+
+
+class TrackChangesMixin:
+    """
+    Keeps the values that were loaded from the database around, so we can check if
+    specific fields changed before saving. Must come before `models.Model`.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def has_changed(self, *fields):
+        loaded_values = getattr(self, "_loaded_values", None)
+        if self.pk is None or loaded_values is None:
+            # new or not loaded from the database, so we can't tell
+            return True
+
+        return any(
+            field not in loaded_values or loaded_values[field] != getattr(self, field)
+            for field in fields
+        )
+
+    def reset_loaded_values(self):
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
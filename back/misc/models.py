@@ -1,8 +1,10 @@
+import threading
 import uuid
 
 from django.db import models
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
+from django.utils.functional import lazy
 
 from .s3 import S3
 
@@ -25,6 +27,73 @@ def remove_file(sender, instance, **kwargs):
     S3().delete_file(instance.key)
 
 
+class FileUrlBatch:
+    """
+    Files of content that has been loaded together. They are all fetched at once
+    (one query) when the first url is needed. Lives as long as the loaded content.
+    """
+
+    def __init__(self):
+        self.file_ids = set()
+        # Key per file, `None` if the file is gone. `None` until fetched
+        self.keys = None
+
+    def get_key(self, file_id):
+        if self.keys is None or file_id not in self.keys:
+            file_ids = self.file_ids | {file_id}
+            keys = dict(File.objects.filter(id__in=file_ids).values_list("id", "key"))
+            self.keys = dict.fromkeys(file_ids) | keys
+            S3().prefetch_files(keys.values())
+        return self.keys[file_id]
+
+    def get_url(self, file_id):
+        key = self.get_key(file_id)
+        if key is None:
+            return ""
+        return S3().get_file(key)
+
+
+class FileUrlResolver(threading.local):
+    """
+    Gives out lazy file urls, so urls are only signed when they are actually used.
+    Files of content that is loaded together end up in the same batch. A new batch
+    is started once the current one has been fetched or is full, so a batch never
+    grows beyond `max_batch_size` files and keys are never kept longer than the
+    content that uses them.
+    """
+
+    max_batch_size = 500
+
+    def __init__(self):
+        self.batch = FileUrlBatch()
+
+    def lazy_url(self, file_id):
+        if (
+            self.batch.keys is not None
+            or len(self.batch.file_ids) >= self.max_batch_size
+        ):
+            self.batch = FileUrlBatch()
+        self.batch.file_ids.add(file_id)
+        return lazy_file_url(self.batch, file_id)
+
+    def get_url(self, file_id):
+        # Uses the batch of the last loaded content when the file is part of it
+        if file_id in self.batch.file_ids:
+            return self.batch.get_url(file_id)
+        return FileUrlBatch().get_url(file_id)
+
+
+file_urls = FileUrlResolver()
+
+
+def _file_url(batch, file_id):
+    return batch.get_url(file_id)
+
+
+# Module level function, so it can be pickled
+lazy_file_url = lazy(_file_url, str)
+
+
 # This needs to stay here, not connected to anything.
 # If we remove this model, then migrations will not be able to run.
 # This model used to be connected to multiple models.
@@ -1,16 +1,46 @@
+import hashlib
+import os
+import threading
+
 import boto3
 from botocore.config import Config
 from django.conf import settings
+from django.core.cache import cache
+
+# Seconds a signed url should at least still be valid when it's handed out. Urls
+# that expire sooner are signed again.
+URL_CACHE_MARGIN = 60 * 60 * 24
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Creating a boto3 client is slow, so every process shares the same client
+    (they are thread safe). A new one is only created when the config changed.
+    """
+    config_key = (
+        settings.AWS_DEFAULT_REGION,
+        settings.AWS_S3_ENDPOINT_URL,
+        os.environ.get("AWS_ACCESS_KEY_ID"),
+        os.environ.get("AWS_SECRET_ACCESS_KEY"),
+    )
+    with _clients_lock:
+        if config_key not in _clients:
+            _clients.clear()
+            _clients[config_key] = boto3.client(
+                "s3",
+                settings.AWS_DEFAULT_REGION,
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                config=Config(signature_version="s3v4"),
+            )
+        return _clients[config_key]
 
 
 class S3:
     def __init__(self):
-        self.client = boto3.client(
-            "s3",
-            settings.AWS_DEFAULT_REGION,
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            config=Config(signature_version="s3v4"),
-        )
+        self.client = get_client()
 
     def get_presigned_url(self, key, time=3600):
         return self.client.generate_presigned_url(
@@ -19,14 +49,24 @@ class S3:
             Params={"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": key},
         )
 
+    def _url_cache_key(self, key, time):
+        key = f"{settings.AWS_STORAGE_BUCKET_NAME}/{key}"
+        return f"s3_url_{time}_{hashlib.sha256(key.encode()).hexdigest()}"
+
     def get_file(self, key, time=604799):
         # If a user uploads some files and then removes the keys, this would error
         # Therefore the quick check here
         if settings.AWS_STORAGE_BUCKET_NAME == "":
             return ""
 
+        # Signed urls are valid for a long time, reuse them until they almost expire
+        cache_key = self._url_cache_key(key, time)
+        url = cache.get(cache_key)
+        if url is not None:
+            return url
+
         try:
-            return self.client.generate_presigned_url(
+            url = self.client.generate_presigned_url(
                 ClientMethod="get_object",
                 ExpiresIn=time,
                 Params={"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": key},
@@ -35,7 +75,16 @@ class S3:
             print("Credentials are not set or incorrect")
             return ""
 
+        if time > URL_CACHE_MARGIN:
+            cache.set(cache_key, url, time - URL_CACHE_MARGIN)
+        return url
+
+    def prefetch_files(self, keys, time=604799):
+        # Loads the cached urls of multiple files at once
+        cache.get_many([self._url_cache_key(key, time) for key in keys])
+
     def delete_file(self, key):
+        cache.delete(self._url_cache_key(key, 604799))
         return self.client.delete_object(
             Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key
         )
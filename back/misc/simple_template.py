@@ -0,0 +1,81 @@
+import html
+import re
+
+from django.template import Engine, Template
+from django.template.base import render_value_in_context, tag_re
+from django.utils.safestring import SafeString
+
+# Only plain variables, like `{{ first_name }}`. Anything else (filters, lookups,
+# literals, tags, comments) needs the Django template engine.
+variable_re = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+LITERALS = ["True", "False", "None"]
+
+
+class SimpleTemplate:
+    """
+    Restricted version of `django.template.Template` that only substitutes plain
+    variables. The text is split up once, so rendering is just a lookup per
+    variable. Values are rendered (and escaped) exactly like Django would.
+
+    Use `SimpleTemplate.supports(text)` to check if a text can be rendered with
+    this, otherwise use `django.template.Template`.
+    """
+
+    def __init__(self, text):
+        # Alternating literal text and variable names, starting with literal text
+        self.parts = []
+        for index, bit in enumerate(tag_re.split(text)):
+            self.parts.append(bit if index % 2 == 0 else bit[2:-2].strip())
+
+    @staticmethod
+    def supports(text):
+        for index, bit in enumerate(tag_re.split(text)):
+            if index % 2 == 0:
+                continue
+            if not bit.startswith("{{"):
+                return False
+            variable = bit[2:-2].strip()
+            if variable in LITERALS or not variable_re.match(variable):
+                return False
+        return True
+
+    def resolve(self, name, context):
+        try:
+            value = context[name]
+        except KeyError:
+            return Engine.get_default().string_if_invalid
+
+        # Same as `django.template.base.Variable`
+        if callable(value):
+            if getattr(value, "do_not_call_in_templates", False):
+                pass
+            elif getattr(value, "alters_data", False):
+                value = Engine.get_default().string_if_invalid
+            else:
+                value = value()
+        return value
+
+    def render(self, context):
+        output = []
+        for index, part in enumerate(self.parts):
+            if index % 2 == 0:
+                output.append(part)
+            else:
+                value = self.resolve(part, context)
+                if type(value) is str and context.autoescape:
+                    # Plain strings don't need to be localized, escape them directly
+                    output.append(html.escape(value))
+                else:
+                    output.append(render_value_in_context(value, context))
+        # Same as Django, the rendered template is safe
+        return SafeString("".join(output))
+
+
+def compile_template(text):
+    """
+    Compiles the text with the simple template engine if possible, otherwise
+    falls back to the Django template engine.
+    """
+    if SimpleTemplate.supports(text):
+        return SimpleTemplate(text)
+    return Template(text)
@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from misc.simple_template import compile_template
+
+
+class TemplateCache:
+    """
+    Bounded (LRU) cache of compiled templates. Compiling a template is a lot more
+    expensive than rendering it, and the same texts (to do names, content blocks,
+    email subjects) get personalized over and over again. Texts that only contain
+    plain variables are compiled to a `SimpleTemplate`.
+
+    :param maxsize int: max amount of compiled templates that are kept
+    """
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        if self._maxsize is None:
+            return settings.PERSONALIZE_TEMPLATE_CACHE_SIZE
+        return self._maxsize
+
+    def get(self, text):
+        key = hashlib.sha256(text.encode()).hexdigest()
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        # Compile outside of the lock, so other threads don't have to wait
+        template = compile_template(text)
+        with self._lock:
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._templates),
+                "maxsize": self.maxsize,
+            }
+
+
+template_cache = TemplateCache()
+
+
+def has_template_syntax(text):
+    # Texts without tags, variables or comments render to exactly the same text
+    return "{{" in text or "{%" in text or "{#" in text
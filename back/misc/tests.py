@@ -1,4 +1,26 @@
+import datetime
+import json
+from io import StringIO
+from unittest.mock import patch
+
 import pytest
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.utils.functional import lazy
+from django.utils.safestring import mark_safe
+from freezegun import freeze_time
+
+from misc.business_calendar import BusinessCalendar, business_calendar
+from misc.cache import TieredCache
+from misc.fernet_fields import Ciphertext
+from misc.models import file_urls
+from misc.s3 import S3
+from misc.simple_template import SimpleTemplate, compile_template
+from misc.template_cache import TemplateCache, has_template_syntax
 
 
 @pytest.mark.django_db
@@ -20,3 +42,453 @@ def test_to_slack_block_questions(new_hire_factory, to_do_factory):
 
     assert to_do.to_slack_block(new_hire) == [{'type': 'input', 'block_id': 'item-0', 'element': {'type': 'radio_buttons', 'options': [{'text': {'type': 'plain_text', 'text': 'test', 'emoji': True}, 'value': 'temp-54be'}, {'text': {'type': 'plain_text', 'text': 'tesstt', 'emoji': True}, 'value': 'temp-4eb2'}, {'text': {'type': 'plain_text', 'text': 'testttttt', 'emoji': True}, 'value': 'temp-7300'}, {'text': {'type': 'plain_text', 'text': 'test2', 'emoji': True}, 'value': 'temp-215a'}], 'action_id': 'item-0'}, 'label': {'type': 'plain_text', 'text': 'TEst', 'emoji': True}}, {'type': 'input', 'block_id': 'item-1', 'element': {'type': 'radio_buttons', 'options': [{'text': {'type': 'plain_text', 'text': 'option1', 'emoji': True}, 'value': 'temp-6272'}, {'text': {'type': 'plain_text', 'text': 'option2', 'emoji': True}, 'value': 'temp-6e14'}], 'action_id': 'item-1'}, 'label': {'type': 'plain_text', 'text': 'Another question', 'emoji': True}}]  # noqa: E231, E501
     # fmt: on
+
+
+@pytest.mark.no_run_around_tests
+@pytest.mark.parametrize(
+    "start, end, amount",
+    [
+        ("2021-01-11", "2021-01-11", 0),
+        ("2021-01-11", "2021-01-16", 5),  # Monday until Saturday
+        ("2021-01-09", "2021-01-11", 0),  # weekend
+        ("2021-01-11", "2022-01-10", 260),
+        ("2021-01-16", "2021-01-11", -5),
+    ],
+)
+def test_business_calendar_count(start, end, amount):
+    start = datetime.date.fromisoformat(start)
+    end = datetime.date.fromisoformat(end)
+    assert business_calendar.count(start, end) == amount
+
+
+@pytest.mark.no_run_around_tests
+@pytest.mark.parametrize(
+    "day, workdays, result",
+    [
+        ("2021-01-12", 0, "2021-01-12"),
+        ("2021-01-12", 1, "2021-01-13"),
+        ("2021-01-15", 1, "2021-01-18"),  # Friday to Monday
+        ("2021-01-16", 1, "2021-01-18"),  # Saturday to Monday
+        ("2021-01-12", 10, "2021-01-26"),
+        ("2021-01-18", -1, "2021-01-15"),
+        ("2021-01-17", -1, "2021-01-15"),
+        ("2021-01-26", -10, "2021-01-12"),
+    ],
+)
+def test_business_calendar_add(day, workdays, result):
+    day = datetime.date.fromisoformat(day)
+    assert business_calendar.add(day, workdays).isoformat() == result
+
+
+@pytest.mark.no_run_around_tests
+def test_business_calendar_holidays():
+    # Wednesday and a Saturday (which is ignored)
+    calendar = BusinessCalendar(
+        holidays=[datetime.date(2021, 1, 13), datetime.date(2021, 1, 16)]
+    )
+    monday = datetime.date(2021, 1, 11)
+
+    assert not calendar.is_workday(datetime.date(2021, 1, 13))
+    assert calendar.count(monday, datetime.date(2021, 1, 18)) == 4
+    assert calendar.add(monday, 2) == datetime.date(2021, 1, 14)
+    assert calendar.add(monday, 4) == datetime.date(2021, 1, 18)
+    assert calendar.add(datetime.date(2021, 1, 18), -3) == datetime.date(2021, 1, 12)
+    assert calendar.workday_number(monday, datetime.date(2021, 1, 14)) == 3
+
+
+@pytest.mark.no_run_around_tests
+def test_template_cache():
+    cache = TemplateCache(maxsize=2)
+
+    template = cache.get("Hi {{ first_name }}")
+    assert cache.get("Hi {{ first_name }}") is template
+    cache.get("Hi {{ last_name }}")
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 2, "maxsize": 2}
+
+    # Least recently used one gets dropped
+    cache.get("Hi {{ first_name }}")
+    cache.get("Hi {{ email }}")
+    cache.get("Hi {{ first_name }}")
+    cache.get("Hi {{ last_name }}")
+    assert cache.stats() == {"hits": 3, "misses": 4, "size": 2, "maxsize": 2}
+
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 2}
+
+
+@pytest.mark.no_run_around_tests
+def test_has_template_syntax():
+    assert has_template_syntax("Hi {{ first_name }}")
+    assert has_template_syntax("{% if manager %}yes{% endif %}")
+    assert has_template_syntax("Hi{# comment #}")
+    assert not has_template_syntax("Hi there, welcome {first_name} %}")
+
+
+PARITY_CONTEXT = {
+    "first_name": "<b>John</b> & co",
+    "last_name": 'O\'Neil "Jr"',
+    "manager": mark_safe("<i>Jane</i>"),
+    "buddy": "",
+    "position": None,
+    "start": datetime.date(2021, 1, 14),
+    "amount": 1500.5,
+    "access_overview": lazy(lambda: "Slack (<has access>)", str)(),
+    "department": lambda: "IT & Sales",
+}
+
+
+@pytest.mark.no_run_around_tests
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "No variables at all &nbsp; <b>html</b>",
+        "Hi {{ first_name }}",
+        "Hi {{first_name}} {{ last_name }}!",
+        "{{ first_name }}{{ first_name }}",
+        "Manager: {{ manager }}, buddy: {{ buddy }}, position: {{ position }}",
+        "Starting on {{ start }}, amount {{ amount }}",
+        "{{ access_overview }} in {{ department }}",
+        "Missing: {{ does_not_exist }}.",
+        "Unclosed {{ first_name and { last_name }",
+        "Multi\nline {{ first_name }}\n{{ last_name }}",
+    ],
+)
+def test_simple_template_parity(text):
+    assert SimpleTemplate.supports(text)
+    assert SimpleTemplate(text).render(Context(PARITY_CONTEXT)) == Template(
+        text
+    ).render(Context(PARITY_CONTEXT))
+
+
+@pytest.mark.no_run_around_tests
+@pytest.mark.parametrize(
+    "text",
+    [
+        "{{ first_name|upper }}",
+        "{{ first_name.0 }}",
+        "{{ None }}",
+        "{{ 1 }}",
+        '{{ "first_name" }}',
+        "{{ first_name.upper }}",
+        "{% if manager %}{{ manager }}{% endif %}",
+        "Hi{# comment #}",
+    ],
+)
+def test_simple_template_fallback(text):
+    assert not SimpleTemplate.supports(text)
+    assert isinstance(compile_template(text), Template)
+    # Still renders the same as before
+    assert compile_template(text).render(Context(PARITY_CONTEXT)) == Template(
+        text
+    ).render(Context(PARITY_CONTEXT))
+
+
+@pytest.mark.no_run_around_tests
+def test_benchmark_personalize_command():
+    out = StringIO()
+    err = StringIO()
+    call_command("benchmark_personalize", number=1, stdout=out, stderr=err)
+
+    assert "django:" in out.getvalue()
+    assert "simple:" in out.getvalue()
+    # Both engines gave the same output
+    assert err.getvalue() == ""
+
+
+@pytest.mark.django_db
+def test_tiered_cache(django_assert_num_queries):
+    cache.set("test_key", "value")
+    assert caches["database"].get("test_key") == "value"
+
+    # Read from the process, not from the database
+    with django_assert_num_queries(0):
+        assert cache.get("test_key") == "value"
+
+    # Another process changed it, the local value is used until it expires
+    caches["database"].set("test_key", "new value")
+    assert cache.get("test_key") == "value"
+    cache.clear_local()
+    assert cache.get("test_key") == "new value"
+
+    # Falsy values are cached too
+    cache.set("empty_key", None)
+    with django_assert_num_queries(0):
+        assert cache.get("empty_key", "default") is None
+
+    # Add only sets it when it's not in the database
+    assert not cache.add("test_key", "other value")
+    assert cache.add("new_key", "value")
+    assert caches["database"].get("new_key") == "value"
+
+    # Versions are passed on
+    cache.set("versioned_key", "v1")
+    cache.incr_version("versioned_key")
+    assert cache.get("versioned_key") is None
+    assert cache.get("versioned_key", version=2) == "v1"
+    assert caches["database"].get("versioned_key", version=2) == "v1"
+
+    # Only the missing values are fetched from the database
+    cache.clear_local()
+    cache.get("empty_key")
+    with django_assert_num_queries(1):
+        assert cache.get_many(["empty_key", "new_key", "unknown_key"]) == {
+            "empty_key": None,
+            "new_key": "value",
+        }
+
+    assert cache.touch("new_key")
+    assert not cache.touch("unknown_key")
+    assert cache.delete("test_key")
+    assert not cache.delete("test_key")
+    assert cache.get("test_key") is None
+    assert caches["database"].get("test_key") is None
+
+
+@pytest.mark.django_db
+def test_tiered_cache_without_shared_caches():
+    with pytest.raises(ImproperlyConfigured):
+        TieredCache("test", {"OPTIONS": {"SHARED_CACHES": []}})
+
+
+@pytest.mark.django_db
+def test_file_url_cache(settings, file_factory, monkeypatch):
+    settings.AWS_STORAGE_BUCKET_NAME = "xxx"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    file = file_factory()
+
+    # Client is shared
+    assert S3().client is S3().client
+
+    with (
+        freeze_time("2026-10-17") as frozen_time,
+        patch.object(
+            S3().client,
+            "generate_presigned_url",
+            wraps=S3().client.generate_presigned_url,
+        ) as generate_presigned_url,
+    ):
+        url = file.get_url()
+        assert file.key in url
+        assert file.get_url() == url
+        assert generate_presigned_url.call_count == 1
+
+        # Urls that are valid for a short time are not cached
+        S3().get_file(file.key, time=60)
+        S3().get_file(file.key, time=60)
+        assert generate_presigned_url.call_count == 3
+
+        frozen_time.tick(datetime.timedelta(days=5))
+        assert file.get_url() == url
+        assert generate_presigned_url.call_count == 3
+
+        # Almost expired urls are signed again
+        frozen_time.tick(datetime.timedelta(days=1, seconds=1))
+        file.get_url()
+        assert generate_presigned_url.call_count == 4
+
+
+@pytest.mark.django_db
+def test_content_file_urls(
+    settings, monkeypatch, django_assert_num_queries, to_do_factory, file_factory
+):
+    from admin.to_do.models import ToDo
+
+    settings.AWS_STORAGE_BUCKET_NAME = "xxx"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    files = file_factory.create_batch(3)
+    for file in files:
+        to_do_factory(
+            content={
+                "time": 0,
+                "blocks": [
+                    {
+                        "type": "image",
+                        "data": {"file": {"id": file.id, "url": ""}, "caption": ""},
+                    }
+                ],
+            }
+        )
+
+    # Files are not fetched when loading the items
+    with django_assert_num_queries(1):
+        to_dos = list(ToDo.objects.all())
+
+    # All files are fetched at once when the first url is used
+    with CaptureQueriesContext(connection) as queries:
+        for to_do, file in zip(to_dos, files):
+            assert file.key in str(to_do.content["blocks"][0]["data"]["file"]["url"])
+    assert len([q for q in queries if "misc_file" in q["sql"]]) == 1
+
+    # Loading them again starts a new batch, files are fetched once per batch
+    with django_assert_num_queries(2):
+        for to_do in ToDo.objects.all():
+            str(to_do.content["blocks"][0]["data"]["file"]["url"])
+
+    # Batches are bounded
+    monkeypatch.setattr(file_urls, "max_batch_size", 2)
+    with django_assert_num_queries(3):
+        for to_do in ToDo.objects.all():
+            str(to_do.content["blocks"][0]["data"]["file"]["url"])
+
+    # Urls are stored as plain strings
+    to_do = to_dos[0]
+    to_do.save()
+    to_do = ToDo.objects.filter(id=to_do.id).values_list("content", flat=True)[0]
+    assert files[0].key in to_do["blocks"][0]["data"]["file"]["url"]
+
+
+@pytest.mark.django_db
+def test_lazy_decryption(integration_factory):
+    from admin.integrations.models import Integration
+
+    integration = integration_factory(token="secret", extra_args={"key": "value"})
+
+    def ciphertext(field):
+        return bytes(
+            Integration.objects.values_list(field, flat=True)
+            .get(id=integration.id)
+            .value
+        )
+
+    token = ciphertext("token")
+    extra_args = ciphertext("extra_args")
+
+    # Nothing is decrypted when it's loaded
+    integration = Integration.objects.get(id=integration.id)
+    assert isinstance(integration.__dict__["token"], Ciphertext)
+
+    # Unchanged values are saved as they were, even after they were used
+    assert integration.token == "secret"
+    assert integration.extra_args == {"key": "value"}
+    integration.save()
+    assert ciphertext("token") == token
+    assert ciphertext("extra_args") == extra_args
+
+    # Changed values are encrypted again
+    integration.extra_args["key"] = "other value"
+    integration.token = "new secret"
+    integration.save()
+    assert ciphertext("token") != token
+    assert ciphertext("extra_args") != extra_args
+    integration = Integration.objects.get(id=integration.id)
+    assert integration.token == "new secret"
+    assert integration.extra_args == {"key": "other value"}
+
+
+def reset_fernet_keys():
+    # Keys are cached on the fields
+    from misc.management.commands.rotate_encrypted_fields import get_encrypted_fields
+
+    for _model, fields in get_encrypted_fields():
+        for field in fields:
+            for prop in ["keys", "fernet_keys", "fernet", "current_fernet"]:
+                field.__dict__.pop(prop, None)
+
+
+@pytest.mark.django_db
+def test_rotate_encrypted_fields_command(settings, integration_factory):
+    from cryptography.fernet import Fernet
+
+    from admin.integrations.models import Integration
+    from misc.hkdf import derive_fernet_key
+
+    integrations = integration_factory.create_batch(3, token="secret")
+    integration_factory(token="secret", extra_args=None)
+    settings.FERNET_KEYS = ["new key", settings.SECRET_KEY]
+    reset_fernet_keys()
+    try:
+        out = StringIO()
+        call_command("rotate_encrypted_fields", chunk_size=2, stdout=out)
+        assert "integrations.Integration: 4 rows" in out.getvalue()
+        assert "Rotated" in out.getvalue()
+
+        # Only the new key is needed now
+        new_key = Fernet(derive_fernet_key("new key"))
+        for ciphertext in Integration.objects.values_list("token", flat=True):
+            assert new_key.decrypt(ciphertext.value) == b"secret"
+
+        settings.FERNET_KEYS = ["new key"]
+        reset_fernet_keys()
+        assert Integration.objects.get(id=integrations[0].id).token == "secret"
+        assert Integration.objects.last().extra_args is None
+    finally:
+        del settings.FERNET_KEYS
+        reset_fernet_keys()
+
+
+@pytest.mark.django_db
+def test_rotate_encrypted_fields_stale_copies(settings, integration_factory):
+    from cryptography.fernet import Fernet
+
+    from admin.integrations.models import Integration
+    from misc.hkdf import derive_fernet_key
+
+    integration = integration_factory(token="secret", extra_args={"key": "value"})
+    # Loaded before the rotation, one field used and one not
+    stale = Integration.objects.get(id=integration.id)
+    assert stale.token == "secret"
+    settings.FERNET_KEYS = ["new key", settings.SECRET_KEY]
+    reset_fernet_keys()
+    try:
+        call_command("rotate_encrypted_fields", stdout=StringIO())
+
+        # Saving the old copy doesn't bring back the old key
+        stale.save()
+        new_key = Fernet(derive_fernet_key("new key"))
+        token, extra_args = Integration.objects.values_list("token", "extra_args").get(
+            id=integration.id
+        )
+        assert new_key.decrypt(token.value) == b"secret"
+        assert json.loads(new_key.decrypt(extra_args.value)) == {"key": "value"}
+    finally:
+        del settings.FERNET_KEYS
+        reset_fernet_keys()
+
+
+@pytest.mark.django_db
+def test_rotate_encrypted_fields_command_resume(settings, integration_factory):
+    from cryptography.fernet import Fernet
+
+    from admin.integrations.models import Integration
+    from misc.hkdf import derive_fernet_key
+    from misc.management.commands.rotate_encrypted_fields import get_checkpoint_key
+
+    def get_checkpoint():
+        return get_checkpoint_key(Integration, [Integration._meta.get_field("token")])
+
+    integrations = integration_factory.create_batch(4, token="secret")
+    try:
+        # Aborted run to a key that was never used in the end
+        settings.FERNET_KEYS = ["abandoned key", settings.SECRET_KEY]
+        reset_fernet_keys()
+        cache.set(get_checkpoint(), integrations[-1].id)
+
+        # Its progress doesn't count for a new key
+        settings.FERNET_KEYS = ["new key", settings.SECRET_KEY]
+        reset_fernet_keys()
+        out = StringIO()
+        call_command("rotate_encrypted_fields", stdout=out)
+        assert "integrations.Integration: 4 rows" in out.getvalue()
+        new_key = Fernet(derive_fernet_key("new key"))
+        for ciphertext in Integration.objects.values_list("token", flat=True):
+            assert new_key.decrypt(ciphertext.value) == b"secret"
+
+        # Continues after the last row of an aborted run to the same key
+        cache.set(get_checkpoint(), integrations[1].id)
+        out = StringIO()
+        call_command("rotate_encrypted_fields", stdout=out)
+        assert "integrations.Integration: 2 rows" in out.getvalue()
+        assert cache.get(get_checkpoint()) is None
+    finally:
+        del settings.FERNET_KEYS
+        reset_fernet_keys()
+
+
+@pytest.mark.django_db
+def test_rotate_encrypted_fields_command_one_key():
+    out = StringIO()
+    call_command("rotate_encrypted_fields", stdout=out)
+    assert "nothing to rotate" in out.getvalue()
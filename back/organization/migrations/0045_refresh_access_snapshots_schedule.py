@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    def load_schedules(apps, schema_editor):
+        from django_q.models import Schedule
+
+        Schedule.objects.create(
+            func="users.tasks.refresh_access_snapshots",
+            name="Refresh integration access of users",
+            schedule_type=Schedule.CRON,
+            cron="30 * * * *",
+        )
+
+    def remove_schedules(apps, schema_editor):
+        from django_q.models import Schedule
+
+        Schedule.objects.filter(func="users.tasks.refresh_access_snapshots").delete()
+
+    dependencies = [
+        ("organization", "0044_remove_organization_credentials_login_and_more"),
+        ("users", "0043_accesssnapshot"),
+    ]
+
+    operations = [
+        migrations.RunPython(load_schedules, remove_schedules),
+    ]
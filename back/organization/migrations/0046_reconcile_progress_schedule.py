@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    def load_schedules(apps, schema_editor):
+        from django_q.models import Schedule
+
+        Schedule.objects.create(
+            func="users.tasks.reconcile_progress",
+            name="Reconcile progress of users",
+            schedule_type=Schedule.CRON,
+            cron="15 3 * * *",
+        )
+
+    def remove_schedules(apps, schema_editor):
+        from django_q.models import Schedule
+
+        Schedule.objects.filter(func="users.tasks.reconcile_progress").delete()
+
+    dependencies = [
+        ("organization", "0045_refresh_access_snapshots_schedule"),
+    ]
+
+    operations = [
+        migrations.RunPython(load_schedules, remove_schedules),
+    ]
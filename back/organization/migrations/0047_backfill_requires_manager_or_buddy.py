@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Same check as `organization.utils.has_manager_or_buddy_tags`, but done in the
+# database, so we don't have to load the content of every item
+TAG_CHECK = (
+    "COALESCE("
+    "strpos(regexp_replace({field}::text, '\\s', '', 'g'), '{{{{{tag}}}}}') > 0 "
+    "OR strpos(regexp_replace({field}::text, '\\s', '', 'g'), "
+    "'{{{{{tag}_email}}}}') > 0, "
+    "false)"
+)
+
+
+def backfill_sql(table, field):
+    return (
+        f"UPDATE {table} SET "
+        f"requires_manager = {TAG_CHECK.format(field=field, tag='manager')}, "
+        f"requires_buddy = {TAG_CHECK.format(field=field, tag='buddy')};"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("organization", "0046_reconcile_progress_schedule"),
+        ("appointments", "0009_appointment_requires_buddy_and_more"),
+        ("badges", "0011_badge_requires_buddy_badge_requires_manager"),
+        ("hardware", "0002_hardware_requires_buddy_hardware_requires_manager"),
+        ("integrations", "0027_integration_requires_buddy_and_more"),
+        ("preboarding", "0015_preboarding_requires_buddy_and_more"),
+        ("to_do", "0021_todo_requires_buddy_todo_requires_manager"),
+    ]
+
+    operations = [
+        migrations.RunSQL(backfill_sql(table, field), migrations.RunSQL.noop)
+        for table, field in [
+            ("to_do_todo", "content"),
+            ("preboarding_preboarding", "content"),
+            ("badges_badge", "content"),
+            ("appointments_appointment", "content"),
+            ("hardware_hardware", "content"),
+            ("integrations_integration", "manifest"),
+        ]
+    ]
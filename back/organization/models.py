@@ -1,3 +1,6 @@
+import copy
+import time
+import uuid
 from datetime import datetime, timedelta
 
 import pytz
@@ -6,6 +9,8 @@ from django.contrib.postgres.fields import ArrayField
 from django.core.cache import cache
 from django.db import models
 from django.db.models import CheckConstraint, Q
+from django.db.models.signals import class_prepared, post_delete, post_save
+from django.dispatch import receiver
 from django.template import Context, Template
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -13,16 +18,53 @@ from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from misc.mixins import ContentMixin
+from misc.mixins import ContentMixin, TrackChangesMixin
 from misc.models import File
 
 
 class ObjectManager(models.Manager):
-    def get(self):
-        return self.get_queryset().first()
+    """
+    The organization is needed for nearly every request and task, so every process
+    keeps its own copy. The version in the shared cache is bumped when the
+    organization changes, which lets other processes know they have to reload it.
+    """
+
+    version_cache_key = "organization_version"
 
+    def __init__(self):
+        super().__init__()
+        # (version, last time the version was checked, organization)
+        self._cached = None
 
-class Organization(models.Model):
+    def get(self):
+        cached = self._cached
+        now = time.monotonic()
+        if (
+            cached is None
+            or now - cached[1] >= settings.ORGANIZATION_CACHE_CHECK_INTERVAL
+        ):
+            version = cache.get(self.version_cache_key)
+            if version is None:
+                cache.add(self.version_cache_key, uuid.uuid4().hex, None)
+                version = cache.get(self.version_cache_key)
+            if cached is None or cached[0] != version:
+                cached = (version, now, self.get_queryset().first())
+            else:
+                cached = (version, now, cached[2])
+            self._cached = cached
+
+        # Hand out copies, so changes that don't get saved don't end up in the cache.
+        # Deep copies, as lists/dicts could otherwise be changed in place
+        return copy.deepcopy(cached[2])
+
+    def clear_cache(self, shared=True):
+        # Only clearing it locally leaves the other processes alone
+        if shared:
+            cache.set(self.version_cache_key, uuid.uuid4().hex, None)
+        self._cached = None
+
+
+class Organization(TrackChangesMixin, models.Model):
     name = models.CharField(verbose_name=_("Name"), max_length=500)
     language = models.CharField(
         verbose_name=_("Language"),
@@ -156,6 +198,42 @@ class Organization(models.Model):
             ),
         ]
 
+    def save(self, *args, **kwargs):
+        reschedule = self.pk is not None and self.has_changed("timezone")
+        if (
+            self.pk is not None
+            and "update_fields" not in kwargs
+            and not kwargs.get("force_insert")
+            and not self.has_changed("timed_triggers_last_check")
+        ):
+            # The timed triggers move their checkpoint with an update. An older
+            # (cached) copy of the organization shouldn't move it back.
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "timed_triggers_last_check"
+            ]
+        super().save(*args, **kwargs)
+        self.reset_loaded_values()
+
+        # Users without a timezone fall back to the organization's timezone, so their
+        # timed conditions will trigger at a different moment now
+        if reschedule:
+            from admin.sequences.models import Condition, ScheduledCondition
+            from users.models import User
+
+            ScheduledCondition.objects.schedule_for_users(
+                User.objects.filter(
+                    timezone="",
+                    conditions__condition_type__in=[
+                        Condition.Type.BEFORE,
+                        Condition.Type.AFTER,
+                    ],
+                )
+                .values_list("id", flat=True)
+                .distinct()
+            )
+
     @property
     def base_color_rgb(self):
         base_color = self.base_color.strip("#")
@@ -188,11 +266,17 @@ class Organization(models.Model):
 
         # Check if cache option already exists AND the logo name is in the url
         # If the latter is not the case, then the logo changed and cache should refresh
-        if cache.get("logo_url", None) is None or self.logo.name not in cache.get(
-            "logo_url"
-        ):
-            cache.set("logo_url", self.logo.get_url(), 3500)
-        return cache.get("logo_url")
+        logo_url = cache.get("logo_url")
+        if logo_url is None or self.logo.name not in logo_url:
+            logo_url = self.logo.get_url()
+            cache.set("logo_url", logo_url, 3500)
+        return logo_url
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def clear_organization_cache(sender, **kwargs):
+    Organization.object.clear_cache()
 
 
 class Tag(models.Model):
@@ -240,6 +324,9 @@ class BaseItem(ContentMixin, models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     template = models.BooleanField(default=True)
+    # Cached result of `requires_assigned_manager_or_buddy`, updated on save
+    requires_manager = models.BooleanField(default=False, editable=False)
+    requires_buddy = models.BooleanField(default=False, editable=False)
 
     objects = ObjectsManager()
     templates = TemplateManager()
@@ -262,6 +349,9 @@ class BaseItem(ContentMixin, models.Model):
             for i in self.tags:
                 if i != "":
                     Tag.objects.get_or_create(name=i)
+        self.requires_manager, self.requires_buddy = (
+            self.requires_assigned_manager_or_buddy
+        )
         super(BaseItem, self).save(*args, **kwargs)
 
     def class_name(self):
@@ -287,6 +377,24 @@ class BaseItem(ContentMixin, models.Model):
         return blocks
 
 
+def set_requires_manager_or_buddy(sender, instance, raw, **kwargs):
+    # `loaddata` skips `save()`, so the flags of fixture items are set here
+    if not raw:
+        return
+    requires_manager, requires_buddy = instance.requires_assigned_manager_or_buddy
+    sender._base_manager.filter(pk=instance.pk).update(
+        requires_manager=requires_manager, requires_buddy=requires_buddy
+    )
+
+
+@receiver(class_prepared)
+def connect_base_item_signals(sender, **kwargs):
+    # Only listen to saves of items, not to every model in the project. Items are
+    # defined after this module is loaded, so this runs for each one of them.
+    if issubclass(sender, BaseItem):
+        post_save.connect(set_requires_manager_or_buddy, sender=sender)
+
+
 class Notification(models.Model):
     class Type(models.TextChoices):
         ADDED_TODO = "added_todo", _("A new to do item has been added")
@@ -1,14 +1,21 @@
 import json
 from datetime import timedelta
+from importlib import import_module
 
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.management import call_command
+from django.db import connection
 from django.urls import reverse
 from django.utils import timezone
 
+from admin.badges.models import Badge
+from admin.preboarding.models import Preboarding
+from admin.resources.models import Resource
+from admin.to_do.models import ToDo
 from misc.models import File
+from slack_bot.models import SlackChannel
 
 from .models import Notification, Organization
 
@@ -226,6 +233,9 @@ def test_notification_can_delete(notification_factory):
 @pytest.mark.no_run_around_tests
 @pytest.mark.django_db(reset_sequences=True)
 def test_initial_setup_page(client):
+    # flushed by other transactional tests
+    SlackChannel.objects.get_or_create(name="general")
+
     # account login redirects to setup page
     url = reverse("account_login")
     response = client.get(url, follow=True)
@@ -260,6 +270,40 @@ def test_initial_setup_page(client):
     assert get_user_model().objects.all().exists()
 
 
+@pytest.mark.no_run_around_tests
+@pytest.mark.django_db(reset_sequences=True)
+def test_initial_setup_sets_requires_manager_or_buddy(client):
+    # flushed by other transactional tests
+    SlackChannel.objects.get_or_create(name="general")
+
+    client.post(
+        reverse("setup"),
+        data={
+            "name": "test org",
+            "language": "en",
+            "timezone": "UTC",
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "john1@chiefonboarding.com",
+            "password1": "superstrongpss123",
+            "password2": "superstrongpss123",
+        },
+    )
+
+    # fixtures are loaded without `save()`, flags should still match the content
+    items = [
+        item
+        for model in (Badge, Preboarding, Resource, ToDo)
+        for item in model.objects.all()
+    ]
+    assert any(item.requires_buddy for item in items)
+    for item in items:
+        assert (
+            item.requires_manager,
+            item.requires_buddy,
+        ) == item.requires_assigned_manager_or_buddy
+
+
 @pytest.mark.django_db
 def test_initial_setup_page_with_org_created(client):
     url = reverse("setup")
@@ -293,6 +337,62 @@ def test_reset_timed_triggers_last_check_command_with_no_org():
     call_command("reset_timed_triggers_last_check")
 
 
+@pytest.mark.django_db
+def test_organization_cache(settings, django_assert_num_queries):
+    settings.ORGANIZATION_CACHE_CHECK_INTERVAL = 60
+    org = Organization.object.get()
+
+    with django_assert_num_queries(0):
+        cached_org = Organization.object.get()
+    assert cached_org == org
+    # Every caller gets its own copy
+    cached_org.name = "Changed, but not saved"
+    assert Organization.object.get().name == org.name
+
+    # Saving the org reloads it
+    org.name = "New name"
+    org.save()
+    assert Organization.object.get().name == "New name"
+
+    # Another process changed the org, only picked up after the interval
+    Organization.objects.update(name="Changed elsewhere")
+    cache.set(Organization.object.version_cache_key, "other process")
+    assert Organization.object.get().name == "New name"
+    settings.ORGANIZATION_CACHE_CHECK_INTERVAL = 0
+    assert Organization.object.get().name == "Changed elsewhere"
+
+    # Only the version is checked when nothing changed
+    with django_assert_num_queries(0):
+        Organization.object.get()
+
+
+@pytest.mark.django_db
+def test_organization_cache_copies(settings):
+    settings.ORGANIZATION_CACHE_CHECK_INTERVAL = 60
+    org = Organization.object.get()
+
+    # Lists are not shared with the cached organization
+    org.ignored_user_emails.append("changed@example.com")
+    assert "changed@example.com" not in Organization.object.get().ignored_user_emails
+
+    # The timed triggers moved their checkpoint in the meantime
+    checkpoint = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+    Organization.objects.update(timed_triggers_last_check=checkpoint)
+
+    # Saving an older copy doesn't move it back
+    org.name = "New name"
+    org.save()
+    org = Organization.objects.get()
+    assert org.name == "New name"
+    assert org.timed_triggers_last_check == checkpoint
+
+    # Unless it's changed on purpose
+    org.timed_triggers_last_check = checkpoint - timedelta(days=1)
+    org.save()
+    org = Organization.objects.get()
+    assert org.timed_triggers_last_check == checkpoint - timedelta(days=1)
+
+
 @pytest.mark.django_db()
 def test_health_check(client):
     response = client.get("/health")
@@ -344,3 +444,43 @@ def test_search(
     assert employee1.full_name in response.content.decode()
     # doesn't have the "test" query in it
     assert employee2.full_name not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_backfill_requires_manager_or_buddy(to_do_factory, custom_integration_factory):
+    backfill_sql = import_module(
+        "organization.migrations.0047_backfill_requires_manager_or_buddy"
+    ).backfill_sql
+    to_do1 = to_do_factory()
+    to_do2 = to_do_factory()
+    integration = custom_integration_factory()
+    # Bypass save, so the flags are not set yet
+    type(to_do1).objects.filter(id=to_do1.id).update(
+        content={
+            "blocks": [
+                {
+                    "type": "paragraph",
+                    "data": {"text": "Hi {{ manager }}, {{buddy_email}}"},
+                }
+            ]
+        }
+    )
+    type(integration).objects.filter(id=integration.id).update(
+        manifest={"execute": [{"data": {"email": "{{ buddy_email  }}"}}]}
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(backfill_sql("to_do_todo", "content"))
+        cursor.execute(backfill_sql("integrations_integration", "manifest"))
+
+    to_do1.refresh_from_db()
+    to_do2.refresh_from_db()
+    integration.refresh_from_db()
+    assert to_do1.requires_manager and to_do1.requires_buddy
+    assert not to_do2.requires_manager and not to_do2.requires_buddy
+    assert not integration.requires_manager and integration.requires_buddy
+    # Same result as when saving
+    to_do1.save()
+    integration.save()
+    assert to_do1.requires_manager and to_do1.requires_buddy
+    assert not integration.requires_manager and integration.requires_buddy
@@ -8,6 +8,7 @@ from anymail.exceptions import (
 )
 from django.conf import settings
 from django.core.mail import send_mail
+from django.core.serializers.json import DjangoJSONEncoder
 
 from organization.models import Notification
 
@@ -65,7 +66,7 @@ def has_manager_or_buddy_tags(content_json):
         return False, False
 
     # convert to string and then remove all spaces, so we can easily match
-    content_str = json.dumps(content_json)
+    content_str = json.dumps(content_json, cls=DjangoJSONEncoder)
     content_str_no_spaces = "".join(content_str.split())
 
     manager_tags = ["{{manager}}", "{{manager_email}}"]
@@ -5,6 +5,7 @@ from django.utils.formats import localize
 from django.utils.translation import gettext as _
 
 from admin.integrations.models import Integration
+from misc.business_calendar import business_calendar
 from organization.models import Organization, WelcomeMessage
 from slack_bot.slack_intro import SlackIntro
 from slack_bot.slack_misc import get_new_hire_first_message_buttons
@@ -12,6 +13,7 @@ from slack_bot.slack_resource import SlackResource
 from slack_bot.slack_to_do import SlackToDoManager
 from slack_bot.utils import Slack, actions, button, paragraph
 from users.models import ResourceUser, ToDoUser
+from users.utils import group_by_local_time
 
 
 def link_slack_users(users=[]):
@@ -87,58 +89,68 @@ def update_new_hire():
     ):
         return
 
-    for user in get_user_model().new_hires.with_slack():
-        local_datetime = user.get_local_time()
-
-        if not (
-            local_datetime.hour == 8
-            and local_datetime.weekday() < 5
-            and local_datetime.date() >= user.start_day
-        ):
+    # Only new hires for whom it's 8 am on a weekday and that have started
+    for local_datetime, new_hires in group_by_local_time(
+        get_user_model().new_hires.with_slack(), hour=8
+    ):
+        if local_datetime.weekday() >= 5:
             continue
 
-        translation.activate(user.language)
+        # Everyone in this group shares the same local date, so the workday only
+        # depends on the start day
+        local_date = local_datetime.date()
+        workdays = {}
+        for user in new_hires.filter(start_day__lte=local_date):
+            if user.start_day not in workdays:
+                workdays[user.start_day] = business_calendar.workday_number(
+                    user.start_day, local_date
+                )
+            user.workday = workdays[user.start_day]
+            translation.activate(user.language)
 
-        overdue_items = ToDoUser.objects.overdue(user)
-        tasks = ToDoUser.objects.due_today(user) | overdue_items
+            overdue_items = ToDoUser.objects.overdue(user)
+            tasks = ToDoUser.objects.due_today(user) | overdue_items
 
-        courses_due = ResourceUser.objects.filter(
-            user=user, resource__on_day__lte=user.workday
-        )
-        # Filter out completed courses
-        course_blocks = [
-            SlackResource(course, user).get_block()
-            for course in courses_due
-            if course.is_course
-        ]
-
-        if len(course_blocks):
-            course_blocks.insert(
-                0, paragraph(_("Here are some courses that you need to complete"))
-            )
-            Slack().send_message(
-                blocks=course_blocks,
-                text=_("Here are some courses that you need to complete"),
-                channel=user.slack_user_id,
+            courses_due = ResourceUser.objects.filter(
+                user=user, resource__on_day__lte=user.workday
             )
+            # Filter out completed courses
+            course_blocks = [
+                SlackResource(course, user).get_block()
+                for course in courses_due
+                if course.is_course
+            ]
 
-        # If any overdue tasks exist, then notify the user
-        if tasks.exists():
-            if overdue_items.exists():
-                text = _(
-                    "Good morning! These are the tasks you need to complete. Some to "
-                    "do items are overdue. Please complete those as soon as possible!"
+            if len(course_blocks):
+                course_blocks.insert(
+                    0, paragraph(_("Here are some courses that you need to complete"))
                 )
-            else:
-                text = _(
-                    "Good morning! These are the tasks you need to complete today:"
+                Slack().send_message(
+                    blocks=course_blocks,
+                    text=_("Here are some courses that you need to complete"),
+                    channel=user.slack_user_id,
                 )
 
-            blocks = SlackToDoManager(user).get_blocks(
-                tasks.values_list("id", flat=True),
-                text=text,
-            )
-            Slack().send_message(blocks=blocks, text=text, channel=user.slack_user_id)
+            # If any overdue tasks exist, then notify the user
+            if tasks.exists():
+                if overdue_items.exists():
+                    text = _(
+                        "Good morning! These are the tasks you need to complete. Some "
+                        "to do items are overdue. Please complete those as soon as "
+                        "possible!"
+                    )
+                else:
+                    text = _(
+                        "Good morning! These are the tasks you need to complete today:"
+                    )
+
+                blocks = SlackToDoManager(user).get_blocks(
+                    tasks.values_list("id", flat=True),
+                    text=text,
+                )
+                Slack().send_message(
+                    blocks=blocks, text=text, channel=user.slack_user_id
+                )
 
 
 def first_day_reminder():
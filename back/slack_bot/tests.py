@@ -9,6 +9,7 @@ from django.utils.formats import localize
 from freezegun import freeze_time
 
 from admin.integrations.models import Integration
+from misc.business_calendar import business_calendar
 from organization.models import Organization, WelcomeMessage
 from slack_bot.models import SlackChannel
 from slack_bot.tasks import (
@@ -2187,6 +2188,33 @@ def test_update_new_hire_with_to_do_updates_overdue(
     ]
 
 
+@pytest.mark.django_db
+@freeze_time("2022-05-13 08:00:00")
+def test_update_new_hire_workday_per_start_day(
+    new_hire_factory, integration_factory, to_do_user_factory
+):
+    # Enable Slack
+    integration_factory(integration=Integration.Type.SLACK_BOT)
+
+    start_day = datetime.now().date() - timedelta(days=2)
+    for slack_user_id in ["slackx", "slacky"]:
+        new_hire = new_hire_factory(start_day=start_day, slack_user_id=slack_user_id)
+        to_do_user_factory(user=new_hire, to_do__due_on_day=3)
+
+    with patch(
+        "slack_bot.tasks.business_calendar.workday_number",
+        wraps=business_calendar.workday_number,
+    ) as workday_number:
+        update_new_hire()
+
+    # Same timezone and start day, so only calculated once
+    workday_number.assert_called_once_with(start_day, start_day + timedelta(days=2))
+    assert (
+        cache.get("slack_text")
+        == "Good morning! These are the tasks you need to complete today:"
+    )
+
+
 @pytest.mark.django_db
 @freeze_time("2022-05-13 08:00:00")
 def test_first_day_reminder(new_hire_factory, integration_factory):
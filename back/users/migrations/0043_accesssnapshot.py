@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0042_remove_user_requires_otp_remove_user_totp_secret_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccessSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("access", models.JSONField(default=list)),
+                ("updated_on", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="access_snapshot",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
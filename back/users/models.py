@@ -1,14 +1,32 @@
+import operator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import reduce
+from itertools import repeat
+from types import MappingProxyType
 
 import pytz
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
-from django.db import models
-from django.db.models import CheckConstraint, Q
-from django.template import Context, Template
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.models import (
+    CheckConstraint,
+    Exists,
+    F,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.template import Context
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.utils.functional import cached_property, lazy
 from django.utils.translation import gettext_lazy as _
@@ -21,9 +39,19 @@ from admin.integrations.models import Integration
 from admin.introductions.models import Introduction
 from admin.preboarding.models import Preboarding
 from admin.resources.models import CourseAnswer, Resource
-from admin.sequences.models import Condition
+from admin.sequences.models import (
+    Condition,
+    ExternalMessage,
+    IntegrationConfig,
+    PendingAdminTask,
+    ScheduledCondition,
+    TriggerCounter,
+)
 from admin.to_do.models import ToDo
+from misc.business_calendar import business_calendar
+from misc.mixins import TrackChangesMixin
 from misc.models import File
+from misc.template_cache import has_template_syntax, template_cache
 from organization.models import Notification
 from slack_bot.utils import Slack, paragraph
 
@@ -59,6 +87,168 @@ class CustomUserManager(BaseUserManager):
         """
         return get_random_string(length, allowed_chars)
 
+    def make_unique_urls(self, amount):
+        # Random strings that are not used as a `unique_url` yet
+        while True:
+            unique_urls = {get_random_string(length=8) for _ in range(amount)}
+            if (
+                len(unique_urls) == amount
+                and not self.filter(unique_url__in=unique_urls).exists()
+            ):
+                return list(unique_urls)
+
+    def add_sequences(self, users, sequences):
+        # Same as `User.add_sequences`, but for a group of users at once
+        for sequence in sequences:
+            sequence.assign_to_users(users)
+            Notification.objects.bulk_create(
+                [
+                    Notification(
+                        notification_type=Notification.Type.ADDED_SEQUENCE,
+                        item_id=sequence.id,
+                        created_for=user,
+                        extra_text=sequence.name,
+                    )
+                    for user in users
+                ]
+            )
+
+    def progress_counts(self):
+        """
+        Expressions that count the (completed) tasks of a user in the database.
+        Items that are both in a condition and assigned to the user are only counted
+        once.
+        """
+        total_to_dos = _count(
+            ToDoUser.objects.filter(user_id=OuterRef("pk")), "to_do_id"
+        ) + _count(
+            Condition.to_do.through.objects.filter(
+                condition__user=OuterRef("pk")
+            ).exclude(
+                Exists(
+                    ToDoUser.objects.filter(
+                        user_id=OuterRef(OuterRef("pk")), to_do_id=OuterRef("todo_id")
+                    )
+                )
+            ),
+            "todo_id",
+        )
+        total_courses = _count(
+            ResourceUser.objects.filter(user_id=OuterRef("pk"), resource__course=True),
+            "resource_id",
+        ) + _count(
+            Condition.resources.through.objects.filter(
+                condition__user=OuterRef("pk"), resource__course=True
+            ).exclude(
+                Exists(
+                    ResourceUser.objects.filter(
+                        user_id=OuterRef(OuterRef("pk")),
+                        resource_id=OuterRef("resource_id"),
+                    )
+                )
+            ),
+            "resource_id",
+        )
+        completed = _count(
+            ToDoUser.objects.filter(user_id=OuterRef("pk"), completed=True)
+        ) + _count(
+            ResourceUser.objects.filter(
+                user_id=OuterRef("pk"), resource__course=True, completed_course=True
+            )
+        )
+        return {
+            "total_tasks": total_to_dos + total_courses,
+            "completed_tasks": completed,
+        }
+
+    def refresh_progress(self, user_ids):
+        # Recounts the (completed) tasks of the users with one query
+        self.filter(id__in=user_ids).update(**self.progress_counts())
+
+    def reconcile_progress(self):
+        """
+        Repairs the (completed) tasks of all users that drifted from the actual
+        amount. Returns the amount of users that got updated.
+        """
+        counts = self.progress_counts()
+        return (
+            self.annotate(
+                actual_total_tasks=counts["total_tasks"],
+                actual_completed_tasks=counts["completed_tasks"],
+            )
+            .filter(
+                ~Q(total_tasks=F("actual_total_tasks"))
+                | ~Q(completed_tasks=F("actual_completed_tasks"))
+            )
+            .update(**counts)
+        )
+
+    def add_completed_tasks(self, user_id, amount=1):
+        self.filter(id=user_id).update(completed_tasks=F("completed_tasks") + amount)
+
+    def missing_extra_info(self, users):
+        """
+        Figures out which extra info integrations still need from the users, with
+        one query for all users. Returns a dict with the user id as key and a list
+        of the missing `extra_user_info` items as value. The result is also cached
+        on the users, so `user.missing_extra_info` doesn't do another query.
+        """
+        users = list(users)
+        # Catalog with the requested info per integration, and the integrations
+        # each user will get, in the order they were added
+        catalog = {}
+        integrations = {user.id: [] for user in users}
+        extra_user_info_path = (
+            "condition__integration_configs__integration__manifest__extra_user_info"
+        )
+        for user_id, integration_id, extra_user_info in (
+            self.model.conditions.through.objects.filter(
+                user_id__in=integrations.keys(),
+                **{f"{extra_user_info_path}__isnull": False},
+            )
+            .values_list(
+                "user_id",
+                "condition__integration_configs__integration_id",
+                extra_user_info_path,
+            )
+            .order_by("id", "condition__integration_configs__id")
+        ):
+            catalog.setdefault(integration_id, extra_user_info)
+            if integration_id not in integrations[user_id]:
+                integrations[user_id].append(integration_id)
+
+        missing = {}
+        for user in users:
+            # Deduplicate on the ID, so other props could be different, but it
+            # still wouldn't show it twice
+            seen = set(user.extra_fields.keys())
+            missing[user.id] = []
+            for integration_id in integrations[user.id]:
+                for item in catalog[integration_id]:
+                    if item["id"] not in seen:
+                        seen.add(item["id"])
+                        missing[user.id].append(item)
+            user.__dict__["missing_extra_info"] = missing[user.id]
+        return missing
+
+
+def _count(queryset, field="id"):
+    # Amount of distinct values of `field` in the queryset, as a subquery
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .annotate(
+                count=Func(
+                    F(field),
+                    function="COUNT",
+                    template="%(function)s(DISTINCT %(expressions)s)",
+                )
+            )
+            .values("count")[:1]
+        ),
+        0,
+    )
+
 
 class ManagerSlackManager(models.Manager):
     def get_queryset(self):
@@ -112,7 +302,7 @@ class AdminManager(models.Manager):
         return super().get_queryset().filter(role=get_user_model().Role.ADMIN)
 
 
-class User(AbstractBaseUser):
+class User(TrackChangesMixin, AbstractBaseUser):
     class Role(models.IntegerChoices):
         NEWHIRE = 0, _("New hire")
         ADMIN = 1, _("Administrator")
@@ -301,30 +491,7 @@ class User(AbstractBaseUser):
 
     @cached_property
     def missing_extra_info(self):
-        extra_info = self.conditions.filter(
-            integration_configs__isnull=False,
-            integration_configs__integration__manifest__extra_user_info__isnull=False,
-        ).values_list(
-            "integration_configs__integration__manifest__extra_user_info", flat=True
-        )
-
-        # We now have arrays within extra_info: [[{..}], [{..}, {..}]]. Let's make one
-        # array with all items: [{..}, {..}, {..}] and remove the duplicates.
-        # Loop through both arrays and then add it, if it doesn't exist already.
-        # Do the check on the ID, so other props could be different, but it still
-        # wouldn't show it.
-        extra_user_info = []
-        for requested_info_arr in extra_info:
-            for requested_info in requested_info_arr:
-                if requested_info["id"] not in [item["id"] for item in extra_user_info]:
-                    extra_user_info.append(requested_info)
-
-        # Only return what we still need
-        return [
-            item
-            for item in extra_user_info
-            if item["id"] not in self.extra_fields.keys()
-        ]
+        return User.objects.missing_extra_info([self])[self.id]
 
     def requires_manager_or_buddy(self):
         has_buddy = self.buddy_id is not None
@@ -332,77 +499,22 @@ class User(AbstractBaseUser):
         # end early if both are already filled
         if has_buddy and has_manager:
             return {"manager": False, "buddy": False}
-        # not all items have to be checked. Introductions for example, doesn't have a
-        # content field.
-        to_check = [
-            "to_do",
-            "resources",
-            "appointments",
-            "badges",
-            "hardware",
-            "external_messages",
-            "admin_tasks",
-            "preboarding",
-            "integration_configs",
-        ]
-        requires_manager = False
-        requires_buddy = False
-        for item in self.conditions.prefetched().prefetch_related(
-            "integration_configs__integration"
-        ):
-            for field in to_check:
-                condition_attribute = getattr(item, field)
-                for i in condition_attribute.all():
-                    if (
-                        field == "integration_configs"
-                        and i.integration.manifest_type
-                        == Integration.ManifestType.WEBHOOK
-                    ):
-                        (
-                            item_requires_manager,
-                            item_requires_buddy,
-                        ) = i.integration.requires_assigned_manager_or_buddy
-                    else:
-                        (
-                            item_requires_manager,
-                            item_requires_buddy,
-                        ) = i.requires_assigned_manager_or_buddy
-
-                    if item_requires_manager and not has_manager:
-                        requires_manager = True
-                    if item_requires_buddy and not has_buddy:
-                        requires_buddy = True
-
-                    # stop if we either have a user or if assigned user is required
-                    if (requires_manager or has_manager) and (
-                        requires_buddy or has_buddy
-                    ):
-                        break
-
-        return {"manager": requires_manager, "buddy": requires_buddy}
-
-    def update_progress(self):
-        all_to_do_ids = list(
-            self.conditions.values_list("to_do__id", flat=True)
-        ) + list(self.to_do.values_list("id", flat=True))
-        all_course_ids = list(
-            self.conditions.filter(resources__course=True).values_list(
-                "resources__id", flat=True
-            )
-        ) + list(self.resources.filter(course=True).values_list("id", flat=True))
-
-        # remove duplicates
-        all_to_do_ids = list(dict.fromkeys(all_to_do_ids))
-        all_course_ids = list(dict.fromkeys(all_course_ids))
 
-        completed_to_dos = ToDoUser.objects.filter(user=self, completed=True).count()
-        completed_courses = ResourceUser.objects.filter(
-            resource__course=True, user=self, completed_course=True
-        ).count()
+        # Only check the ones that are not assigned yet, all in one query
+        checks = {
+            f"requires_{person}": _requires_person(person)
+            for person, has_person in [("manager", has_manager), ("buddy", has_buddy)]
+            if not has_person
+        }
+        requires = User.objects.filter(id=self.id).values(**checks).first() or {}
+        return {
+            "manager": requires.get("requires_manager", False),
+            "buddy": requires.get("requires_buddy", False),
+        }
 
-        self.total_tasks = len(all_to_do_ids + all_course_ids)
-        self.completed_tasks = completed_to_dos + completed_courses
-        self.save()
+    def update_progress(self):
+        User.objects.refresh_progress([self.id])
+        self.refresh_from_db(fields=["total_tasks", "completed_tasks"])
 
     def has_perm(self, perm, obj=None):
         return self.is_staff
@@ -413,12 +525,16 @@ class User(AbstractBaseUser):
     def save(self, *args, **kwargs):
         self.email = self.email.lower()
         if not self.pk:
-            while True:
-                unique_string = get_random_string(length=8)
-                if not User.objects.filter(unique_url=unique_string).exists():
-                    break
-            self.unique_url = unique_string
+            self.unique_url = User.objects.make_unique_urls(1)[0]
+        # New users don't have any conditions yet, so nothing to schedule
+        reschedule = self.pk is not None and self.has_changed(
+            "role", "start_day", "termination_date", "timezone"
+        )
         super(User, self).save(*args, **kwargs)
+        self.reset_loaded_values()
+
+        if reschedule:
+            ScheduledCondition.objects.schedule_for_users([self.id])
 
     def add_sequences(self, sequences):
         for sequence in sequences:
@@ -435,43 +551,21 @@ class User(AbstractBaseUser):
 
     @cached_property
     def workday(self):
-        start_day = self.start_day
-        local_day = self.get_local_time().date()
-
-        if start_day > local_day:
-            return 0
-
-        amount_of_workdays = 1
-        while local_day != start_day:
-            start_day += timedelta(days=1)
-            if start_day.weekday() not in [5, 6]:
-                amount_of_workdays += 1
-
-        return amount_of_workdays
+        return business_calendar.workday_number(
+            self.start_day, self.get_local_time().date()
+        )
 
     def workday_to_datetime(self, workdays):
-        start_day = self.start_day
         if workdays == 0:
             return None
 
-        start = 1
-        while start != workdays:
-            start_day += timedelta(days=1)
-            if start_day.weekday() not in [5, 6]:
-                start += 1
-        return start_day
+        # The start day is workday 1
+        return business_calendar.add(self.start_day, workdays - 1)
 
     def offboarding_workday_to_date(self, workdays):
         # Converts the workday (before the end date) to the actual date on which it
         # triggers. This will skip any weekends.
-        base_date = self.termination_date
-
-        while workdays > 0:
-            base_date -= timedelta(days=1)
-            if base_date.weekday() not in [5, 6]:
-                workdays -= 1
-
-        return base_date
+        return business_calendar.add(self.termination_date, -max(workdays, 0))
 
     @cached_property
     def days_before_termination_date(self):
@@ -484,12 +578,9 @@ class User(AbstractBaseUser):
             # passed the termination date
             return -1
 
-        days = 0
-        while termination_date != date:
-            date += timedelta(days=1)
-            if date.weekday() not in [5, 6]:
-                days += 1
-        return days
+        return business_calendar.count(
+            date + timedelta(days=1), termination_date + timedelta(days=1)
+        )
 
     @cached_property
     def days_before_starting(self):
@@ -505,9 +596,8 @@ class User(AbstractBaseUser):
             date = date.replace(tzinfo=None)
 
         local_tz = pytz.timezone("UTC")
-        org = Organization.object.get()
         us_tz = (
-            pytz.timezone(org.timezone)
+            pytz.timezone(Organization.object.get().timezone)
             if self.timezone == ""
             else pytz.timezone(self.timezone)
         )
@@ -518,46 +608,94 @@ class User(AbstractBaseUser):
         )
         return us_tz.normalize(local.astimezone(us_tz))
 
-    def personalize(self, text, extra_values=None):
-        if extra_values is None:
-            extra_values = {}
-        t = Template(text)
+    # Bumped whenever a user or department changes. Cached personalization contexts
+    # might refer to them (manager, buddy, department), so those get rebuilt.
+    personalization_version = 0
+
+    @property
+    def personalization_context(self):
+        """
+        Variables that can be used to personalize texts for this user. Built once
+        and reused until a user or department gets saved.
+        """
+        cached = self.__dict__.get("_personalization_context")
+        if cached is not None and cached[0] == User.personalization_version:
+            return cached[1]
+
+        version = User.personalization_version
+        source = self
+        relations = [
+            field
+            for field in ["department", "manager", "buddy"]
+            if getattr(self, f"{field}_id") is not None
+        ]
+        if self.pk is not None and len(relations):
+            # Fetch them all at once, they might have changed since they were loaded
+            source = User.objects.select_related(*relations).get(pk=self.pk)
+
         department = ""
         manager = ""
         manager_email = ""
         buddy = ""
         buddy_email = ""
-        if self.department is not None:
-            department = self.department.name
-        if self.manager is not None:
-            manager = self.manager.full_name
-            manager_email = self.manager.email
-        if self.buddy is not None:
-            buddy = self.buddy.full_name
-            buddy_email = self.buddy.email
-        new_hire_context = {
-            "manager": manager,
-            "buddy": buddy,
-            "position": self.position,
-            "last_name": self.last_name,
-            "first_name": self.first_name,
-            "email": self.email,
-            "start": self.start_day,
-            "buddy_email": buddy_email,
-            "manager_email": manager_email,
-            "access_overview": lazy(self.get_access_overview, str),
-            "department": department,
-        }
+        if source.department is not None:
+            department = source.department.name
+        if source.manager is not None:
+            manager = source.manager.full_name
+            manager_email = source.manager.email
+        if source.buddy is not None:
+            buddy = source.buddy.full_name
+            buddy_email = source.buddy.email
+        context = MappingProxyType(
+            {
+                "manager": manager,
+                "buddy": buddy,
+                "position": self.position,
+                "last_name": self.last_name,
+                "first_name": self.first_name,
+                "email": self.email,
+                "start": self.start_day,
+                "buddy_email": buddy_email,
+                "manager_email": manager_email,
+                "access_overview": lazy(self.get_access_overview, str),
+                "department": department,
+            }
+        )
+        self._personalization_context = (version, context)
+        return context
 
-        text = t.render(Context(new_hire_context | extra_values))
+    def personalize(self, text, extra_values=None):
+        text = str(text)
+        if not has_template_syntax(text):
+            # Nothing to personalize
+            return text.replace("&nbsp;", " ")
+
+        t = template_cache.get(text)
+        context = Context(self.personalization_context)
+        # Extra values take precedence and keep the shared context untouched
+        context.update(extra_values or {})
+
+        text = t.render(context)
         # Remove non breakable space html code (if any). These could show up in the
         # Slack bot.
         text = text.replace("&nbsp;", " ")
         return text
 
     def get_access_overview(self):
+        """
+        Access of the user to all integrations, based on the last snapshot. Never
+        checks it live, as that would block rendering on third party APIs. An
+        expired (or missing) snapshot gets refreshed in the background.
+        """
+        snapshot = AccessSnapshot.objects.filter(user=self).first()
+        if snapshot is None or snapshot.is_expired:
+            AccessSnapshot.objects.schedule_refresh(self)
+            if snapshot is None:
+                # Might be available already if tasks run synchronously
+                snapshot = AccessSnapshot.objects.filter(user=self).first()
+
         all_access = []
-        for integration, access in self.check_integration_access().items():
+        for integration, access in [] if snapshot is None else snapshot.access:
             if access is None:
                 access_str = _("(unknown)")
             elif access:
@@ -571,11 +709,24 @@ class User(AbstractBaseUser):
 
     def check_integration_access(self):
         items = {}
-        for integration_user in IntegrationUser.objects.filter(user=self):
+        for integration_user in IntegrationUser.objects.filter(
+            user=self
+        ).select_related("integration"):
             items[integration_user.integration.name] = not integration_user.revoked
 
-        for integration in Integration.objects.filter(manifest__exists__isnull=False):
-            items[integration.name] = integration.user_exists(self)
+        # Checks are (slow) requests to third parties, so run them at the same time
+        integrations = list(Integration.objects.filter(manifest__exists__isnull=False))
+        workers = min(settings.INTEGRATION_ACCESS_CHECK_WORKERS, len(integrations))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(
+                    executor.map(_user_exists_in_thread, integrations, repeat(self))
+                )
+        else:
+            results = [integration.user_exists(self) for integration in integrations]
+
+        for integration, access in zip(integrations, results):
+            items[integration.name] = access
 
         return items
 
@@ -595,6 +746,75 @@ class User(AbstractBaseUser):
         return "%s" % self.full_name
 
 
+def _requires_person(person):
+    # Expression that checks if any item in the conditions of the user (OuterRef)
+    # requires a manager or buddy to be assigned
+    user_conditions = Condition.objects.filter(user=OuterRef("pk"))
+    # not all items have to be checked. Introductions for example, doesn't have a
+    # content field.
+    item_checks = [
+        Exists(user_conditions.filter(**{f"{field}__requires_{person}": True}))
+        for field in [
+            "to_do",
+            "resources",
+            "appointments",
+            "badges",
+            "hardware",
+            "preboarding",
+        ]
+    ]
+    item_checks += [
+        Exists(
+            user_conditions.filter(
+                external_messages__person_type=getattr(
+                    ExternalMessage.PersonType, person.upper()
+                )
+            )
+        ),
+        Exists(
+            user_conditions.filter(
+                admin_tasks__person_type=getattr(
+                    PendingAdminTask.PersonType, person.upper()
+                )
+            )
+        ),
+        # Webhook integrations can use the manager/buddy in their manifest, the
+        # others are assigned to them
+        Exists(
+            user_conditions.filter(
+                integration_configs__integration__manifest_type=(
+                    Integration.ManifestType.WEBHOOK
+                ),
+                **{f"integration_configs__integration__requires_{person}": True},
+            )
+        ),
+        Exists(
+            user_conditions.filter(
+                Q(integration_configs__integration__manifest_type__isnull=True)
+                | Q(
+                    integration_configs__integration__manifest_type__in=[
+                        manifest_type
+                        for manifest_type in Integration.ManifestType.values
+                        if manifest_type != Integration.ManifestType.WEBHOOK
+                    ]
+                ),
+                integration_configs__person_type=getattr(
+                    IntegrationConfig.PersonType, person.upper()
+                ),
+            )
+        ),
+    ]
+    return reduce(operator.or_, item_checks)
+
+
+def _user_exists_in_thread(integration, user):
+    try:
+        return integration.user_exists(user)
+    finally:
+        # Every thread gets its own database connection
+        connection.close()
+
+
 class ToDoUserManager(models.Manager):
     def all_to_do(self, user):
         return super().get_queryset().filter(user=user, completed=False)
@@ -633,12 +853,13 @@ class ToDoUser(CompletedFormCheck, models.Model):
     def mark_completed(self):
         from admin.sequences.tasks import process_condition
 
+        # Only the first completion counts for the conditions
+        newly_completed = ToDoUser.objects.filter(pk=self.pk, completed=False).update(
+            completed=True
+        )
         self.completed = True
         self.save()
 
-        # Get conditions with this to do item as (part of the) condition
-        conditions = self.user.conditions.filter(condition_to_do=self.to_do)
-
         # Send answers back to slack channel?
         if self.to_do.send_back:
             blocks = [
@@ -662,21 +883,18 @@ class ToDoUser(CompletedFormCheck, models.Model):
                 channel=self.to_do.slack_channel.name,
             )
 
-        for condition in conditions:
-            condition_to_do_ids = condition.condition_to_do.values_list("id", flat=True)
+        if not newly_completed:
+            return
 
-            # Check if all to do items already have been added to new hire and are
-            # completed. If not, then we know it should not be triggered yet
-            to_do_user = ToDoUser.objects.filter(
-                to_do__in=condition_to_do_ids, user=self.user, completed=True
-            )
+        User.objects.add_completed_tasks(self.user_id)
 
-            # If the amount matches, then we should process it
-            if to_do_user.count() == len(condition_to_do_ids):
-                # Send notification only if user has a slack account
-                process_condition(
-                    condition.id, self.user.id, self.user.has_slack_account
-                )
+        # Process the conditions with this to do item as (part of the) condition,
+        # once all of their to do items have been completed
+        for condition_id in TriggerCounter.objects.complete(
+            self.user, condition__condition_to_do=self.to_do
+        ):
+            # Send notification only if user has a slack account
+            process_condition(condition_id, self.user.id, self.user.has_slack_account)
 
 
 class PreboardingUser(CompletedFormCheck, models.Model):
@@ -728,8 +946,7 @@ class ResourceUser(models.Model):
             self.save()
 
             # Up one for completed stat in user
-            self.user.completed_tasks += 1
-            self.user.save()
+            User.objects.add_completed_tasks(self.user_id)
             return None
 
         # Skip over any folders
@@ -838,3 +1055,88 @@ class IntegrationUser(models.Model):
             user.save()
 
         return integration_user
+
+
+class AccessSnapshotManager(models.Manager):
+    def expired(self):
+        return self.get_queryset().filter(
+            updated_on__lt=timezone.now()
+            - timedelta(minutes=settings.ACCESS_SNAPSHOT_TTL)
+        )
+
+    def refresh(self, user):
+        access = list(user.check_integration_access().items())
+        snapshot, _created = self.update_or_create(
+            user=user, defaults={"access": access}
+        )
+        return snapshot
+
+    def schedule_refresh(self, user):
+        # Only once, even when lots of texts get personalized at the same time
+        if cache.add(f"access_snapshot_refresh_{user.id}", True, timeout=300):
+            async_task(
+                "users.tasks.refresh_access_snapshot",
+                user.id,
+                task_name=f"Refresh access snapshot: {user.full_name}",
+            )
+
+
+class AccessSnapshot(models.Model):
+    """
+    Last known access of a user to all integrations. Used for the
+    `access_overview` variable, so rendering never has to wait for third parties.
+    """
+
+    user = models.OneToOneField(
+        get_user_model(), on_delete=models.CASCADE, related_name="access_snapshot"
+    )
+    # List of [integration name, access]. Access is `None` if it's unknown
+    access = models.JSONField(default=list)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    objects = AccessSnapshotManager()
+
+    @property
+    def is_expired(self):
+        return self.updated_on < timezone.now() - timedelta(
+            minutes=settings.ACCESS_SNAPSHOT_TTL
+        )
+
+
+@receiver(m2m_changed, sender=User.conditions.through)
+def schedule_user_conditions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+
+    if not reverse:
+        # instance is the user, pk_set contains the conditions
+        user_ids, condition_ids = [instance.id], pk_set
+    else:
+        # instance is the condition, pk_set contains the users
+        user_ids, condition_ids = pk_set, [instance.id]
+
+    # Only the rows of the conditions that were added/removed are touched
+    if action == "post_add":
+        ScheduledCondition.objects.schedule_for_users(user_ids, condition_ids)
+        TriggerCounter.objects.count_for_users(user_ids, condition_ids)
+    else:
+        _user_condition_rows(ScheduledCondition, instance, reverse, pk_set).delete()
+        _user_condition_rows(TriggerCounter, instance, reverse, pk_set).delete()
+
+
+def _user_condition_rows(model, instance, reverse, pk_set):
+    # Rows (per user and condition) that belong to a change of `User.conditions`.
+    # `pk_set` is `None` when everything has been cleared
+    if reverse:
+        rows = model.objects.filter(condition=instance)
+        return rows if pk_set is None else rows.filter(user_id__in=pk_set)
+    rows = model.objects.filter(user=instance)
+    return rows if pk_set is None else rows.filter(condition_id__in=pk_set)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def reset_personalization_contexts(sender, **kwargs):
+    User.personalization_version += 1
@@ -1,10 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils import translation
 from django_q.tasks import async_task
 
 from organization.models import Organization
 
 from .emails import send_new_hire_credentials
+from .models import AccessSnapshot
+from .utils import group_by_local_time
 
 
 def send_new_hire_creds(user_id):
@@ -20,12 +24,11 @@ def hourly_check_for_new_hire_send_credentials():
     if org is None or not org.new_hire_email:
         return
 
-    for new_hire in get_user_model().new_hires.all():
-        new_hire_datetime = new_hire.get_local_time()
-        if (
-            new_hire_datetime.date() == new_hire.start_day
-            and new_hire_datetime.hour == 8
-        ):
+    # Only new hires for whom it's 8 am on their first day
+    for local_datetime, new_hires in group_by_local_time(
+        get_user_model().new_hires.all(), hour=8
+    ):
+        for new_hire in new_hires.filter(start_day=local_datetime.date()):
             # Trigger task above to schedule sending credentials
             # In case an email address is incorrect (or not available), it will
             # not block the rest of the emails
@@ -34,3 +37,24 @@ def hourly_check_for_new_hire_send_credentials():
                 new_hire.id,
                 task_name=f"Sending login credentials: {new_hire.full_name}",
             )
+
+
+def refresh_access_snapshot(user_id):
+    user = get_user_model().objects.get(id=user_id)
+    AccessSnapshot.objects.refresh(user)
+    cache.delete(f"access_snapshot_refresh_{user.id}")
+
+
+def refresh_access_snapshots():
+    # Expired snapshots and new hires that don't have one yet
+    users = get_user_model().objects.filter(
+        Q(access_snapshot__in=AccessSnapshot.objects.expired())
+        | Q(role=get_user_model().Role.NEWHIRE, access_snapshot__isnull=True)
+    )
+    for user in users:
+        AccessSnapshot.objects.schedule_refresh(user)
+
+
+def reconcile_progress():
+    # Counters are updated incrementally, this repairs any drift
+    get_user_model().objects.reconcile_progress()
@@ -7,10 +7,16 @@ from django.utils import timezone
 from freezegun import freeze_time
 
 from admin.sequences.models import IntegrationConfig
+from misc.template_cache import template_cache
 from organization.models import Organization
-from users.tasks import hourly_check_for_new_hire_send_credentials
+from users.tasks import (
+    hourly_check_for_new_hire_send_credentials,
+    reconcile_progress,
+    refresh_access_snapshots,
+)
 
-from .models import User
+from .models import AccessSnapshot, ToDoUser, User
+from .utils import group_by_local_time
 
 
 @pytest.mark.django_db
@@ -222,6 +228,16 @@ def test_personalize(
             new_hire.personalize(text_without_spaces) == expected_output_without_spaces
         )
 
+    # Compiled templates are reused
+    template_cache.clear()
+    new_hire.personalize(text_without_spaces)
+    assert new_hire.personalize(text_without_spaces) == expected_output_without_spaces
+    assert template_cache.stats()["hits"] == 1
+
+    # Texts without template syntax are returned as is
+    assert new_hire.personalize("Welcome&nbsp;{first_name}") == "Welcome {first_name}"
+    assert template_cache.stats()["misses"] == 1
+
 
 @pytest.mark.django_db
 def test_check_integration_access(
@@ -281,6 +297,7 @@ def test_check_for_buddy_manager_tags(
     manual_user_provision_integration_factory,
     custom_integration_factory,
     employee_factory,
+    django_assert_num_queries,
 ):
     new_hire = new_hire_factory()
     integration = manual_user_provision_integration_factory()
@@ -331,7 +348,8 @@ def test_check_for_buddy_manager_tags(
     condition.integration_configs.add(integration_config2)
 
     # none of the items have a buddy or manager tag, so should return false
-    assert {"manager": True, "buddy": False} == new_hire.requires_manager_or_buddy()
+    with django_assert_num_queries(1):
+        assert {"manager": True, "buddy": False} == new_hire.requires_manager_or_buddy()
 
     # manager is assigned
     new_hire.manager = employee_factory()
@@ -406,6 +424,158 @@ def test_daily_check_for_new_hire_send_credentials_task(
     freezer.stop()
 
 
+@pytest.mark.django_db
+def test_progress_counters(
+    new_hire_factory,
+    condition_timed_factory,
+    to_do_factory,
+    resource_factory,
+    django_assert_num_queries,
+):
+    new_hire = new_hire_factory()
+    to_do1 = to_do_factory()
+    to_do2 = to_do_factory()
+    course = resource_factory(course=True)
+    article = resource_factory(course=False)
+    condition = condition_timed_factory()
+    condition.to_do.set([to_do1, to_do2])
+    condition.resources.set([course, article])
+    new_hire.conditions.add(condition)
+    # to do item that is both in a condition and assigned directly
+    new_hire.to_do.add(to_do1)
+
+    with django_assert_num_queries(2):
+        new_hire.update_progress()
+    assert new_hire.total_tasks == 3
+    assert new_hire.completed_tasks == 0
+
+    # Completing doesn't recount, only once per item
+    to_do_user = ToDoUser.objects.get(user=new_hire, to_do=to_do1)
+    to_do_user.mark_completed()
+    to_do_user.mark_completed()
+    new_hire.refresh_from_db()
+    assert new_hire.completed_tasks == 1
+
+    # Drifted counters get repaired
+    User.objects.filter(id=new_hire.id).update(total_tasks=10, completed_tasks=5)
+    other_new_hire = new_hire_factory()
+    with django_assert_num_queries(1):
+        assert User.objects.reconcile_progress() == 1
+    reconcile_progress()
+    new_hire.refresh_from_db()
+    assert new_hire.total_tasks == 3
+    assert new_hire.completed_tasks == 1
+    other_new_hire.refresh_from_db()
+    assert other_new_hire.total_tasks == 0
+
+
+@pytest.mark.django_db
+def test_access_overview_snapshot(
+    new_hire_factory, custom_integration_factory, integration_user_factory
+):
+    new_hire = new_hire_factory()
+    integration1 = custom_integration_factory(name="Asana")
+    integration2 = custom_integration_factory(name="Google")
+    integration_user_factory(user=new_hire, revoked=True)
+
+    user_exists = Mock(return_value=True)
+    with patch("admin.integrations.models.Integration.user_exists", user_exists):
+        # No snapshot yet, gets created (directly, tasks run synchronously)
+        overview = new_hire.get_access_overview()
+        # Both integrations got checked (at the same time)
+        assert user_exists.call_count == 2
+
+        assert AccessSnapshot.objects.filter(user=new_hire).count() == 1
+        assert f"{integration1.name} (has access)" in overview
+        assert f"{integration2.name} (has access)" in overview
+        assert "(no access)" in overview
+
+        # Fresh snapshot, no checks anymore
+        assert new_hire.get_access_overview() == overview
+        assert user_exists.call_count == 2
+
+        # Expired snapshots get refreshed in the background, the old one is used
+        # in the meantime
+        user_exists.return_value = None
+        with freeze_time(timezone.now() + datetime.timedelta(hours=2)):
+            assert AccessSnapshot.objects.expired().count() == 1
+            assert new_hire.get_access_overview() == overview
+            assert user_exists.call_count == 4
+            assert f"{integration1.name} (unknown)" in new_hire.get_access_overview()
+
+            # Periodic refresh only refreshes expired ones
+            refresh_access_snapshots()
+            assert user_exists.call_count == 4
+
+        with freeze_time(timezone.now() + datetime.timedelta(hours=4)):
+            refresh_access_snapshots()
+            assert user_exists.call_count == 6
+
+
+@pytest.mark.django_db
+def test_personalization_context(
+    new_hire_factory, manager_factory, department_factory, django_assert_num_queries
+):
+    manager = manager_factory(first_name="jane", last_name="smith")
+    new_hire = new_hire_factory(
+        first_name="john", manager=manager, department=department_factory(name="IT")
+    )
+    new_hire = get_user_model().objects.get(id=new_hire.id)
+
+    # Context (and related items) are only fetched once
+    with django_assert_num_queries(1):
+        for _i in range(10):
+            assert (
+                new_hire.personalize(
+                    "{{ first_name }}, {{ manager }}, {{ department }}"
+                )
+                == "john, jane smith, IT"
+            )
+
+    # Extra values take precedence, but don't end up in the shared context
+    assert new_hire.personalize("{{ first_name }}", {"first_name": "x"}) == "x"
+    assert "x" not in new_hire.personalization_context.values()
+    with pytest.raises(TypeError):
+        new_hire.personalization_context["first_name"] = "x"
+
+    # Changes to the manager are picked up
+    manager.first_name = "janet"
+    manager.save()
+    assert new_hire.personalize("{{ manager }}") == "janet smith"
+
+
+@pytest.mark.django_db
+@freeze_time("2021-01-14 08:00:00")
+def test_group_by_local_time(new_hire_factory, django_assert_max_num_queries):
+    org = Organization.object.get()
+    org.timezone = "UTC"
+    org.save()
+
+    utc_user = new_hire_factory(timezone="UTC")
+    org_user = new_hire_factory(timezone="")
+    amsterdam_user = new_hire_factory(timezone="Europe/Amsterdam")
+
+    # Organization is cached after the first time
+    Organization.object.get()
+    with django_assert_max_num_queries(1):
+        groups = list(group_by_local_time(get_user_model().new_hires.all()))
+
+    assert [(dt.hour, dt.tzinfo.zone) for dt, users in groups] == [
+        (9, "Europe/Amsterdam"),
+        (8, "UTC"),
+    ]
+    # Users without timezone use the org timezone
+    assert list(groups[1][1].order_by("id")) == [utc_user, org_user]
+    assert list(groups[0][1]) == [amsterdam_user]
+
+    # Only the timezones where it's currently 8 am
+    groups = list(group_by_local_time(get_user_model().new_hires.all(), hour=8))
+    assert len(groups) == 1
+    assert groups[0][0].tzinfo.zone == "UTC"
+
+    assert list(group_by_local_time(get_user_model().new_hires.all(), minute=1)) == []
+
+
 @pytest.mark.django_db
 def test_new_hire_missing_extra_info(
     condition_to_do_factory,
@@ -485,6 +655,45 @@ def test_new_hire_missing_extra_info(
     ]
 
 
+@pytest.mark.django_db
+def test_missing_extra_info_for_multiple_users(
+    django_assert_num_queries,
+    condition_to_do_factory,
+    integration_config_factory,
+    integration_factory,
+    new_hire_factory,
+):
+    integration = integration_factory(
+        manifest={
+            "extra_user_info": [
+                {"id": "PERSONAL_EMAIL", "name": "Email", "description": "test"},
+                {"id": "PHONE", "name": "Phone", "description": "test"},
+            ]
+        }
+    )
+    condition = condition_to_do_factory()
+    condition.integration_configs.add(
+        integration_config_factory(integration=integration)
+    )
+    new_hire1, new_hire2, new_hire3 = new_hire_factory.create_batch(3)
+    new_hire1.conditions.add(condition)
+    new_hire2.conditions.add(condition)
+    new_hire2.extra_fields = {"PHONE": "123"}
+    new_hire2.save()
+
+    users = [new_hire1, new_hire2, new_hire3]
+    with django_assert_num_queries(1):
+        missing = get_user_model().objects.missing_extra_info(users)
+        # Result is cached on the users
+        for user in users:
+            user.missing_extra_info  # noqa: B018
+
+    assert [item["id"] for item in missing[new_hire1.id]] == ["PERSONAL_EMAIL", "PHONE"]
+    assert [item["id"] for item in missing[new_hire2.id]] == ["PERSONAL_EMAIL"]
+    assert missing[new_hire3.id] == []
+    assert new_hire2.missing_extra_info == missing[new_hire2.id]
+
+
 @pytest.mark.django_db
 def test_integration_user_trigger(
     employee_factory,
@@ -1,3 +1,40 @@
+import pytz
+from django.db.models import Q
+from django.utils import timezone
+
+
+def group_by_local_time(users, hour=None, minute=None):
+    """
+    Groups the users on their timezone (falls back to the org timezone) and
+    calculates the local time once per timezone.
+
+    :param users QuerySet: users to group
+    :param hour int: only yield the groups where it's currently this hour
+    :param minute int: only yield the groups where it's currently this minute
+    :return generator: (local datetime, QuerySet of users in that timezone)
+    """
+    from organization.models import Organization
+
+    org_timezone = Organization.object.get().timezone
+    timezones = {
+        tz or org_timezone
+        for tz in users.order_by().values_list("timezone", flat=True).distinct()
+    }
+
+    now = timezone.now()
+    for tz in sorted(timezones):
+        local_datetime = now.astimezone(pytz.timezone(tz))
+        if hour is not None and local_datetime.hour != hour:
+            continue
+        if minute is not None and local_datetime.minute != minute:
+            continue
+
+        timezone_filter = Q(timezone=tz)
+        if tz == org_timezone:
+            timezone_filter |= Q(timezone="")
+        yield local_datetime, users.filter(timezone_filter)
+
+
 class CompletedFormCheck:
     @property
     def completed_form_items(self):